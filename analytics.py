@@ -0,0 +1,295 @@
+import threading
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, func, case, extract, distinct
+from models import db, User
+from ledger import MONTH_NAMES
+from archive import payment_source
+
+def months_between(start, end):
+    """(year, month) pairs from `start` to `end` inclusive"""
+    year, month = start
+    periods = []
+    while (year, month) <= end:
+        periods.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return periods
+
+def period_bounds(start, end):
+    """First day of `start` and last day of `end`, both (year, month)"""
+    return date(start[0], start[1], 1), date(end[0], end[1], monthrange(*end)[1])
+
+def day_after(day):
+    """Midnight after `day`, for comparing dates against DateTime columns"""
+    return datetime.combine(day + timedelta(days=1), datetime.min.time())
+
+def counted_payment(payments):
+    """Payments counted towards a month: the month they name is the month they were paid in.
+
+    Same rule as the monthly status report and the ledger.
+    """
+    named_month = case({name: number for number, name in enumerate(MONTH_NAMES, start=1)},
+                       value=payments.c.month)
+    return named_month == extract('month', payments.c.payment_date)
+
+def period_payments(periods):
+    """Payments table for a range of months: payment_source() from the range's first day"""
+    return payment_source(period_bounds(periods[0], periods[-1])[0])
+
+def payment_period_filter(payments, periods, property_id=None):
+    """WHERE conditions selecting the payments counted towards `periods`.
+
+    Short ranges also filter on the month name so the (month, payment_date)
+    index narrows the scan to those months.
+    """
+    range_start, range_end = period_bounds(periods[0], periods[-1])
+    conditions = [payments.c.payment_date.between(range_start, range_end), counted_payment(payments)]
+    if property_id:
+        conditions.append(payments.c.property_id == property_id)
+    names = {MONTH_NAMES[month - 1] for _, month in periods}
+    if len(names) < len(MONTH_NAMES):
+        conditions.append(payments.c.month.in_(sorted(names)))
+    return conditions
+
+def tenant_filter(property_id=None):
+    """WHERE conditions limiting tenants to one property (none for all properties)"""
+    return [User.property_id == property_id] if property_id else []
+
+def occupied_fraction(joined_on, year, month):
+    """Share of a month's rent due from a tenant who joined on `joined_on`"""
+    days = monthrange(year, month)[1]
+    if (joined_on.year, joined_on.month) < (year, month):
+        return 1.0
+    if (joined_on.year, joined_on.month) > (year, month):
+        return 0.0
+    return (days - joined_on.day + 1) / days
+
+def expected_by_month(periods, property_id=None):
+    """Occupancy-adjusted rent due per month.
+
+    Tenants are grouped by join date in SQL, so the Python side works over
+    distinct join dates rather than tenants. A tenant owes full rent for
+    every month after the one they joined in, and a pro-rated share of that
+    first month.
+    """
+    _, range_end = period_bounds(periods[0], periods[-1])
+    joined_year = extract('year', User.created_at)
+    joined_month = extract('month', User.created_at)
+    joined_day = extract('day', User.created_at)
+    rows = db.session.execute(
+        select(joined_year, joined_month, joined_day, func.sum(User.monthly_rent), func.count(User.id))
+        .where(User.created_at < day_after(range_end), *tenant_filter(property_id))
+        .group_by(joined_year, joined_month, joined_day)
+        .order_by(joined_year, joined_month, joined_day)
+    ).all()
+
+    results = {}
+    index = 0
+    full_rent = 0.0
+    full_tenants = 0
+    for year, month in periods:
+        # Everyone who joined before this month owes the full rent
+        while index < len(rows) and (rows[index][0], rows[index][1]) < (year, month):
+            full_rent += rows[index][3]
+            full_tenants += rows[index][4]
+            index += 1
+        expected, occupied = full_rent, full_tenants
+        joiners = index
+        while joiners < len(rows) and (rows[joiners][0], rows[joiners][1]) == (year, month):
+            _, _, day, rent, count = rows[joiners]
+            expected += rent * occupied_fraction(date(year, month, day), year, month)
+            occupied += count
+            joiners += 1
+        results[(year, month)] = {'expected': round(expected, 2), 'occupied': occupied}
+    return results
+
+def collections_by_month(periods, property_id=None):
+    """Approved and pending amounts per month, in one grouped query over payments"""
+    payments = period_payments(periods)
+    paid_year = extract('year', payments.c.payment_date)
+    paid_month = extract('month', payments.c.payment_date)
+    approved = payments.c.status == 'approved'
+    rows = db.session.execute(
+        select(
+            paid_year, paid_month,
+            func.sum(case((approved, payments.c.amount), else_=0)),
+            func.sum(case((payments.c.status == 'pending', payments.c.amount), else_=0)),
+            func.count(distinct(case((approved, payments.c.tenant_id)))),
+        )
+        .where(*payment_period_filter(payments, periods, property_id))
+        .group_by(paid_year, paid_month)
+    ).all()
+    results = {period: {'collected': 0.0, 'pending': 0.0, 'paying_tenants': 0} for period in periods}
+    for year, month, collected, pending, paying in rows:
+        results[(int(year), int(month))] = {
+            'collected': round(collected or 0, 2),
+            'pending': round(pending or 0, 2),
+            'paying_tenants': paying,
+        }
+    return results
+
+def summarize_months(periods, property_id=None):
+    """Expected vs collected rent for consecutive months"""
+    expected = expected_by_month(periods, property_id)
+    collected = collections_by_month(periods, property_id)
+    summaries = {}
+    for period in periods:
+        summary = dict(expected[period], **collected[period])
+        summary['year'], summary['month'] = period
+        summary['outstanding'] = round(max(summary['expected'] - summary['collected'], 0), 2)
+        summary['collection_rate'] = (
+            round(summary['collected'] / summary['expected'] * 100, 1) if summary['expected'] else None
+        )
+        summaries[period] = summary
+    return summaries
+
+class RevenueAnalytics:
+    """Monthly revenue summaries with closed months cached.
+
+    Months before the current one rarely change, so their summaries are kept
+    in memory and only the open month (plus any closed month not yet seen)
+    is computed per request. Writes that do change a past month, such as a
+    late approval or an import, bump a data version; the cache is dropped
+    whenever the caller passes a version it has not seen. Entries are kept
+    per property, with None standing for all properties together.
+    """
+
+    def __init__(self, max_ranges=16):
+        self.max_ranges = max_ranges
+        self._closed = {}
+        self._closed_payments = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        # Called with the lock held
+        if version != self._version:
+            self._closed.clear()
+            self._closed_payments.clear()
+            self._version = version
+
+    def monthly(self, start, end, version=None, today=None, property_id=None):
+        """Summaries for every month from `start` to `end`, oldest first, with month-over-month change"""
+        today = today or date.today()
+        current = (today.year, today.month)
+        periods = months_between(start, end)
+        with self._lock:
+            self._check_version(version)
+            summaries = {period: self._closed[property_id, period] for period in periods
+                         if (property_id, period) in self._closed}
+        missing = [period for period in periods if period not in summaries]
+        if missing:
+            # One pass over the span of missing months
+            fresh = summarize_months(months_between(missing[0], missing[-1]), property_id)
+            summaries.update({period: fresh[period] for period in missing})
+            with self._lock:
+                if version == self._version:
+                    self._closed.update({(property_id, period): fresh[period]
+                                         for period in missing if period < current})
+
+        trend = []
+        previous = None
+        for period in periods:
+            summary = dict(summaries[period])
+            summary['label'] = f'{MONTH_NAMES[period[1] - 1]} {period[0]}'
+            summary['mom_change'] = summary['mom_change_pct'] = None
+            if previous is not None:
+                summary['mom_change'] = round(summary['collected'] - previous['collected'], 2)
+                summary['mom_change_pct'] = (
+                    round(summary['mom_change'] / previous['collected'] * 100, 1)
+                    if previous['collected'] else None
+                )
+            trend.append(summary)
+            previous = summary
+        return trend
+
+    def arrears(self, start, end, version=None, today=None, property_id=None):
+        """tenant_arrears() for a range, reusing cached payment totals for its ended months"""
+        today = today or date.today()
+        current = (today.year, today.month)
+        last_closed = (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+        closed_end = min(end, last_closed)
+        parts = []
+        if start <= closed_end:
+            key = (property_id, start, closed_end)
+            with self._lock:
+                self._check_version(version)
+                closed = self._closed_payments.get(key)
+            if closed is None:
+                closed = payments_by_tenant(start, closed_end, property_id)
+                with self._lock:
+                    if version == self._version:
+                        if len(self._closed_payments) >= self.max_ranges:
+                            self._closed_payments.pop(next(iter(self._closed_payments)))
+                        self._closed_payments[key] = closed
+            parts.append(closed)
+        if end >= current:
+            parts.append(payments_by_tenant(max(start, current), end, property_id))
+        return tenant_arrears(start, end, merge_payment_totals(*parts), property_id)
+
+def payments_by_tenant(start, end, property_id=None):
+    """Approved amount, pending amount and months paid per tenant, in one grouped query"""
+    periods = months_between(start, end)
+    payments = period_payments(periods)
+    approved = payments.c.status == 'approved'
+    paid_period = extract('year', payments.c.payment_date) * 100 + extract('month', payments.c.payment_date)
+    rows = db.session.execute(
+        select(
+            payments.c.tenant_id,
+            func.sum(case((approved, payments.c.amount), else_=0)),
+            func.sum(case((payments.c.status == 'pending', payments.c.amount), else_=0)),
+            func.count(distinct(case((approved, paid_period)))),
+        )
+        .where(*payment_period_filter(payments, periods, property_id))
+        .group_by(payments.c.tenant_id)
+    )
+    return {tenant_id: (collected or 0, pending or 0, months_paid)
+            for tenant_id, collected, pending, months_paid in rows}
+
+def merge_payment_totals(*totals):
+    merged = {}
+    for part in totals:
+        for tenant_id, values in part.items():
+            current = merged.get(tenant_id, (0, 0, 0))
+            merged[tenant_id] = tuple(a + b for a, b in zip(current, values))
+    return merged
+
+def tenant_arrears(start, end, paid, property_id=None):
+    """Rent due, collected and outstanding per tenant over a range of months.
+
+    `paid` is payments_by_tenant() for the range. The expected rent per
+    tenant is computed in closed form from the join date instead of month by
+    month. Sorted by arrears, largest first.
+    """
+    _, range_end = period_bounds(start, end)
+    periods = months_between(start, end)
+    tenants = db.session.execute(
+        select(User.id, User.name, User.room_number, User.monthly_rent, User.created_at)
+        .where(User.created_at < day_after(range_end), *tenant_filter(property_id))
+    ).all()
+
+    results = []
+    for tenant_id, name, room_number, rent, created_at in tenants:
+        joined_on = created_at.date() if isinstance(created_at, datetime) else created_at
+        joined = (joined_on.year, joined_on.month)
+        if joined < start:
+            months_due = len(periods)
+            due = rent * months_due
+        else:
+            # Pro-rated join month plus every full month after it
+            months_due = len(periods) - periods.index(joined)
+            due = rent * (months_due - 1 + occupied_fraction(joined_on, *joined))
+        collected, pending, months_paid = paid.get(tenant_id, (0, 0, 0))
+        results.append({
+            'tenant_id': tenant_id,
+            'name': name,
+            'room_number': room_number,
+            'monthly_rent': rent,
+            'expected': round(due, 2),
+            'collected': round(collected, 2),
+            'pending': round(pending, 2),
+            'arrears': round(max(due - collected, 0), 2),
+            'unpaid_months': max(months_due - months_paid, 0),
+        })
+    results.sort(key=lambda row: (-row['arrears'], row['name']))
+    return results
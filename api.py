@@ -0,0 +1,223 @@
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import select, tuple_
+from models import db, User, Payment, Complaint
+from bulk import format_value
+
+class ApiError(Exception):
+    """A client error reported as {"error": message} with the given status"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+class Resource:
+    """What the API exposes for one listing: selectable fields, filters and sort order.
+
+    `fields` maps public names to columns. Fields from `joined` models are
+    only joined in when selected. `filters` maps query parameters to
+    (column, operator) pairs; values are parsed by the column's type.
+    """
+
+    def __init__(self, model, fields, filters, default_fields=None, joins=None, order_by=None,
+                 descending=True):
+        self.model = model
+        self.fields = fields
+        self.filters = filters
+        self.default_fields = default_fields or list(fields)
+        self.joins = joins or {}
+        self.order_by = order_by or [model.created_at, model.id]
+        self.descending = descending
+
+TENANT_FIELDS = {
+    'id': User.id,
+    'name': User.name,
+    'email': User.email,
+    'phone': User.phone,
+    'property_id': User.property_id,
+    'room_number': User.room_number,
+    'monthly_rent': User.monthly_rent,
+    'deposit_amount': User.deposit_amount,
+    'deposit_paid_date': User.deposit_paid_date,
+    'profile_photo': User.profile_photo,
+    'id_proof_photo': User.id_proof_photo,
+    'created_at': User.created_at,
+}
+
+TENANTS = Resource(
+    User, TENANT_FIELDS,
+    filters={
+        'property_id': (User.property_id, '=='),
+        'room_number': (User.room_number, '=='),
+        'email': (User.email, '=='),
+        'created_after': (User.created_at, '>='),
+        'created_before': (User.created_at, '<'),
+    },
+)
+
+PAYMENTS = Resource(
+    Payment,
+    {
+        'id': Payment.id,
+        'tenant_id': Payment.tenant_id,
+        'property_id': Payment.property_id,
+        'tenant_name': User.name,
+        'room_number': User.room_number,
+        'month': Payment.month,
+        'amount': Payment.amount,
+        'payment_date': Payment.payment_date,
+        'transaction_id': Payment.transaction_id,
+        'payment_proof': Payment.payment_proof,
+        'status': Payment.status,
+        'created_at': Payment.created_at,
+    },
+    filters={
+        'status': (Payment.status, '=='),
+        'tenant_id': (Payment.tenant_id, '=='),
+        'property_id': (Payment.property_id, '=='),
+        'month': (Payment.month, '=='),
+        'paid_from': (Payment.payment_date, '>='),
+        'paid_to': (Payment.payment_date, '<='),
+        'created_after': (Payment.created_at, '>='),
+        'created_before': (Payment.created_at, '<'),
+    },
+    joins={User: Payment.tenant_id == User.id},
+)
+
+COMPLAINTS = Resource(
+    Complaint,
+    {
+        'id': Complaint.id,
+        'tenant_id': Complaint.tenant_id,
+        'property_id': Complaint.property_id,
+        'tenant_name': User.name,
+        'room_number': User.room_number,
+        'subject': Complaint.subject,
+        'description': Complaint.description,
+        'category': Complaint.category,
+        'priority': Complaint.priority,
+        'status': Complaint.status,
+        'assigned_to': Complaint.assigned_to,
+        'created_at': Complaint.created_at,
+        'due_at': Complaint.due_at,
+        'resolved_at': Complaint.resolved_at,
+    },
+    filters={
+        'status': (Complaint.status, '=='),
+        'category': (Complaint.category, '=='),
+        'priority': (Complaint.priority, '=='),
+        'due_before': (Complaint.due_at, '<'),
+        'tenant_id': (Complaint.tenant_id, '=='),
+        'property_id': (Complaint.property_id, '=='),
+        'created_after': (Complaint.created_at, '>='),
+        'created_before': (Complaint.created_at, '<'),
+    },
+    joins={User: Complaint.tenant_id == User.id},
+)
+
+OPERATORS = {
+    '==': lambda column, value: column == value,
+    '>=': lambda column, value: column >= value,
+    '<=': lambda column, value: column <= value,
+    '<': lambda column, value: column < value,
+}
+
+def parse_value(column, raw):
+    """Convert a query-string value to the Python type of `column`"""
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(raw)
+    if python_type is date:
+        return date.fromisoformat(raw)
+    return python_type(raw)
+
+def select_fields(resource, requested):
+    """Resolve ?fields=a,b into (name, column) pairs"""
+    names = [name.strip() for name in requested.split(',') if name.strip()] if requested else []
+    names = names or resource.default_fields
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. "
+                       f"Available: {', '.join(resource.fields)}")
+    return [(name, resource.fields[name]) for name in dict.fromkeys(names)]
+
+def filter_conditions(resource, args):
+    """WHERE conditions for the filter parameters present in `args`"""
+    conditions = []
+    for name, (column, operator) in resource.filters.items():
+        raw = args.get(name)
+        if raw is None or raw == '':
+            continue
+        try:
+            value = parse_value(column, raw)
+        except ValueError:
+            raise ApiError(f'Invalid value for {name}: {raw}')
+        conditions.append(OPERATORS[operator](column, value))
+    return conditions
+
+def encode_cursor(values):
+    """Opaque cursor holding the sort key of the last row on a page"""
+    raw = json.dumps([format_value(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, columns):
+    """Sort key values from a cursor, typed to match `columns`"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(columns):
+            raise ValueError
+        return tuple(parse_value(column, str(value)) for column, value in zip(columns, values))
+    except (ValueError, TypeError):
+        raise ApiError('Invalid cursor')
+
+def build_statement(resource, fields, conditions):
+    """SELECT of just the chosen columns, joining related tables only when needed"""
+    statement = select(*[column.label(name) for name, column in fields]).select_from(resource.model)
+    selected_tables = {column.table for _, column in fields}
+    for model, onclause in resource.joins.items():
+        if model.__table__ in selected_tables:
+            statement = statement.join(model, onclause)
+    return statement.where(*conditions)
+
+def fetch_page(statement, fields, order_by, cursor, per_page, descending=True):
+    """Run a keyset-paginated statement and serialize its rows.
+
+    The sort columns are selected alongside the requested fields (under
+    private labels) so the next cursor can be built even if the client did
+    not ask for them. Returns (rows as dicts, next cursor or None).
+    """
+    keys = [column.label(f'_sort_{index}') for index, column in enumerate(order_by)]
+    statement = statement.add_columns(*keys)
+    if cursor:
+        position = decode_cursor(cursor, order_by)
+        sort_key = tuple_(*order_by)
+        statement = statement.where(sort_key < position if descending else sort_key > position)
+    statement = statement.order_by(*[column.desc() if descending else column.asc() for column in order_by])
+    # Fetch one extra row to know whether another page exists
+    rows = db.session.execute(statement.limit(per_page + 1)).all()
+    names = [name for name, _ in fields]
+    data = [{name: format_value(value) for name, value in zip(names, row)} for row in rows[:per_page]]
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor(rows[per_page - 1][len(names):])
+    return data, next_cursor
+
+def list_resource(resource, args, per_page, extra_conditions=()):
+    """Response body for one page of a resource listing"""
+    fields = select_fields(resource, args.get('fields'))
+    conditions = filter_conditions(resource, args) + list(extra_conditions)
+    statement = build_statement(resource, fields, conditions)
+    data, next_cursor = fetch_page(statement, fields, resource.order_by, args.get('cursor'), per_page,
+                                   resource.descending)
+    return {'data': data, 'next_cursor': next_cursor}
+
+def get_resource(resource, args, condition):
+    """Response body for a single row, or None if it does not exist"""
+    fields = select_fields(resource, args.get('fields'))
+    row = db.session.execute(build_statement(resource, fields, [condition])).first()
+    if row is None:
+        return None
+    return {'data': {name: format_value(value) for (name, _), value in zip(fields, row)}}
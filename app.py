@@ -1,57 +1,652 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from models import db, User, Admin, Payment, Complaint
+from flask import Flask, render_template, request, redirect, url_for, flash, session, g, jsonify, make_response, Response, stream_with_context, send_file
+from markupsafe import Markup
+from models import (db, User, Admin, Property, Room, Payment, PaymentDuplicate, Complaint, ArchivedPayment,
+                    ArchivedComplaint, ComplaintStat, MonthlyLedger, ensure_columns, ensure_indexes)
+from versions import TENANTS, PAST_REVENUE, PROPERTIES, tenant_key, bump_versions, get_versions
+from analytics import RevenueAnalytics
+from ledger import (MONTH_NAMES, MONTH_NUMBERS, ledger_period, update_ledger_for_payment, rebuild_ledger,
+                    refresh_ledger_entries)
+from cache import TTLCache, FragmentCache
+from database import database_uri, engine_options, sqlite_pragmas, apply_sqlite_pragmas
+from query_plans import check_query_plans
+from uploads import UploadStore
+from static_assets import StaticAssets
+from profiling import RequestProfiler
+from passwords import password_hasher, PasswordHasherBusy, LoginThrottle
+from sessions import make_session_interface
+from search import search_index, KINDS as SEARCH_KINDS
+from duplicates import REASONS as DUPLICATE_REASONS, duplicate_scanner, find_duplicate, open_flag, duplicate_flags
+from jobs import job_queue, scheduler
+from notifications import FileOutbox
+from rent_cycle import next_month_start, generate_rent_dues, send_rent_reminders
+from feed import admin_feed
+from archive import archiver, payment_history
+from complaints import (CATEGORIES as COMPLAINT_CATEGORIES, PRIORITIES as COMPLAINT_PRIORITIES,
+                        STATUSES as COMPLAINT_STATUSES, TRANSITIONS as COMPLAINT_TRANSITIONS, new_complaint_fields,
+                        transition, set_priority, sla_queue, category_stats, rebuild_complaint_stats,
+                        backfill_workflow)
+from properties import rooms_with_occupancy, room_has_space, property_summaries, assign_default_property
+import api
+from bulk import EXPORTS, read_records, import_tenants, import_payments, export_csv, export_json
+from sqlalchemy import tuple_, select, update, func, case, true, and_
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timezone, timedelta
 import os
-import uuid
-from werkzeug.utils import secure_filename
+import time
+import hashlib
+import json
+import secrets
+import mimetypes
+import click
 from werkzeug.datastructures import FileStorage
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+# Database URI and pool settings come from the environment (see database.py)
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['SQLITE_PRAGMAS'] = sqlite_pragmas()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024  # 2MB max file size
+app.config['STATIC_CACHE_MAX_AGE'] = 365 * 24 * 3600  # Seconds browsers keep versioned static files and uploads
+app.config['DASHBOARD_CACHE_TTL'] = 30  # seconds
+app.config['FRAGMENT_CACHE_SIZE'] = 64  # Rendered HTML fragments kept per process
+app.config['SEARCH_RESULT_LIMIT'] = 50  # Ranked matches shown per search
+app.config['DUPLICATE_SCAN_INTERVAL'] = 300  # Seconds between background duplicate payment scans
+
+# Background jobs
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))  # Job threads per process (0: run none here)
+app.config['JOB_QUEUE_PATH'] = os.environ.get('JOB_QUEUE_PATH') or os.path.join(app.instance_path, 'jobs.db')
+app.config['JOB_POLL_INTERVAL'] = 2  # Seconds between checks for due jobs
+app.config['JOB_LEASE'] = 600  # Seconds before a job whose worker died is run again
+app.config['JOB_RETRY_DELAY'] = 60  # Seconds before the first retry; doubles with each attempt
+app.config['JOB_MAX_ATTEMPTS'] = 5
+app.config['JOB_RETENTION_DAYS'] = 7  # Finished jobs kept for inspection
+app.config['FEED_MAX_STREAMS'] = int(os.environ.get('FEED_MAX_STREAMS', 2))  # Open live-update streams per process
+app.config['FEED_POLL_INTERVAL'] = 2  # Seconds between checks for changes made in other processes
+app.config['FEED_STREAM_TIMEOUT'] = 55  # Seconds a stream stays open before the browser reconnects
+app.config['FEED_RETRY'] = 10  # Seconds between polls for browsers turned away by the stream limit
+app.config['FEED_KEEPALIVE'] = 15  # Seconds between keepalive comments on an idle stream
+app.config['FEED_RETENTION_HOURS'] = 24  # Events kept for browsers catching up after a disconnect
+app.config['ARCHIVE_AFTER_MONTHS'] = int(os.environ.get('ARCHIVE_AFTER_MONTHS', 12))  # Closed months kept in the live tables
+app.config['ARCHIVE_PATH'] = os.environ.get('ARCHIVE_PATH') or os.path.join(app.instance_path, 'archive')  # Packed payment proofs
+app.config['ARCHIVE_BATCH_SIZE'] = 500  # Rows moved per transaction
+app.config['IMPORT_PATH'] = os.environ.get('IMPORT_PATH') or os.path.join(app.instance_path, 'imports')  # Uploaded import files and their results
+app.config['IMPORT_WORKERS'] = int(os.environ.get('IMPORT_WORKERS', 2))  # Password hashing processes per web import
+app.config['NOTIFICATION_OUTBOX'] = os.environ.get('NOTIFICATION_OUTBOX') or os.path.join(
+    app.instance_path, 'outbox.jsonl')
+# Opt-in request profiling (set PROFILING=1), viewable at /admin/profiling
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING') == '1'
+app.config['PROFILING_HISTORY'] = 500  # Requests kept in memory
+app.config['PROFILING_TOP_QUERIES'] = 5
+app.config['PROFILING_N_PLUS_ONE_THRESHOLD'] = 5  # Same SELECT repeated this often in one request
+app.config['THUMBNAIL_SIZE'] = (300, 300)
+app.config['UPLOAD_WORKERS'] = 2  # Background thumbnail threads
+# Any Werkzeug method, e.g. scrypt:16384:8:1 or pbkdf2:sha256:600000; stored
+# hashes are upgraded on the next successful login after this changes
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['PASSWORD_HASH_WORKERS'] = 2  # Concurrent hash verifications
+app.config['PASSWORD_HASH_QUEUE'] = 16  # Verifications allowed to wait or run at once
+app.config['PASSWORD_HASH_TIMEOUT'] = 10  # Seconds to wait for a free slot
+app.config['LOGIN_LIMIT_PER_IP'] = (20, 300)  # Failed logins per window (seconds)
+app.config['LOGIN_LIMIT_PER_ACCOUNT'] = (5, 300)
+# Server-side sessions: sqlite (default), filesystem, or cookie for Flask's signed cookies
+app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'sqlite')
+app.config['SESSION_PATH'] = os.environ.get('SESSION_PATH') or os.path.join(
+    app.instance_path, 'sessions.db' if app.config['SESSION_BACKEND'] == 'sqlite' else 'sessions')
+app.config['SESSION_CACHE_SIZE'] = 1024  # Sessions kept in memory per process
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
-# Create upload directories if they don't exist
-os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'profile_photos'), exist_ok=True)
-os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'id_proofs'), exist_ok=True)
-os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'payment_proofs'), exist_ok=True)
+UPLOAD_SUBFOLDERS = ['profile_photos', 'id_proofs', 'payment_proofs']
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+upload_store = UploadStore(app.config['UPLOAD_FOLDER'],
+                           thumbnail_size=app.config['THUMBNAIL_SIZE'],
+                           workers=app.config['UPLOAD_WORKERS'],
+                           on_thumbnail=lambda path: scheduler.enqueue('thumbnail-ready', {'path': path}))
+
 def save_uploaded_file(file, folder, prefix=''):
-    """Save uploaded file with secure filename"""
+    """Save uploaded file under a content-hash name, queueing its thumbnail"""
     if file and file.filename and allowed_file(file.filename):
         # Get file extension
         ext = file.filename.rsplit('.', 1)[1].lower()
-        # Generate unique filename using UUID
-        filename = f"{prefix}_{uuid.uuid4().hex[:8]}.{ext}"
-        # Secure the filename
-        filename = secure_filename(filename)
-        # Full path
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], folder, filename)
-        # Save file
-        file.save(filepath)
         # Return relative path for database storage
-        return os.path.join('uploads', folder, filename).replace('\\', '/')
+        return upload_store.save(file, folder, prefix, ext)
     return None
 
+# Uploads get content-hash names, so only the app's own assets need versions
+static_assets = StaticAssets(app.static_folder, skip=['uploads/'])
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    if endpoint == 'static' and 'v' not in values and static_assets.compressible(values.get('filename', '')):
+        version = static_assets.version(values['filename'])
+        if version:
+            values['v'] = version
+
+def tenant_owns_upload(tenant_id, path):
+    """Whether a stored upload is one of the tenant's photos or payment proofs"""
+    if db.session.execute(select(User.id).where(
+            User.id == tenant_id, (User.profile_photo == path) | (User.id_proof_photo == path))).first():
+        return True
+    return db.session.execute(select(Payment.id).where(
+        Payment.tenant_id == tenant_id, Payment.payment_proof == path).limit(1)).first() is not None
+
+@app.before_request
+def protect_uploads():
+    # ID proofs, photos and payment proofs: admins see all of them, a tenant only their own
+    if request.endpoint != 'static' or not request.view_args['filename'].startswith('uploads/'):
+        return None
+    if 'admin_id' in session:
+        return None
+    if 'tenant_id' in session and tenant_owns_upload(session['tenant_id'],
+                                                      upload_store.original_of(request.view_args['filename'])):
+        return None
+    return 'Not found', 404
+
+@app.before_request
+def serve_precompressed():
+    # Send the .gz written by `flask compress-static` instead of the plain file
+    if request.endpoint != 'static' or 'gzip' not in request.accept_encodings:
+        return None
+    filename = request.view_args['filename']
+    path = static_assets.precompressed(filename)
+    if path is None:
+        return None
+    response = send_file(path, mimetype=mimetypes.guess_type(filename)[0], conditional=True)
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@app.after_request
+def static_cache_headers(response):
+    if request.endpoint == 'static':
+        filename = request.view_args.get('filename', '')
+        # Versioned URLs and content-named uploads never change under the same URL
+        if filename.startswith('uploads/'):
+            # Tenants' documents: the browser may keep them, shared caches must not
+            response.cache_control.private = True
+            if response.status_code in (200, 304):
+                response.cache_control.no_cache = None
+                response.cache_control.max_age = app.config['STATIC_CACHE_MAX_AGE']
+        elif request.args.get('v'):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config['STATIC_CACHE_MAX_AGE']
+            response.cache_control.immutable = True
+        if static_assets.compressible(filename):
+            response.vary.add('Accept-Encoding')
+    return response
+
+@app.template_filter('thumbnail')
+def thumbnail_filter(path):
+    """Use an upload's thumbnail in listings once it has been generated"""
+    return upload_store.thumbnail_for(path)
+
+def get_page_size():
+    """Read the requested page size, capped at MAX_PAGE_SIZE"""
+    per_page = request.args.get('per_page', PAGE_SIZE, type=int)
+    return max(1, min(per_page, MAX_PAGE_SIZE))
+
+def encode_cursor(row, key='created_at'):
+    """Build a keyset cursor from a row's (created_at, id), or (key, id) for another datetime column"""
+    return f"{getattr(row, key).strftime('%Y-%m-%dT%H:%M:%S.%f')}_{row.id}"
+
+def decode_cursor(cursor):
+    """Parse a keyset cursor, returning None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        created_at, row_id = cursor.rsplit('_', 1)
+        return datetime.strptime(created_at, '%Y-%m-%dT%H:%M:%S.%f'), int(row_id)
+    except ValueError:
+        return None
+
+def keyset_paginate(query, model, cursor, per_page, key='created_at', descending=True):
+    """Fetch one page of rows, newest first, keyed on (created_at, id).
+
+    `key` and `descending` page on another datetime column or oldest first
+    (the complaint SLA queue pages on (due_at, id) ascending). Returns the
+    rows and the cursor for the next page (None on the last page).
+    """
+    column = getattr(model, key)
+    position = decode_cursor(cursor)
+    if position:
+        keys = tuple_(column, model.id)
+        query = query.filter(keys < position if descending else keys > position)
+    order = (column.desc(), model.id.desc()) if descending else (column, model.id)
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(*order).limit(per_page + 1).all()
+    next_cursor = encode_cursor(rows[per_page - 1], key) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+def has_archived(model, tenant_id):
+    """Whether a tenant has any rows in an archive table (shows the "Load older" button)"""
+    return db.session.execute(select(model.id).where(model.tenant_id == tenant_id).limit(1)).first() is not None
+
+def archived_page(model, tenant_id, template, **values):
+    """One page of a tenant's archived rows as JSON: rendered table rows and the next page's URL"""
+    rows, next_cursor = keyset_paginate(model.query.filter_by(tenant_id=tenant_id), model,
+                                        request.args.get('cursor'), get_page_size())
+    return jsonify({
+        'html': render_template(template, rows=rows, **values),
+        'next_url': url_for(request.endpoint, cursor=next_cursor, **request.view_args) if next_cursor else None,
+    })
+
+session_interface = make_session_interface(app.config['SESSION_BACKEND'], app.config['SESSION_PATH'],
+                                           cache_size=app.config['SESSION_CACHE_SIZE'])
+if session_interface:
+    app.session_interface = session_interface
+
+def start_session():
+    """Give a freshly logged-in user a new session id"""
+    if hasattr(session, 'regenerate'):
+        session.regenerate()
+
+password_hasher.configure(method=app.config['PASSWORD_HASH_METHOD'],
+                          workers=app.config['PASSWORD_HASH_WORKERS'],
+                          max_pending=app.config['PASSWORD_HASH_QUEUE'],
+                          timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+login_ip_throttle = LoginThrottle(*app.config['LOGIN_LIMIT_PER_IP'])
+login_account_throttle = LoginThrottle(*app.config['LOGIN_LIMIT_PER_ACCOUNT'])
+
+def login_retry_after(account):
+    """Seconds before this client or account may try to log in again, or 0"""
+    return max(login_ip_throttle.retry_after(request.remote_addr),
+               login_account_throttle.retry_after(account))
+
+def record_login_attempt(account, success):
+    """Count failures towards the throttles; a success clears the account's count"""
+    if success:
+        login_account_throttle.reset(account)
+    else:
+        login_ip_throttle.failure(request.remote_addr)
+        login_account_throttle.failure(account)
+
+def check_login(user, password):
+    """Verify a password, persisting the hash if it was upgraded"""
+    if user is None or not user.check_password(password):
+        return False
+    if db.session.is_modified(user):
+        db.session.commit()
+    return True
+
+# Admin dashboard counters, invalidated by every route that changes them
+stats_cache = TTLCache(app.config['DASHBOARD_CACHE_TTL'])
+
+def count_where(condition):
+    """Conditional COUNT for use inside an aggregate query"""
+    return func.sum(case((condition, 1), else_=0))
+
+def property_scope(model, property_id=None):
+    """Condition limiting `model` to one property (the admin's selected one by default), or true() for all"""
+    if property_id is None:
+        property_id = g.get('property_id')
+    return model.property_id == property_id if property_id else true()
+
+def dashboard_stats_query(property_id=None):
+    """Build the single statement that returns every admin dashboard counter"""
+    tenant_stats = select(func.count(User.id).label('total_tenants')).where(
+        property_scope(User, property_id)).subquery()
+    payment_stats = select(
+        count_where(Payment.status != 'discarded').label('total_payments'),
+        count_where(Payment.status == 'pending').label('pending_payments'),
+        count_where(Payment.status == 'approved').label('approved_payments'),
+    ).where(property_scope(Payment, property_id)).subquery()
+    complaint_stats = select(
+        func.count(Complaint.id).label('total_complaints'),
+        count_where(Complaint.status != 'resolved').label('open_complaints'),
+        count_where(Complaint.status == 'resolved').label('resolved_complaints'),
+    ).where(property_scope(Complaint, property_id)).subquery()
+    archived_payment_stats = select(func.count(ArchivedPayment.id).label('archived_payments')).where(
+        property_scope(ArchivedPayment, property_id)).subquery()
+    archived_complaint_stats = select(func.count(ArchivedComplaint.id).label('archived_complaints')).where(
+        property_scope(ArchivedComplaint, property_id)).subquery()
+    # Each side is a single row, so the cross join yields exactly one row
+    return (select(tenant_stats, payment_stats, complaint_stats, archived_payment_stats, archived_complaint_stats)
+            .select_from(tenant_stats.join(payment_stats, true()).join(complaint_stats, true())
+                         .join(archived_payment_stats, true()).join(archived_complaint_stats, true())))
+
+def end_of_month(year, month):
+    """Last second of a month, for join-date filtering"""
+    next_month = month % 12 + 1
+    next_month_year = year + (1 if month == 12 else 0)
+    return datetime(next_month_year, next_month, 1, tzinfo=timezone.utc) - timedelta(seconds=1)
+
+def monthly_status_query(year, month, month_end, property_id=None):
+    """Classify every tenant as Paid / Pending Approval / Not Paid for one month.
+
+    Each tenant who joined by `month_end` gets one row carrying the columns the
+    monthly status report shows, read from their ledger entry for the month and
+    the payment it points at, live or archived.
+    """
+    status_label = case(
+        (MonthlyLedger.status == 'paid', 'Paid'),
+        (MonthlyLedger.status == 'pending', 'Pending Approval'),
+        else_='Not Paid',
+    )
+    return (
+        select(
+            User.name,
+            User.room_number,
+            User.monthly_rent,
+            func.coalesce(Payment.amount, ArchivedPayment.amount).label('amount'),
+            func.coalesce(Payment.payment_date, ArchivedPayment.payment_date).label('payment_date'),
+            func.coalesce(Payment.transaction_id, ArchivedPayment.transaction_id).label('transaction_id'),
+            status_label.label('status_label'),
+        )
+        .outerjoin(MonthlyLedger, and_(
+            MonthlyLedger.tenant_id == User.id,
+            MonthlyLedger.year == year,
+            MonthlyLedger.month == month,
+        ))
+        .outerjoin(Payment, Payment.id == MonthlyLedger.latest_payment_id)
+        .outerjoin(ArchivedPayment, ArchivedPayment.id == MonthlyLedger.latest_payment_id)
+        .where(User.created_at <= month_end, property_scope(User, property_id))
+        .order_by(User.name.asc())
+    )
+
+def compute_dashboard_stats(property_id=None):
+    """Collect all admin dashboard counters in a single round trip"""
+    row = db.session.execute(dashboard_stats_query(property_id)).one()
+    # SUM over an empty table is NULL
+    stats = {key: value or 0 for key, value in row._mapping.items()}
+    # Only approved payments and resolved complaints are archived
+    archived_payments = stats.pop('archived_payments')
+    archived_complaints = stats.pop('archived_complaints')
+    stats['total_payments'] += archived_payments
+    stats['approved_payments'] += archived_payments
+    stats['total_complaints'] += archived_complaints
+    stats['resolved_complaints'] += archived_complaints
+    return stats
+
+def get_dashboard_stats():
+    """Return the selected property's dashboard counters, served from the TTL cache when fresh"""
+    property_id = g.get('property_id')
+    return stats_cache.get_or_set(f'dashboard:{property_id}', lambda: compute_dashboard_stats(property_id))
+
+def invalidate_dashboard_stats():
+    """Drop cached dashboard counters (for every property) after a write that changes them"""
+    stats_cache.invalidate()
+
+def property_choices():
+    """(id, name) of every property for the admin's property switcher"""
+    return stats_cache.get_or_set('properties', lambda: db.session.execute(
+        select(Property.id, Property.name).order_by(Property.name)).all())
+
+# Rendered fragments (e.g. the tenant table rows), keyed by data version
+fragment_cache = FragmentCache(app.config['FRAGMENT_CACHE_SIZE'])
+
+def template_fingerprint():
+    """Digest of the templates on disk, so ETags change when a deploy changes the HTML"""
+    digest = hashlib.sha1()
+    for root, _, files in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            digest.update(f'{name}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()
+
+TEMPLATE_FINGERPRINT = template_fingerprint()
+
+def conditional_get(version_keys):
+    """Answer repeat GETs with 304 Not Modified while a page's data is unchanged.
+
+    `version_keys` returns the version keys the page is built from. The ETag
+    combines their counters with the URL and the logged-in users, so checking
+    it costs one primary-key lookup instead of the page's queries and render.
+    The versions are left on g.data_versions for the view.
+    """
+    from functools import wraps
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.data_versions = get_versions(version_keys())
+            # Pending flash messages are part of the page, so always render it
+            if session.get('_flashes'):
+                return f(*args, **kwargs)
+            
+            parts = [TEMPLATE_FINGERPRINT, request.full_path,
+                     str(session.get('admin_id')), str(session.get('tenant_id')), str(session.get('property_id'))]
+            parts += [f'{key}={version}' for key, (version, _) in sorted(g.data_versions.items())]
+            etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+            updated = [updated_at for _, updated_at in g.data_versions.values()]
+            last_modified = None
+            if all(updated):
+                last_modified = max(updated).replace(tzinfo=timezone.utc, microsecond=0)
+            
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = bool(last_modified and request.if_modified_since
+                                    and request.if_modified_since >= last_modified)
+            response = Response(status=304) if not_modified else make_response(f(*args, **kwargs))
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            # Browsers may keep the page but must revalidate it every time
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
+
+# Revenue report; months that have ended are cached until PAST_REVENUE changes
+revenue_analytics = RevenueAnalytics()
+REPORT_MONTHS = 12  # Default report range, ending with the current month
+MAX_REPORT_MONTHS = 120
+REPORT_ARREARS_ROWS = 100
+
+def payment_version_keys(payment):
+    """Version keys a new or changed payment affects"""
+    keys = [tenant_key(payment.tenant_id)]
+    period = ledger_period(payment.month, payment.payment_date)
+    today = datetime.utcnow()
+    if period and period < (today.year, today.month):
+        keys.append(PAST_REVENUE)
+    return keys
+
+def parse_report_month(value, default):
+    """Read a YYYY-MM form value as (year, month)"""
+    try:
+        parsed = datetime.strptime(value or '', '%Y-%m')
+        return parsed.year, parsed.month
+    except ValueError:
+        return default
+
+def approve_pending_payments(condition):
+    """Approve every pending payment matching `condition` with one UPDATE.
+
+    Returns the (id, tenant_id, property_id, month, payment_date) rows this statement changed. Payments someone
+    else approved in the meantime no longer match `status = 'pending'`, so
+    they are never counted twice. Runs in the caller's transaction.
+    """
+    pending = and_(condition, Payment.status == 'pending')
+    if db.engine.dialect.update_returning:
+        return db.session.execute(
+            update(Payment).where(pending).values(status='approved')
+            .returning(Payment.id, Payment.tenant_id, Payment.property_id, Payment.month, Payment.payment_date)
+            .execution_options(synchronize_session=False)
+        ).all()
+    rows = db.session.execute(
+        select(Payment.id, Payment.tenant_id, Payment.property_id, Payment.month, Payment.payment_date)
+        .where(pending).with_for_update()
+    ).all()
+    if rows:
+        db.session.execute(
+            update(Payment).where(Payment.id.in_([row.id for row in rows]))
+            .values(status='approved').execution_options(synchronize_session=False)
+        )
+    return rows
+
 db.init_app(app)
 
-# Initialize database
+profiler = RequestProfiler(history=app.config['PROFILING_HISTORY'],
+                           top_queries=app.config['PROFILING_TOP_QUERIES'],
+                           n_plus_one_threshold=app.config['PROFILING_N_PLUS_ONE_THRESHOLD'])
+
+# Per-process setup only; the schema is created and upgraded by bootstrap()
 with app.app_context():
-    db.create_all()
-    # Create default admin if not exists
-    if not Admin.query.filter_by(username='admin').first():
-        admin = Admin(username='admin')
-        admin.set_password('admin123')
-        db.session.add(admin)
+    apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+    if app.config['PROFILING_ENABLED']:
+        profiler.init_app(app, db.engine)
+    search_index.limit = app.config['SEARCH_RESULT_LIMIT']
+    search_index.init_db(create=False)
+
+def bootstrap():
+    """Create or upgrade the schema and seed required rows.
+
+    Run once per deploy with `flask init-db` (the development server runs it
+    on start), not by every worker. Safe to repeat.
+    """
+    for subfolder in UPLOAD_SUBFOLDERS:
+        os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], subfolder), exist_ok=True)
+    with app.app_context():
+        db.create_all()
+        # Add columns and indexes declared after the database was first created
+        ensure_columns()
+        ensure_indexes()
+        # Databases from before multi-property support hold a single building
+        assign_default_property()
+        # Create the search index, and fill it for databases that predate it
+        if search_index.init_db() and search_index.is_empty() and User.query.first():
+            search_index.rebuild()
+        # Backfill the monthly ledger for databases that predate it
+        if Payment.query.first() and not MonthlyLedger.query.first():
+            rebuild_ledger()
+        # Complaints from before categories and SLAs: default them, then total their resolution times
+        backfill_workflow()
+        if not ComplaintStat.query.first():
+            rebuild_complaint_stats()
+        # Create default admin if not exists
+        if not Admin.query.filter_by(username='admin').first():
+            admin = Admin(username='admin')
+            admin.set_password('admin123')
+            db.session.add(admin)
+            db.session.commit()
+
+def create_app():
+    """Entry point for WSGI servers (see wsgi.py): the app, checked for serving.
+
+    Importing this module only wires the app up, so each worker starts
+    without touching the schema. Fails fast if `flask init-db` has not been
+    run against the configured database.
+    """
+    with app.app_context():
+        missing = set(db.metadata.tables) - set(db.inspect(db.engine).get_table_names())
+        if missing:
+            raise RuntimeError(f"Database is missing tables {', '.join(sorted(missing))}; "
+                               'run `flask --app app init-db` first')
+    return app
+
+def after_fork():
+    """Drop pooled database connections inherited from a preloading parent process (gunicorn.conf.py)"""
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+# Background jobs: work that should not hold up a request, and recurring tasks
+job_queue.configure(app.config['JOB_QUEUE_PATH'])
+scheduler.configure(workers=app.config['JOB_WORKERS'],
+                    poll_interval=app.config['JOB_POLL_INTERVAL'],
+                    lease=app.config['JOB_LEASE'],
+                    retry_delay=app.config['JOB_RETRY_DELAY'],
+                    max_attempts=app.config['JOB_MAX_ATTEMPTS'])
+outbox = FileOutbox(app.config['NOTIFICATION_OUTBOX'])
+admin_feed.configure(app.config['FEED_MAX_STREAMS'])
+archiver.configure(app.config['ARCHIVE_PATH'], upload_store,
+                   after_months=app.config['ARCHIVE_AFTER_MONTHS'],
+                   batch_size=app.config['ARCHIVE_BATCH_SIZE'])
+
+def scheduled_period(payload):
+    """(year, month) a rent-cycle job is for"""
+    if 'year' in payload:
+        return payload['year'], payload['month']
+    scheduled_for = datetime.fromisoformat(payload['scheduled_for'])
+    return scheduled_for.year, scheduled_for.month
+
+@scheduler.task('rent-cycle')
+def rent_cycle_job(payload):
+    """Month start: create every tenant's rent due, then queue the reminders"""
+    year, month = scheduled_period(payload)
+    generate_rent_dues(year, month)
+    scheduler.enqueue('rent-reminders', {'year': year, 'month': month},
+                      unique_key=f'rent-reminders@{year}-{month:02d}')
+
+@scheduler.task('rent-reminders')
+def rent_reminders_job(payload):
+    send_rent_reminders(payload['year'], payload['month'], outbox)
+
+@scheduler.task('scan-duplicates')
+def scan_duplicates_job(payload):
+    duplicate_scanner.scan()
+
+@scheduler.task('thumbnail-ready')
+def thumbnail_ready_job(payload):
+    """Bump the versions of tenants showing an upload, so pages cached with the original pick up its thumbnail"""
+    path = payload['path']
+    tenant_ids = set(db.session.execute(select(User.id).where(
+        (User.profile_photo == path) | (User.id_proof_photo == path))).scalars())
+    tenant_ids.update(db.session.execute(
+        select(Payment.tenant_id).where(Payment.payment_proof == path).distinct()).scalars())
+    if tenant_ids:
+        bump_versions(*[tenant_key(tenant_id) for tenant_id in sorted(tenant_ids)])
         db.session.commit()
 
+@scheduler.task('archive')
+def archive_job(payload):
+    archiver.run()
+    invalidate_dashboard_stats()
+
+@scheduler.task('import')
+def import_job(payload):
+    """Run a file uploaded on the import page, leaving its summary for the page to show"""
+    path = payload['path']
+    try:
+        with open(path, 'rb') as f:
+            records = read_records(f, payload['filename'])
+            if payload['kind'] == 'tenants':
+                result = import_tenants(records, workers=app.config['IMPORT_WORKERS'],
+                                        property_id=payload['property_id'])
+            else:
+                result = import_payments(records)
+        summary = {'imported': result.imported, 'errors': result.errors}
+    except Exception as e:
+        # Reported on the page rather than retried: rows before the failure are already in
+        db.session.rollback()
+        summary = {'imported': None, 'errors': [f"Error importing {payload['kind']}: {e}"]}
+    invalidate_dashboard_stats()
+    with open(path + '.part', 'w') as f:
+        json.dump(summary, f)
+    os.replace(path + '.part', import_result_file(payload['token']))
+    if os.path.exists(path):
+        os.remove(path)
+
+@scheduler.task('purge-jobs')
+def purge_jobs_job(payload):
+    job_queue.purge(time.time() - app.config['JOB_RETENTION_DAYS'] * 86400)
+    # Import summaries, and uploads whose import never ran, are kept as long as the jobs
+    if os.path.isdir(app.config['IMPORT_PATH']):
+        for entry in os.scandir(app.config['IMPORT_PATH']):
+            if entry.stat().st_mtime < time.time() - app.config['JOB_RETENTION_DAYS'] * 86400:
+                os.remove(entry.path)
+    admin_feed.purge(datetime.utcnow() - timedelta(hours=app.config['FEED_RETENTION_HOURS']))
+
+# Every month start is run, including ones missed while the app was down
+scheduler.recurring('rent-cycle', next_month_start, catch_up=True)
+scheduler.recurring('scan-duplicates',
+                    lambda after: after + timedelta(seconds=app.config['DUPLICATE_SCAN_INTERVAL']))
+scheduler.recurring('purge-jobs', lambda after: after + timedelta(days=1))
+scheduler.recurring('archive', lambda after: after + timedelta(days=1))
+
+@app.before_request
+def start_background_jobs():
+    # Started by the first request so CLI commands don't spawn workers
+    scheduler.start(app)
+
 # Helper function to check admin login
 def admin_required(f):
     from functools import wraps
@@ -60,6 +655,10 @@ def admin_required(f):
         if 'admin_id' not in session:
             flash('Please login as admin to access this page', 'error')
             return redirect(url_for('admin_login'))
+        g.admin_id = session['admin_id']
+        g.admin_username = session.get('admin_username')
+        # Admin pages show the property picked in the navbar, or all of them
+        g.property_id = session.get('property_id')
         return f(*args, **kwargs)
     return decorated_function
 
@@ -71,9 +670,21 @@ def tenant_required(f):
         if 'tenant_id' not in session:
             flash('Please login to access this page', 'error')
             return redirect(url_for('tenant_login'))
+        g.tenant_id = session['tenant_id']
         return f(*args, **kwargs)
     return decorated_function
 
+# Columns the tenant pages show about the logged-in tenant
+TENANT_IDENTITY_COLUMNS = (User.id, User.name, User.email, User.room_number, User.monthly_rent, User.property_id)
+
+def current_tenant():
+    """The logged-in tenant's identity row, loaded at most once per request"""
+    if 'tenant' not in g:
+        g.tenant = db.session.execute(
+            select(*TENANT_IDENTITY_COLUMNS).where(User.id == g.tenant_id)
+        ).first()
+    return g.tenant
+
 # Routes
 @app.route('/')
 def index():
@@ -90,9 +701,23 @@ def admin_login():
             flash('Please fill all fields', 'error')
             return render_template('admin_login.html')
         
+        account = f'admin:{username}'
+        retry_after = login_retry_after(account)
+        if retry_after:
+            flash(f'Too many failed login attempts. Try again in {retry_after} seconds.', 'error')
+            return render_template('admin_login.html'), 429, {'Retry-After': str(retry_after)}
+        
         admin = Admin.query.filter_by(username=username).first()
         
-        if admin and admin.check_password(password):
+        try:
+            valid = check_login(admin, password)
+        except PasswordHasherBusy:
+            flash('Server is busy, please try again in a moment', 'error')
+            return render_template('admin_login.html'), 503
+        record_login_attempt(account, valid)
+        
+        if valid:
+            start_session()
             session['admin_id'] = admin.id
             session['admin_username'] = admin.username
             flash('Login successful!', 'success')
@@ -106,28 +731,87 @@ def admin_login():
 def admin_logout():
     session.pop('admin_id', None)
     session.pop('admin_username', None)
+    session.pop('property_id', None)
     flash('Logged out successfully', 'success')
     return redirect(url_for('admin_login'))
 
 @app.route('/admin/dashboard')
 @admin_required
 def admin_dashboard():
-    total_tenants = User.query.count()
-    total_payments = Payment.query.count()
-    pending_payments = Payment.query.filter_by(status='pending').count()
-    approved_payments = Payment.query.filter_by(status='approved').count()
-    total_complaints = Complaint.query.count()
-    pending_complaints = Complaint.query.filter_by(status='pending').count()
-    resolved_complaints = Complaint.query.filter_by(status='resolved').count()
-    
-    return render_template('admin_dashboard.html',
-                         total_tenants=total_tenants,
-                         total_payments=total_payments,
-                         pending_payments=pending_payments,
-                         approved_payments=approved_payments,
-                         total_complaints=total_complaints,
-                         pending_complaints=pending_complaints,
-                         resolved_complaints=resolved_complaints)
+    return render_template('admin_dashboard.html', **get_dashboard_stats())
+
+@app.context_processor
+def inject_properties():
+    # Choices for the property switcher in the admin navbar
+    if 'admin_id' not in session:
+        return {}
+    return {'property_choices': property_choices(), 'selected_property_id': session.get('property_id')}
+
+@app.context_processor
+def inject_complaint_labels():
+    return {'complaint_statuses': COMPLAINT_STATUSES, 'complaint_categories': COMPLAINT_CATEGORIES,
+            'complaint_priorities': COMPLAINT_PRIORITIES, 'complaint_transitions': COMPLAINT_TRANSITIONS,
+            'utcnow': datetime.utcnow}
+
+@app.route('/admin/property', methods=['POST'])
+@admin_required
+def select_property():
+    property_id = request.form.get('property_id', type=int)
+    if property_id and not db.session.get(Property, property_id):
+        flash('Property not found', 'error')
+    else:
+        session['property_id'] = property_id or None
+    return redirect(request.referrer or url_for('admin_dashboard'))
+
+@app.route('/admin/properties', methods=['GET', 'POST'])
+@admin_required
+def admin_properties():
+    if request.method == 'POST':
+        name = (request.form.get('name') or '').strip()
+        address = (request.form.get('address') or '').strip()
+        if not name:
+            flash('Property name is required', 'error')
+        elif Property.query.filter_by(name=name).first():
+            flash('A property with that name already exists', 'error')
+        else:
+            try:
+                db.session.add(Property(name=name, address=address or None))
+                bump_versions(PROPERTIES)
+                db.session.commit()
+                stats_cache.invalidate('properties')
+                flash(f'Property {name} added', 'success')
+            except Exception as e:
+                flash(f'Error adding property: {str(e)}', 'error')
+                db.session.rollback()
+        return redirect(url_for('admin_properties'))
+    return render_template('admin_properties.html', summaries=property_summaries())
+
+@app.route('/admin/properties/<int:property_id>/rooms', methods=['GET', 'POST'])
+@admin_required
+def property_rooms(property_id):
+    prop = Property.query.get_or_404(property_id)
+    if request.method == 'POST':
+        number = (request.form.get('number') or '').strip()
+        capacity = request.form.get('capacity', type=int)
+        if not number or not capacity or capacity < 1:
+            flash('Room number and a capacity of at least 1 are required', 'error')
+        elif Room.query.filter_by(property_id=prop.id, number=number).first():
+            flash(f'Room {number} already exists in {prop.name}', 'error')
+        else:
+            try:
+                db.session.add(Room(property_id=prop.id, number=number, capacity=capacity))
+                bump_versions(PROPERTIES)
+                db.session.commit()
+                flash(f'Room {number} added', 'success')
+            except Exception as e:
+                flash(f'Error adding room: {str(e)}', 'error')
+                db.session.rollback()
+        return redirect(url_for('property_rooms', property_id=prop.id))
+    return render_template('property_rooms.html', property=prop, rooms=rooms_with_occupancy(prop.id))
+
+def add_tenant_form():
+    return render_template('add_tenant.html', rooms=rooms_with_occupancy(g.property_id),
+                           property_names=dict(property_choices()))
 
 @app.route('/admin/add_tenant', methods=['GET', 'POST'])
 @admin_required
@@ -136,7 +820,7 @@ def add_tenant():
         name = request.form.get('name')
         email = request.form.get('email')
         phone = request.form.get('phone')
-        room_number = request.form.get('room_number')
+        room = Room.query.get(request.form.get('room_id', type=int) or 0)
         monthly_rent = request.form.get('monthly_rent')
         deposit_amount = request.form.get('deposit_amount')
         deposit_paid_date = request.form.get('deposit_paid_date')
@@ -147,25 +831,29 @@ def add_tenant():
         id_proof_photo = request.files.get('id_proof_photo')
         
         # Validation - required fields
-        if not all([name, email, phone, room_number, monthly_rent, password]):
+        if not all([name, email, phone, room, monthly_rent, password]):
             flash('Please fill all required fields', 'error')
-            return render_template('add_tenant.html')
+            return add_tenant_form()
+        
+        if not room_has_space(room):
+            flash(f'Room {room.number} is full', 'error')
+            return add_tenant_form()
         
         # Check if email already exists
         if User.query.filter_by(email=email).first():
             flash('Email already registered', 'error')
-            return render_template('add_tenant.html')
+            return add_tenant_form()
         
         # Validate file uploads if provided
         if profile_photo and profile_photo.filename:
             if not allowed_file(profile_photo.filename):
                 flash('Profile photo must be a JPG, JPEG, or PNG file', 'error')
-                return render_template('add_tenant.html')
+                return add_tenant_form()
         
         if id_proof_photo and id_proof_photo.filename:
             if not allowed_file(id_proof_photo.filename):
                 flash('ID proof must be a JPG, JPEG, or PNG file', 'error')
-                return render_template('add_tenant.html')
+                return add_tenant_form()
         
         try:
             monthly_rent = float(monthly_rent)
@@ -177,7 +865,7 @@ def add_tenant():
                     deposit_date_obj = datetime.strptime(deposit_paid_date, '%Y-%m-%d').date()
                 except ValueError:
                     flash('Invalid deposit paid date format', 'error')
-                    return render_template('add_tenant.html')
+                    return add_tenant_form()
             
             # Save uploaded files
             profile_photo_path = None
@@ -187,20 +875,22 @@ def add_tenant():
                 profile_photo_path = save_uploaded_file(profile_photo, 'profile_photos', 'profile')
                 if not profile_photo_path:
                     flash('Error saving profile photo', 'error')
-                    return render_template('add_tenant.html')
+                    return add_tenant_form()
             
             if id_proof_photo and id_proof_photo.filename:
                 id_proof_photo_path = save_uploaded_file(id_proof_photo, 'id_proofs', 'idproof')
                 if not id_proof_photo_path:
                     flash('Error saving ID proof photo', 'error')
-                    return render_template('add_tenant.html')
+                    return add_tenant_form()
             
             # Create user
             user = User(
                 name=name,
                 email=email,
                 phone=phone,
-                room_number=room_number,
+                room_number=room.number,
+                room_id=room.id,
+                property_id=room.property_id,
                 monthly_rent=monthly_rent,
                 profile_photo=profile_photo_path,
                 id_proof_photo=id_proof_photo_path,
@@ -209,7 +899,10 @@ def add_tenant():
             )
             user.set_password(password)
             db.session.add(user)
+            search_index.index_tenant(user)
+            bump_versions(TENANTS)
             db.session.commit()
+            invalidate_dashboard_stats()
             flash(f'Tenant {name} added successfully!', 'success')
             return redirect(url_for('view_tenants'))
         except ValueError as e:
@@ -218,107 +911,130 @@ def add_tenant():
             flash(f'Error adding tenant: {str(e)}', 'error')
             db.session.rollback()
     
-    return render_template('add_tenant.html')
+    return add_tenant_form()
 
 @app.route('/admin/tenants')
 @admin_required
+@conditional_get(lambda: [TENANTS, PROPERTIES])
 def view_tenants():
-    tenants = User.query.order_by(User.created_at.desc()).all()
-    return render_template('tenants.html', tenants=tenants)
+    # The table rows are rendered once per change to the tenant list
+    tenant_rows = fragment_cache.get_or_render(
+        f'tenant_rows:{g.property_id}', g.data_versions[TENANTS][0],
+        lambda: render_template('_tenant_rows.html', tenants=User.query.filter(property_scope(User))
+                                .order_by(User.created_at.desc()).all()).strip()
+    )
+    return render_template('tenants.html', tenant_rows=Markup(tenant_rows))
 
 @app.route('/admin/tenant/<int:tenant_id>')
 @admin_required
+@conditional_get(lambda: [tenant_key(request.view_args['tenant_id']), PROPERTIES])
 def tenant_detail(tenant_id):
     tenant = User.query.get_or_404(tenant_id)
-    payments = Payment.query.filter_by(tenant_id=tenant_id).order_by(Payment.created_at.desc()).all()
-    return render_template('tenant_detail.html', tenant=tenant, payments=payments)
+    payments = Payment.query.filter(Payment.tenant_id == tenant_id, Payment.status != 'discarded').order_by(
+        Payment.created_at.desc()).all()
+    return render_template('tenant_detail.html', tenant=tenant, payments=payments,
+                           has_archived=has_archived(ArchivedPayment, tenant_id))
+
+@app.route('/admin/tenant/<int:tenant_id>/payments/archived')
+@admin_required
+@conditional_get(lambda: [tenant_key(request.view_args['tenant_id'])])
+def tenant_detail_archive(tenant_id):
+    return archived_page(ArchivedPayment, tenant_id, '_archived_payment_rows.html')
+
+def import_result_file(token):
+    return os.path.join(app.config['IMPORT_PATH'], f'{token}.result.json')
+
+@app.route('/admin/import', methods=['GET', 'POST'])
+@admin_required
+def admin_import():
+    if request.method == 'POST':
+        kind = request.form.get('kind')
+        upload = request.files.get('file')
+        
+        if kind not in ('tenants', 'payments') or not upload or not upload.filename:
+            flash('Please choose what to import and a CSV or JSON file', 'error')
+            return render_template('admin_import.html', result=None)
+        
+        # Imports hash passwords in worker processes, so they run on the job queue, not in the request
+        token = secrets.token_hex(16)
+        path = os.path.join(app.config['IMPORT_PATH'], f'{token}.upload')
+        os.makedirs(app.config['IMPORT_PATH'], exist_ok=True)
+        upload.save(path)
+        scheduler.enqueue('import', {'token': token, 'kind': kind, 'path': path, 'filename': upload.filename,
+                                     'property_id': g.property_id})
+        flash(f'Importing {kind} in the background; this page shows the result when it is done', 'success')
+        return redirect(url_for('admin_import', job=token, kind=kind))
+    
+    token = request.args.get('job', '')
+    if not (len(token) == 32 and all(c in '0123456789abcdef' for c in token)):
+        return render_template('admin_import.html', result=None)
+    try:
+        with open(import_result_file(token)) as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        return render_template('admin_import.html', result=None, pending=True)
+    return render_template('admin_import.html', result=result, kind=request.args.get('kind'))
+
+@app.route('/admin/export/<kind>')
+@admin_required
+def admin_export(kind):
+    if kind not in EXPORTS:
+        return redirect(url_for('admin_import'))
+    if request.args.get('format') == 'json':
+        chunks, mimetype, extension = export_json(kind, g.property_id), 'application/x-ndjson', 'jsonl'
+    else:
+        chunks, mimetype, extension = export_csv(kind, g.property_id), 'text/csv', 'csv'
+    # Rows are streamed as they are read, so memory use doesn't grow with the table
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={kind}.{extension}'})
 
 @app.route('/admin/payments')
 @admin_required
 def view_payments():
     status_filter = request.args.get('status', 'all')
-    query = Payment.query
+    per_page = get_page_size()
+    # Live updates start from the newest event this page already reflects (first page only)
+    feed_cursor = admin_feed.latest_id() if not request.args.get('cursor') else None
+    # Load the tenant in the same query so the template doesn't issue one lookup per row
+    query = Payment.query.options(joinedload(Payment.tenant)).filter(
+        property_scope(Payment), Payment.status != 'discarded')
     
     if status_filter == 'pending':
         query = query.filter_by(status='pending')
     elif status_filter == 'approved':
         query = query.filter_by(status='approved')
+    elif status_filter == 'duplicates':
+        query = query.join(PaymentDuplicate, PaymentDuplicate.payment_id == Payment.id).filter(
+            PaymentDuplicate.dismissed == False)
     
-    payments = query.order_by(Payment.created_at.desc()).all()
-    return render_template('admin_payments.html', payments=payments, status_filter=status_filter)
+    payments, next_cursor = keyset_paginate(query, Payment, request.args.get('cursor'), per_page)
+    duplicates = duplicate_flags([payment.id for payment in payments])
+    # "Approve all" only covers payments that existed when the page was rendered
+    latest_payment_id = None
+    if status_filter == 'pending':
+        latest_payment_id = db.session.execute(select(func.max(Payment.id))).scalar()
+    return render_template('admin_payments.html', payments=payments, status_filter=status_filter,
+                           next_cursor=next_cursor, per_page=per_page, latest_payment_id=latest_payment_id,
+                           duplicates=duplicates, duplicate_reasons=DUPLICATE_REASONS, feed_cursor=feed_cursor)
 
 @app.route('/admin/monthly-payment-status', methods=['GET', 'POST'])
 @admin_required
 def admin_monthly_payment_status():
     # Month options consistent with tenant payment form
-    month_options = [
-        'January', 'February', 'March', 'April', 'May', 'June',
-        'July', 'August', 'September', 'October', 'November', 'December'
-    ]
+    month_options = MONTH_NAMES
     current_year = datetime.utcnow().year
     year_options = list(range(current_year - 2, current_year + 6))  # e.g., 2023-2030 rolling window
 
     selected_month = request.args.get('month') or request.form.get('month') or month_options[0]
     selected_year = int(request.args.get('year') or request.form.get('year') or current_year)
 
-    # Map month name to month number
-    month_to_num = {name: idx for idx, name in enumerate(month_options, start=1)}
-    selected_month_num = month_to_num.get(selected_month, 1)
+    selected_month_num = MONTH_NUMBERS.get(selected_month, 1)
+    month_end = end_of_month(selected_year, selected_month_num)
 
-    # End of selected month for join-date filtering
-    next_month = selected_month_num % 12 + 1
-    next_month_year = selected_year + (1 if selected_month_num == 12 else 0)
-    month_end = datetime(next_month_year, next_month, 1, tzinfo=timezone.utc) - timedelta(seconds=1)
+    rows = db.session.execute(monthly_status_query(selected_year, selected_month_num, month_end, g.property_id)).all()
 
-    # Only consider tenants who joined on or before end of selected month
-    tenants = (
-        User.query
-        .filter(User.created_at <= month_end)
-        .order_by(User.name.asc())
-        .all()
-    )
-
-    # Fetch payments for selected month/year
-    payments_for_month = (
-        Payment.query
-        .filter(
-            Payment.month == selected_month,
-            Payment.payment_date.between(
-                datetime(selected_year, selected_month_num, 1).date(),
-                month_end.date()
-            )
-        )
-        .order_by(Payment.created_at.desc())
-        .all()
-    )
-
-    # Track latest approved and pending payments per tenant for the selected period
-    latest_approved = {}
-    latest_pending = {}
-    for payment in payments_for_month:
-        if payment.status == 'approved' and payment.tenant_id not in latest_approved:
-            latest_approved[payment.tenant_id] = payment
-        elif payment.status == 'pending' and payment.tenant_id not in latest_pending:
-            latest_pending[payment.tenant_id] = payment
-
-    paid_tenants = []
-    pending_tenants = []
-
-    for tenant in tenants:
-        if tenant.id in latest_approved:
-            paid_tenants.append({
-                'tenant': tenant,
-                'payment': latest_approved[tenant.id],
-                'status_label': 'Paid'
-            })
-        else:
-            pending_payment = latest_pending.get(tenant.id)
-            status_label = 'Pending Approval' if pending_payment else 'Not Paid'
-            pending_tenants.append({
-                'tenant': tenant,
-                'payment': pending_payment,
-                'status_label': status_label
-            })
+    paid_tenants = [row for row in rows if row.status_label == 'Paid']
+    pending_tenants = [row for row in rows if row.status_label != 'Paid']
 
     return render_template(
         'admin_monthly_status.html',
@@ -330,15 +1046,206 @@ def admin_monthly_payment_status():
         pending_tenants=pending_tenants
     )
 
+@app.route('/admin/reports')
+@admin_required
+def admin_reports():
+    today = datetime.utcnow()
+    current = (today.year, today.month)
+    default_start = ((today.year * 12 + today.month - REPORT_MONTHS) // 12,
+                     (today.month - REPORT_MONTHS) % 12 + 1)
+    start = parse_report_month(request.args.get('start'), default_start)
+    end = parse_report_month(request.args.get('end'), current)
+    if start > end:
+        start, end = end, start
+    if (end[0] - start[0]) * 12 + end[1] - start[1] >= MAX_REPORT_MONTHS:
+        flash(f'Reports cover at most {MAX_REPORT_MONTHS} months', 'error')
+        start = ((end[0] * 12 + end[1] - MAX_REPORT_MONTHS) // 12, (end[1] - MAX_REPORT_MONTHS) % 12 + 1)
+    
+    version = get_versions([PAST_REVENUE])[PAST_REVENUE][0]
+    months = revenue_analytics.monthly(start, end, version=version, property_id=g.property_id)
+    arrears = revenue_analytics.arrears(start, end, version=version, property_id=g.property_id)
+    in_arrears = [row for row in arrears if row['arrears'] > 0]
+    totals = {
+        'expected': round(sum(month['expected'] for month in months), 2),
+        'collected': round(sum(month['collected'] for month in months), 2),
+        'pending': round(sum(month['pending'] for month in months), 2),
+        'arrears': round(sum(row['arrears'] for row in in_arrears), 2),
+        'tenants_in_arrears': len(in_arrears),
+    }
+    return render_template('admin_reports.html',
+                           start=f'{start[0]:04d}-{start[1]:02d}', end=f'{end[0]:04d}-{end[1]:02d}',
+                           months=months, totals=totals,
+                           arrears=in_arrears[:REPORT_ARREARS_ROWS])
+
+@app.route('/admin/search')
+@admin_required
+def admin_search():
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind') if request.args.get('kind') in SEARCH_KINDS else None
+    results = search_index.search(query, kind, g.property_id) if query else []
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'query': query, 'kind': kind, 'results': results})
+    return render_template('admin_search.html', query=query, kind=kind, kinds=SEARCH_KINDS,
+                           results=results)
+
 @app.route('/admin/approve_payment/<int:payment_id>', methods=['POST'])
 @admin_required
 def approve_payment(payment_id):
     payment = Payment.query.get_or_404(payment_id)
+    flag = duplicate_flags([payment.id]).get(payment.id)
+    if flag:
+        if not request.form.get('confirm_duplicate'):
+            flash(f'Payment #{payment.id} looks like a duplicate of #{flag.duplicate_of_id}; '
+                  'confirm to approve it anyway', 'error')
+            return redirect(url_for('view_payments', status='duplicates'))
+        # Approving it anyway means the admin has checked it is genuine
+        flag.dismissed = True
     payment.status = 'approved'
+    update_ledger_for_payment(payment)
+    bump_versions(*payment_version_keys(payment))
+    admin_feed.record('payment', 'approved', [(payment.id, payment.property_id)])
     db.session.commit()
+    admin_feed.notify()
+    invalidate_dashboard_stats()
     flash('Payment approved successfully!', 'success')
     return redirect(url_for('view_payments', status='pending'))
 
+@app.route('/admin/payments/approve', methods=['POST'])
+@admin_required
+def approve_payments_bulk():
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    requested_ids = None
+    
+    if request.form.get('scope') == 'all_pending':
+        up_to_id = request.form.get('up_to_id', type=int)
+        if not up_to_id:
+            flash('Nothing to approve', 'error')
+            return redirect(url_for('view_payments', status='pending'))
+        # Only the property whose pending list the admin was looking at
+        condition = and_(Payment.id <= up_to_id, property_scope(Payment))
+    else:
+        requested_ids = sorted({int(value) for value in request.form.getlist('payment_ids') if value.isdigit()})
+        if not requested_ids:
+            flash('Select at least one payment to approve', 'error')
+            return redirect(url_for('view_payments', status='pending'))
+        condition = Payment.id.in_(requested_ids)
+    
+    try:
+        # Flagged duplicates are only approved one at a time, after a check
+        changed = approve_pending_payments(and_(condition, ~open_flag()))
+        tenant_ids = sorted({row.tenant_id for row in changed})
+        # Only the tenant-months these payments count towards
+        periods = set()
+        for row in changed:
+            period = ledger_period(row.month, row.payment_date)
+            if period:
+                periods.add((row.tenant_id,) + period)
+        refresh_ledger_entries(periods)
+        bump_versions(PAST_REVENUE, *(tenant_key(tenant_id) for tenant_id in tenant_ids))
+        admin_feed.record('payment', 'approved', [(row.id, row.property_id) for row in changed])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if wants_json:
+            return jsonify({'error': str(e)}), 500
+        flash(f'Error approving payments: {str(e)}', 'error')
+        return redirect(url_for('view_payments', status='pending'))
+    admin_feed.notify()
+    invalidate_dashboard_stats()
+    
+    approved_ids = {row.id for row in changed}
+    results = {payment_id: 'approved' for payment_id in sorted(approved_ids)}
+    if requested_ids is not None:
+        existing_ids = set(db.session.execute(
+            select(Payment.id).where(Payment.id.in_(requested_ids))
+        ).scalars())
+        flagged_ids = set(duplicate_flags(requested_ids))
+        for payment_id in requested_ids:
+            if payment_id in flagged_ids:
+                results[payment_id] = 'duplicate'
+            elif payment_id not in approved_ids:
+                results[payment_id] = 'already_approved' if payment_id in existing_ids else 'not_found'
+    
+    if wants_json:
+        return jsonify({
+            'updated': len(approved_ids),
+            'results': [{'id': payment_id, 'result': result} for payment_id, result in results.items()],
+        })
+    
+    skipped = len(results) - len(approved_ids)
+    message = f"Approved {len(approved_ids)} payment{'' if len(approved_ids) == 1 else 's'}"
+    if skipped:
+        message += f' ({skipped} were already approved, no longer exist or are flagged as duplicates)'
+    flash(message, 'success' if approved_ids else 'error')
+    return redirect(url_for('view_payments', status='pending'))
+
+@app.route('/admin/payments/<int:payment_id>/not-duplicate', methods=['POST'])
+@admin_required
+def dismiss_duplicate(payment_id):
+    flag = PaymentDuplicate.query.get_or_404(payment_id)
+    flag.dismissed = True
+    property_id = db.session.execute(select(Payment.property_id).where(Payment.id == payment_id)).scalar()
+    admin_feed.record('payment', 'updated', [(payment_id, property_id)])
+    db.session.commit()
+    admin_feed.notify()
+    flash(f'Payment #{payment_id} is no longer flagged as a duplicate', 'success')
+    return redirect(url_for('view_payments', status='duplicates'))
+
+@app.route('/admin/payments/<int:payment_id>/discard', methods=['POST'])
+@admin_required
+def discard_duplicate(payment_id):
+    """Discard a flagged duplicate so it no longer counts towards the ledger and reports.
+
+    The row stays (as status 'discarded') so its id is never reused; see archive.py.
+    """
+    flag = PaymentDuplicate.query.get_or_404(payment_id)
+    if flag.dismissed:
+        flash('Only payments flagged as duplicates can be discarded', 'error')
+        return redirect(url_for('view_payments', status='duplicates'))
+    payment = Payment.query.get_or_404(payment_id)
+    try:
+        keys = payment_version_keys(payment)
+        PaymentDuplicate.query.filter(
+            (PaymentDuplicate.payment_id == payment_id) | (PaymentDuplicate.duplicate_of_id == payment_id)
+        ).delete(synchronize_session=False)
+        search_index.remove('payment', payment_id)
+        proof = payment.payment_proof
+        payment.status = 'discarded'
+        payment.payment_proof = None
+        update_ledger_for_payment(payment)
+        bump_versions(*keys)
+        admin_feed.record('payment', 'discarded', [(payment_id, payment.property_id)])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error discarding payment: {str(e)}', 'error')
+        return redirect(url_for('view_payments', status='duplicates'))
+    # Uploads are content-addressed: a repeat submission often shares the original's file
+    if proof and not db.session.execute(
+            select(Payment.id).where(Payment.payment_proof == proof).limit(1)).first():
+        upload_store.delete(proof)
+    admin_feed.notify()
+    invalidate_dashboard_stats()
+    flash(f'Discarded duplicate payment #{payment_id}', 'success')
+    return redirect(url_for('view_payments', status='duplicates'))
+
+@app.route('/admin/profiling')
+@admin_required
+def admin_profiling():
+    return render_template('admin_profiling.html',
+                           enabled=app.config['PROFILING_ENABLED'],
+                           summary=profiler.summary(),
+                           profiles=profiler.recent()[:100])
+
+@app.route('/admin/profiling.json')
+@admin_required
+def admin_profiling_json():
+    return jsonify({
+        'enabled': app.config['PROFILING_ENABLED'],
+        'summary': profiler.summary(),
+        'requests': profiler.recent(),
+    })
+
 # Tenant Routes
 @app.route('/tenant/login', methods=['GET', 'POST'])
 def tenant_login():
@@ -350,9 +1257,23 @@ def tenant_login():
             flash('Please fill all fields', 'error')
             return render_template('tenant_login.html')
         
+        account = f'tenant:{email.lower()}'
+        retry_after = login_retry_after(account)
+        if retry_after:
+            flash(f'Too many failed login attempts. Try again in {retry_after} seconds.', 'error')
+            return render_template('tenant_login.html'), 429, {'Retry-After': str(retry_after)}
+        
         user = User.query.filter_by(email=email).first()
         
-        if user and user.check_password(password):
+        try:
+            valid = check_login(user, password)
+        except PasswordHasherBusy:
+            flash('Server is busy, please try again in a moment', 'error')
+            return render_template('tenant_login.html'), 503
+        record_login_attempt(account, valid)
+        
+        if valid:
+            start_session()
             session['tenant_id'] = user.id
             session['tenant_name'] = user.name
             flash('Login successful!', 'success')
@@ -372,35 +1293,36 @@ def tenant_logout():
 @app.route('/tenant/dashboard')
 @tenant_required
 def tenant_dashboard():
-    tenant_id = session['tenant_id']
-    tenant = User.query.get(tenant_id)
-    recent_payments = Payment.query.filter_by(tenant_id=tenant_id).order_by(Payment.created_at.desc()).limit(5).all()
+    tenant_id = g.tenant_id
+    tenant = current_tenant()
+    recent_payments = Payment.query.filter(Payment.tenant_id == tenant_id, Payment.status != 'discarded').order_by(
+        Payment.created_at.desc()).limit(5).all()
     pending_count = Payment.query.filter_by(tenant_id=tenant_id, status='pending').count()
-    pending_complaints = Complaint.query.filter_by(tenant_id=tenant_id, status='pending').count()
+    open_complaints = Complaint.query.filter(Complaint.tenant_id == tenant_id, Complaint.status != 'resolved').count()
     
     return render_template('tenant_dashboard.html',
                          tenant=tenant,
                          recent_payments=recent_payments,
                          pending_count=pending_count,
-                         pending_complaints=pending_complaints)
+                         open_complaints=open_complaints)
 
 @app.route('/tenant/profile')
 @tenant_required
 def tenant_profile():
-    tenant_id = session['tenant_id']
-    tenant = User.query.get(tenant_id)
+    # The profile shows every column, so it loads the full record
+    tenant = User.query.get(g.tenant_id)
     return render_template('tenant_profile.html', tenant=tenant)
 
 @app.route('/tenant/add_payment', methods=['GET', 'POST'])
 @tenant_required
 def add_payment():
-    tenant_id = session['tenant_id']
-    tenant = User.query.get(tenant_id)
+    tenant_id = g.tenant_id
+    tenant = current_tenant()
     
     if request.method == 'POST':
         month = request.form.get('month')
         amount = request.form.get('amount')
-        transaction_id = request.form.get('transaction_id')
+        transaction_id = (request.form.get('transaction_id') or '').strip()
         payment_date = request.form.get('payment_date')
         payment_proof_file = request.files.get('payment_proof')
         
@@ -425,8 +1347,17 @@ def add_payment():
             amount = float(amount)
             payment_date_obj = datetime.strptime(payment_date, '%Y-%m-%d').date()
             
+            duplicate = find_duplicate(tenant_id, month, amount, payment_date_obj, transaction_id)
+            if duplicate:
+                if duplicate[1] == 'transaction_id':
+                    flash(f'Transaction ID {transaction_id} has already been submitted', 'error')
+                else:
+                    flash(f'You have already submitted ₹{amount:.2f} for {month} {payment_date_obj.year}', 'error')
+                return render_template('add_payment.html', tenant=tenant)
+            
             payment = Payment(
                 tenant_id=tenant_id,
+                property_id=tenant.property_id,
                 month=month,
                 amount=amount,
                 payment_date=payment_date_obj,
@@ -435,7 +1366,13 @@ def add_payment():
                 status='pending'
             )
             db.session.add(payment)
+            update_ledger_for_payment(payment)
+            search_index.index_payment(payment)
+            bump_versions(*payment_version_keys(payment))
+            admin_feed.record('payment', 'created', [(payment.id, payment.property_id)])
             db.session.commit()
+            admin_feed.notify()
+            invalidate_dashboard_stats()
             flash('Payment submitted successfully! Waiting for approval.', 'success')
             return redirect(url_for('tenant_payment_history'))
         except ValueError:
@@ -448,21 +1385,48 @@ def add_payment():
 
 @app.route('/tenant/payments')
 @tenant_required
+@conditional_get(lambda: [tenant_key(g.tenant_id)])
 def tenant_payment_history():
-    tenant_id = session['tenant_id']
-    payments = Payment.query.filter_by(tenant_id=tenant_id).order_by(Payment.created_at.desc()).all()
-    return render_template('tenant_payments.html', payments=payments)
+    tenant_id = g.tenant_id
+    payments = Payment.query.filter(Payment.tenant_id == tenant_id, Payment.status != 'discarded').order_by(
+        Payment.created_at.desc()).all()
+    return render_template('tenant_payments.html', payments=payments,
+                           has_archived=has_archived(ArchivedPayment, tenant_id))
+
+@app.route('/tenant/payments/archived')
+@tenant_required
+@conditional_get(lambda: [tenant_key(g.tenant_id)])
+def tenant_payment_archive():
+    return archived_page(ArchivedPayment, g.tenant_id, '_archived_payment_rows.html', show_submitted=True)
+
+@app.route('/payments/<int:payment_id>/archived-proof')
+def archived_payment_proof(payment_id):
+    """Proof of an archived payment, read from its pack, for admins and the tenant who paid"""
+    if 'admin_id' not in session and 'tenant_id' not in session:
+        return redirect(url_for('index'))
+    payment = ArchivedPayment.query.get_or_404(payment_id)
+    if 'admin_id' not in session and payment.tenant_id != session['tenant_id']:
+        return 'Not found', 404
+    content = archiver.read_proof(payment)
+    if content is None:
+        return 'Not found', 404
+    response = Response(content, mimetype=mimetypes.guess_type(payment.payment_proof)[0] or 'application/octet-stream')
+    # Archived proofs never change
+    response.cache_control.private = True
+    response.cache_control.max_age = app.config['STATIC_CACHE_MAX_AGE']
+    return response
 
 # Tenant Complaint Routes
 @app.route('/tenant/complaint/new', methods=['GET', 'POST'])
 @tenant_required
 def raise_complaint():
-    tenant_id = session['tenant_id']
-    tenant = User.query.get(tenant_id)
+    tenant_id = g.tenant_id
+    tenant = current_tenant()
     
     if request.method == 'POST':
         subject = request.form.get('subject')
         description = request.form.get('description')
+        category = request.form.get('category')
         
         if not subject or not description:
             flash('Please fill all fields', 'error')
@@ -472,15 +1436,26 @@ def raise_complaint():
             flash('Subject and description cannot be empty', 'error')
             return render_template('raise_complaint.html', tenant=tenant)
         
+        if category not in COMPLAINT_CATEGORIES:
+            flash('Please choose a category', 'error')
+            return render_template('raise_complaint.html', tenant=tenant)
+        
         try:
             complaint = Complaint(
                 tenant_id=tenant_id,
+                property_id=tenant.property_id,
                 subject=subject.strip(),
                 description=description.strip(),
-                status='pending'
+                status='pending',
+                **new_complaint_fields(category)
             )
             db.session.add(complaint)
+            search_index.index_complaint(complaint)
+            bump_versions(tenant_key(tenant_id))
+            admin_feed.record('complaint', 'created', [(complaint.id, complaint.property_id)])
             db.session.commit()
+            admin_feed.notify()
+            invalidate_dashboard_stats()
             flash('Complaint raised successfully!', 'success')
             return redirect(url_for('tenant_complaints'))
         except Exception as e:
@@ -491,41 +1466,612 @@ def raise_complaint():
 
 @app.route('/tenant/complaints')
 @tenant_required
+@conditional_get(lambda: [tenant_key(g.tenant_id)])
 def tenant_complaints():
-    tenant_id = session['tenant_id']
+    tenant_id = g.tenant_id
     complaints = Complaint.query.filter_by(tenant_id=tenant_id).order_by(Complaint.created_at.desc()).all()
-    return render_template('tenant_complaints.html', complaints=complaints)
+    return render_template('tenant_complaints.html', complaints=complaints,
+                           has_archived=has_archived(ArchivedComplaint, tenant_id))
+
+@app.route('/tenant/complaint/<int:complaint_id>/reopen', methods=['POST'])
+@tenant_required
+def reopen_complaint(complaint_id):
+    complaint = Complaint.query.filter_by(id=complaint_id, tenant_id=g.tenant_id).first_or_404()
+    
+    try:
+        transition(complaint, 'reopened')
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('tenant_complaints'))
+    bump_versions(tenant_key(complaint.tenant_id))
+    admin_feed.record('complaint', 'reopened', [(complaint.id, complaint.property_id)])
+    db.session.commit()
+    admin_feed.notify()
+    invalidate_dashboard_stats()
+    flash('Complaint reopened', 'success')
+    return redirect(url_for('tenant_complaints'))
+
+@app.route('/tenant/complaints/archived')
+@tenant_required
+@conditional_get(lambda: [tenant_key(g.tenant_id)])
+def tenant_complaint_archive():
+    return archived_page(ArchivedComplaint, g.tenant_id, '_archived_complaint_rows.html')
 
 # Admin Complaint Routes
 @app.route('/admin/complaints')
 @admin_required
 def admin_complaints():
-    status_filter = request.args.get('status', 'all')
-    query = Complaint.query
+    status_filter = request.args.get('status', 'queue')
+    per_page = get_page_size()
+    feed_cursor = admin_feed.latest_id() if not request.args.get('cursor') else None
     
-    if status_filter == 'pending':
-        query = query.filter_by(status='pending')
-    elif status_filter == 'resolved':
-        query = query.filter_by(status='resolved')
+    if status_filter == 'queue':
+        # Unresolved complaints by SLA deadline, read in order from ix_complaints_sla_queue
+        query = sla_queue(g.get('property_id'))
+        key, descending = 'due_at', False
+    else:
+        query = Complaint.query.filter(property_scope(Complaint))
+        key, descending = 'created_at', True
+        if status_filter in COMPLAINT_STATUSES:
+            query = query.filter_by(status=status_filter)
+    # Load the tenant in the same query so the template doesn't issue one lookup per row
+    query = query.options(joinedload(Complaint.tenant))
     
-    complaints = query.order_by(Complaint.created_at.desc()).all()
-    return render_template('admin_complaints.html', complaints=complaints, status_filter=status_filter)
+    complaints, next_cursor = keyset_paginate(query, Complaint, request.args.get('cursor'), per_page,
+                                              key=key, descending=descending)
+    return render_template('admin_complaints.html', complaints=complaints, status_filter=status_filter,
+                           next_cursor=next_cursor, per_page=per_page, feed_cursor=feed_cursor,
+                           stats=category_stats(g.get('property_id')))
+
+def apply_complaint_transition(complaint, status):
+    """Move a complaint through the workflow and queue its feed event; the caller commits"""
+    transition(complaint, status)
+    bump_versions(tenant_key(complaint.tenant_id))
+    admin_feed.record('complaint', status, [(complaint.id, complaint.property_id)])
 
 @app.route('/admin/complaint/resolve/<int:complaint_id>', methods=['POST'])
 @admin_required
 def resolve_complaint(complaint_id):
     complaint = Complaint.query.get_or_404(complaint_id)
     
-    if complaint.status == 'pending':
-        complaint.status = 'resolved'
-        complaint.resolved_at = datetime.utcnow()
+    if complaint.status != 'resolved':
+        apply_complaint_transition(complaint, 'resolved')
         db.session.commit()
+        admin_feed.notify()
+        invalidate_dashboard_stats()
         flash('Complaint resolved successfully!', 'success')
     else:
         flash('Complaint is already resolved', 'error')
     
-    return redirect(url_for('admin_complaints', status='pending'))
+    return redirect(url_for('admin_complaints', status=request.args.get('status', 'queue')))
+
+@app.route('/admin/complaint/<int:complaint_id>/update', methods=['POST'])
+@admin_required
+def update_complaint(complaint_id):
+    """Change a complaint's status, assignee or priority from the complaints list"""
+    complaint = Complaint.query.get_or_404(complaint_id)
+    status = request.form.get('status') or complaint.status
+    priority = request.form.get('priority', type=int)
+    assigned_to = request.form.get('assigned_to')
+    back = redirect(url_for('admin_complaints', status=request.args.get('status', 'queue')))
+    
+    if assigned_to is not None:
+        assigned_to = assigned_to.strip()[:100] or None
+        if status == 'assigned' and not assigned_to:
+            flash('Enter who the complaint is assigned to', 'error')
+            return back
+        complaint.assigned_to = assigned_to
+    try:
+        if priority and priority != complaint.priority:
+            set_priority(complaint, priority)
+        if status != complaint.status:
+            apply_complaint_transition(complaint, status)
+        elif db.session.is_modified(complaint):
+            bump_versions(tenant_key(complaint.tenant_id))
+            admin_feed.record('complaint', 'updated', [(complaint.id, complaint.property_id)])
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+        return back
+    
+    db.session.commit()
+    admin_feed.notify()
+    invalidate_dashboard_stats()
+    flash('Complaint updated', 'success')
+    return back
+
+FEED_VIEWS = {'payments': 'payment', 'complaints': 'complaint'}
+
+def feed_operation(view, status_filter, event):
+    """What an open admin list does with a changed row: insert, replace, remove, or None to ignore it"""
+    if event.action == 'discarded':
+        return 'remove'
+    if view == 'complaints' and status_filter != 'all':
+        if event.action == 'updated':
+            return 'replace'
+        # Complaint events are named after the status the complaint moved to
+        status = 'pending' if event.action == 'created' else event.action
+        listed = status != 'resolved' if status_filter == 'queue' else status == status_filter
+        return 'insert' if listed else 'remove'
+    if event.action == 'created':
+        # New rows are pending, and belong at the top of the newest-first list
+        return 'insert' if status_filter in ('all', 'pending') else None
+    if view == 'payments' and status_filter == 'duplicates':
+        return 'remove'
+    if status_filter == 'pending':
+        return 'remove'
+    return 'replace'
+
+def render_feed_rows(view, status_filter, ids):
+    """Table rows for the given payments or complaints, keyed by id, from one query"""
+    if view == 'payments':
+        payments = Payment.query.options(joinedload(Payment.tenant)).filter(Payment.id.in_(ids)).all()
+        duplicates = duplicate_flags([payment.id for payment in payments])
+        return {payment.id: render_template('_payment_row.html', payment=payment, status_filter=status_filter,
+                                            duplicate=duplicates.get(payment.id),
+                                            duplicate_reasons=DUPLICATE_REASONS)
+                for payment in payments}
+    complaints = Complaint.query.options(joinedload(Complaint.tenant)).filter(Complaint.id.in_(ids)).all()
+    return {complaint.id: render_template('_complaint_row.html', complaint=complaint, status_filter=status_filter)
+            for complaint in complaints}
+
+@app.route('/admin/events')
+@admin_required
+def admin_events():
+    """Server-sent events keeping an open payments or complaints list up to date.
+
+    A stream stays open for FEED_STREAM_TIMEOUT seconds and the browser then
+    reconnects, resuming from the last event id it saw. Past the per-process
+    stream limit, the response carries any pending changes and closes, and
+    the browser polls again after FEED_RETRY seconds.
+    """
+    view = request.args.get('view')
+    if view not in FEED_VIEWS:
+        return 'Unknown view', 404
+    status_filter = request.args.get('status', 'all')
+    cursor = request.headers.get('Last-Event-ID', type=int)
+    if cursor is None:
+        cursor = request.args.get('cursor', type=int)
+    if cursor is None:
+        cursor = admin_feed.latest_id()
+    property_id = g.property_id
+    streaming = admin_feed.acquire_stream()
+    
+    def messages(cursor):
+        retry = 1000 if streaming else app.config['FEED_RETRY'] * 1000
+        yield f'retry: {retry}\n\n'
+        deadline = time.monotonic() + (app.config['FEED_STREAM_TIMEOUT'] if streaming else 0)
+        last_sent = time.monotonic()
+        while True:
+            seen = admin_feed.sequence
+            latest = admin_feed.since(cursor, property_id)
+            if latest:
+                events = [event for event in latest if event.kind == FEED_VIEWS[view]]
+                operations = [(event, feed_operation(view, status_filter, event)) for event in events]
+                rows = render_feed_rows(view, status_filter,
+                                        [event.ref_id for event, op in operations if op in ('insert', 'replace')])
+                chunk = []
+                for event, op in operations:
+                    if op is None or (op != 'remove' and event.ref_id not in rows):
+                        continue
+                    data = {'op': op, 'id': event.ref_id, 'html': rows.get(event.ref_id) if op != 'remove' else None}
+                    chunk.append(f'id: {event.id}\nevent: row\ndata: {json.dumps(data)}\n\n')
+                cursor = latest[-1].id
+                if not chunk or not chunk[-1].startswith(f'id: {cursor}\n'):
+                    # Move the browser's resume point past events this list ignores
+                    chunk.append(f'id: {cursor}\n\n')
+                last_sent = time.monotonic()
+                yield ''.join(chunk)
+                if len(latest) == admin_feed.batch_size:
+                    continue
+            # End the read transaction so the next poll sees other processes' commits
+            db.session.rollback()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            admin_feed.wait(seen, min(app.config['FEED_POLL_INTERVAL'], remaining))
+            if time.monotonic() - last_sent >= app.config['FEED_KEEPALIVE']:
+                last_sent = time.monotonic()
+                yield ': keepalive\n\n'
+    
+    response = Response(stream_with_context(messages(cursor)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    if streaming:
+        response.call_on_close(admin_feed.release_stream)
+    return response
+
+# JSON API (v1)
+# Lists take ?fields=a,b, ?cursor=... from the previous page's next_cursor,
+# ?per_page=N and the filters declared in api.py
+@app.errorhandler(api.ApiError)
+def handle_api_error(error):
+    return jsonify({'error': error.message}), error.status
+
+def api_required(role):
+    """Like admin_required/tenant_required, but answers 401 JSON instead of redirecting"""
+    from functools import wraps
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if f'{role}_id' not in session:
+                raise api.ApiError('Authentication required', 401)
+            setattr(g, f'{role}_id', session[f'{role}_id'])
+            if role == 'admin':
+                # The property picked in the navbar scopes the API as it does the pages
+                g.property_id = session.get('property_id')
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def api_login(account, user, password):
+    """Shared throttled password check for the API login endpoints"""
+    retry_after = login_retry_after(account)
+    if retry_after:
+        return jsonify({'error': 'Too many failed login attempts', 'retry_after': retry_after}), 429
+    try:
+        valid = check_login(user, password)
+    except PasswordHasherBusy:
+        raise api.ApiError('Server is busy, please try again in a moment', 503)
+    record_login_attempt(account, valid)
+    if not valid:
+        raise api.ApiError('Invalid credentials', 401)
+    start_session()
+    return None
+
+@app.route('/api/v1/admin/login', methods=['POST'])
+def api_admin_login():
+    body = request.get_json(silent=True) or {}
+    username, password = body.get('username'), body.get('password')
+    if not username or not password:
+        raise api.ApiError('username and password are required')
+    admin = Admin.query.filter_by(username=username).first()
+    error = api_login(f'admin:{username}', admin, password)
+    if error:
+        return error
+    session['admin_id'] = admin.id
+    session['admin_username'] = admin.username
+    return jsonify({'data': {'id': admin.id, 'username': admin.username}})
+
+@app.route('/api/v1/tenant/login', methods=['POST'])
+def api_tenant_login():
+    body = request.get_json(silent=True) or {}
+    email, password = body.get('email'), body.get('password')
+    if not email or not password:
+        raise api.ApiError('email and password are required')
+    user = User.query.filter_by(email=email).first()
+    error = api_login(f'tenant:{email.lower()}', user, password)
+    if error:
+        return error
+    session['tenant_id'] = user.id
+    session['tenant_name'] = user.name
+    return jsonify({'data': {'id': user.id, 'name': user.name}})
+
+@app.route('/api/v1/logout', methods=['POST'])
+def api_logout():
+    session.clear()
+    return jsonify({'data': None})
+
+@app.route('/api/v1/tenants')
+@api_required('admin')
+def api_tenants():
+    return jsonify(api.list_resource(api.TENANTS, request.args, get_page_size(), [property_scope(User)]))
+
+@app.route('/api/v1/tenants/<int:tenant_id>')
+@api_required('admin')
+def api_tenant(tenant_id):
+    body = api.get_resource(api.TENANTS, request.args, User.id == tenant_id)
+    if body is None:
+        raise api.ApiError('Tenant not found', 404)
+    return jsonify(body)
+
+@app.route('/api/v1/payments')
+@api_required('admin')
+def api_payments():
+    return jsonify(api.list_resource(api.PAYMENTS, request.args, get_page_size(),
+                                     [property_scope(Payment), Payment.status != 'discarded']))
+
+@app.route('/api/v1/complaints')
+@api_required('admin')
+def api_complaints():
+    return jsonify(api.list_resource(api.COMPLAINTS, request.args, get_page_size(),
+                                     [property_scope(Complaint)]))
+
+MONTHLY_STATUS_FILTERS = {'paid': 'Paid', 'pending': 'Pending Approval', 'unpaid': 'Not Paid'}
+
+@app.route('/api/v1/monthly-status')
+@api_required('admin')
+def api_monthly_status():
+    month = request.args.get('month', type=int) or MONTH_NUMBERS.get(request.args.get('month', ''))
+    year = request.args.get('year', type=int)
+    if not month or not 1 <= month <= 12 or not year:
+        raise api.ApiError('month (1-12 or a month name) and year are required')
+    
+    property_id = request.args.get('property_id', type=int)
+    if g.property_id and property_id not in (None, g.property_id):
+        # Outside the selected property, as the list endpoints' filters are
+        return jsonify({'data': [], 'next_cursor': None, 'year': year, 'month': month})
+    query = monthly_status_query(year, month, end_of_month(year, month), property_id or g.property_id)
+    columns = query.selected_columns
+    resource = api.Resource(User, {
+        'tenant_id': User.id,
+        'name': columns.name,
+        'room_number': columns.room_number,
+        'monthly_rent': columns.monthly_rent,
+        'amount': columns.amount,
+        'payment_date': columns.payment_date,
+        'transaction_id': columns.transaction_id,
+        'status': columns.status_label.element,
+    }, filters={}, order_by=[User.name, User.id], descending=False)
+    fields = api.select_fields(resource, request.args.get('fields'))
+    statement = query.with_only_columns(*[column.label(name) for name, column in fields]).order_by(None)
+    status = request.args.get('status')
+    if status:
+        if status not in MONTHLY_STATUS_FILTERS:
+            raise api.ApiError(f"status must be one of {', '.join(MONTHLY_STATUS_FILTERS)}")
+        statement = statement.where(columns.status_label.element == MONTHLY_STATUS_FILTERS[status])
+    data, next_cursor = api.fetch_page(statement, fields, resource.order_by, request.args.get('cursor'),
+                                       get_page_size(), descending=False)
+    return jsonify({'data': data, 'next_cursor': next_cursor, 'year': year, 'month': month})
+
+@app.route('/api/v1/me')
+@api_required('tenant')
+def api_me():
+    body = api.get_resource(api.TENANTS, request.args, User.id == g.tenant_id)
+    if body is None:
+        raise api.ApiError('Tenant not found', 404)
+    return jsonify(body)
+
+@app.route('/api/v1/me/payments')
+@api_required('tenant')
+def api_my_payments():
+    return jsonify(api.list_resource(api.PAYMENTS, request.args, get_page_size(),
+                                     [Payment.tenant_id == g.tenant_id, Payment.status != 'discarded']))
+
+@app.route('/api/v1/me/complaints')
+@api_required('tenant')
+def api_my_complaints():
+    return jsonify(api.list_resource(api.COMPLAINTS, request.args, get_page_size(),
+                                     [Complaint.tenant_id == g.tenant_id]))
+
+# Database maintenance commands
+def route_query_samples():
+    """Representative statements issued by each route, for query plan checks"""
+    sample_time = datetime(2025, 1, 31, 23, 59, 59)
+    sample_cursor = (sample_time, 1000)
+
+    def page(query, model):
+        return (query.filter(tuple_(model.created_at, model.id) < sample_cursor)
+                .order_by(model.created_at.desc(), model.id.desc())
+                .limit(PAGE_SIZE + 1))
+
+    history = payment_history()
+    return [
+        ('admin_login', Admin.query.filter_by(username='admin')),
+        ('admin_dashboard', dashboard_stats_query()),
+        ('view_tenants', User.query.order_by(User.created_at.desc())),
+        ('tenant_detail', Payment.query.filter(Payment.tenant_id == 1, Payment.status != 'discarded')
+         .order_by(Payment.created_at.desc())),
+        ('view_payments', page(Payment.query.options(joinedload(Payment.tenant))
+                               .filter(Payment.status != 'discarded'), Payment)),
+        ('view_payments?status=pending',
+         page(Payment.query.options(joinedload(Payment.tenant)).filter_by(status='pending'), Payment)),
+        ('add_payment (transaction id check)',
+         select(Payment.id).where(Payment.transaction_id == 'TXN1').order_by(Payment.id).limit(1)),
+        ('add_payment (same month check)',
+         select(Payment.id).where(Payment.tenant_id == 1, Payment.month == 'January',
+                                  Payment.payment_date.between(sample_time.date().replace(month=1, day=1),
+                                                               sample_time.date().replace(month=12, day=31)),
+                                  Payment.amount == 5000).order_by(Payment.id).limit(1)),
+        ('admin_monthly_payment_status', monthly_status_query(2025, 1, sample_time)),
+        ('tenant_login', User.query.filter_by(email='tenant@example.com')),
+        ('tenant_dashboard (recent payments)',
+         Payment.query.filter(Payment.tenant_id == 1, Payment.status != 'discarded')
+         .order_by(Payment.created_at.desc()).limit(5)),
+        ('tenant_dashboard (pending payments)',
+         select(func.count()).select_from(Payment).filter_by(tenant_id=1, status='pending')),
+        ('tenant_dashboard (open complaints)',
+         select(func.count()).select_from(Complaint).where(Complaint.tenant_id == 1, Complaint.status != 'resolved')),
+        ('tenant_payment_history', Payment.query.filter(Payment.tenant_id == 1, Payment.status != 'discarded')
+         .order_by(Payment.created_at.desc())),
+        ('tenant_complaints', Complaint.query.filter_by(tenant_id=1).order_by(Complaint.created_at.desc())),
+        ('admin_complaints', page(Complaint.query.options(joinedload(Complaint.tenant)), Complaint)),
+        ('admin_complaints?status=pending',
+         page(Complaint.query.options(joinedload(Complaint.tenant)).filter_by(status='pending'), Complaint)),
+        # The same pages with a property selected
+        ('admin_dashboard (one property)', dashboard_stats_query(1)),
+        ('view_tenants (one property)', User.query.filter(property_scope(User, 1)).order_by(User.created_at.desc())),
+        ('view_payments (one property)',
+         page(Payment.query.options(joinedload(Payment.tenant))
+              .filter(property_scope(Payment, 1), Payment.status != 'discarded'), Payment)),
+        ('view_payments?status=pending (one property)',
+         page(Payment.query.options(joinedload(Payment.tenant))
+              .filter(property_scope(Payment, 1)).filter_by(status='pending'), Payment)),
+        ('admin_monthly_payment_status (one property)', monthly_status_query(2025, 1, sample_time, 1)),
+        ('admin_complaints (one property)',
+         page(Complaint.query.options(joinedload(Complaint.tenant)).filter(property_scope(Complaint, 1)), Complaint)),
+        ('admin_events', admin_feed.since_query(1000, 1)),
+        # Complaint SLA queue, one page past a cursor
+        ('admin_complaints?status=queue',
+         sla_queue().options(joinedload(Complaint.tenant))
+         .filter(tuple_(Complaint.due_at, Complaint.id) > sample_cursor)
+         .order_by(Complaint.due_at, Complaint.id).limit(PAGE_SIZE + 1)),
+        ('admin_complaints?status=queue (one property)',
+         sla_queue(1).options(joinedload(Complaint.tenant))
+         .filter(tuple_(Complaint.due_at, Complaint.id) > sample_cursor)
+         .order_by(Complaint.due_at, Complaint.id).limit(PAGE_SIZE + 1)),
+        ('admin_complaints (category stats)',
+         select(ComplaintStat.category, func.sum(ComplaintStat.resolved))
+         .where(ComplaintStat.property_id == 1).group_by(ComplaintStat.category)),
+        # Archived history
+        ('tenant_payment_archive', page(ArchivedPayment.query.filter_by(tenant_id=1), ArchivedPayment)),
+        ('tenant_complaint_archive', page(ArchivedComplaint.query.filter_by(tenant_id=1), ArchivedComplaint)),
+        ('add_payment (archived transaction id check)',
+         select(ArchivedPayment.id).where(ArchivedPayment.transaction_id == 'TXN1').order_by(ArchivedPayment.id).limit(1)),
+        ('refresh_ledger_entry (archived month)',
+         select(history).where(history.c.tenant_id == 1, history.c.month == 'January',
+                               history.c.payment_date.between(sample_time.date().replace(day=1), sample_time.date()))),
+        ('approve_payments_bulk (ledger refresh)',
+         select(history).where(history.c.tenant_id.in_([1, 2]), history.c.month == 'January',
+                               history.c.payment_date.between(sample_time.date().replace(day=1), sample_time.date()))),
+        ('add_tenant (room occupancy)',
+         select(User.room_id, func.count(User.id)).where(User.room_id.in_([1, 2])).group_by(User.room_id)),
+        ('thumbnail-ready job (payment proof owners)',
+         select(Payment.tenant_id).where(Payment.payment_proof == 'uploads/payment_proofs/x.png').distinct()),
+    ]
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create or upgrade the database schema and the default admin (run once per deploy)"""
+    bootstrap()
+    click.echo('Database is ready.')
+
+@app.cli.command('compress-static')
+def compress_static_command():
+    """Write gzip copies of the CSS and JavaScript under static/ (run once per deploy)"""
+    click.echo(f'Compressed {static_assets.compress()} static files.')
+
+@app.cli.command('create-indexes')
+def create_indexes_command():
+    """Add missing indexes to an existing database"""
+    ensure_indexes()
+    click.echo('Indexes are up to date.')
+
+@app.cli.command('rebuild-ledger')
+def rebuild_ledger_command():
+    """Recompute the monthly ledger from payment history"""
+    written = rebuild_ledger()
+    click.echo(f'Rebuilt monthly ledger: {written} entries.')
+
+@app.cli.command('rebuild-complaint-stats')
+def rebuild_complaint_stats_command():
+    """Recompute the per-category complaint resolution statistics from complaint history"""
+    written = rebuild_complaint_stats()
+    click.echo(f'Rebuilt complaint statistics: {written} entries.')
+
+@app.cli.command('scan-duplicates')
+def scan_duplicates_command():
+    """Flag payments that repeat an earlier payment's transaction ID or tenant/month/amount"""
+    flagged = duplicate_scanner.scan()
+    click.echo(f'Flagged {flagged} duplicate payments.')
+
+@app.cli.command('archive')
+@click.option('--after-months', type=int, default=None,
+              help='Keep this many closed months live (default: ARCHIVE_AFTER_MONTHS)')
+def archive_command(after_months):
+    """Move old approved payments and resolved complaints to the archive tables"""
+    if after_months is not None:
+        archiver.after_months = after_months
+    payments, complaints = archiver.run()
+    click.echo(f'Archived {payments} payments and {complaints} complaints dated before {archiver.cutoff()}.')
+
+@app.cli.command('run-rent-cycle')
+@click.option('--month', 'period', help='YYYY-MM (default: the current month)')
+def run_rent_cycle_command(period):
+    """Create a month's rent dues and queue its reminders"""
+    today = datetime.utcnow()
+    year, month = parse_report_month(period, (today.year, today.month))
+    job_id = scheduler.enqueue('rent-cycle', {'year': year, 'month': month},
+                               unique_key=f'rent-cycle@{year}-{month:02d}')
+    if job_id is None:
+        raise click.ClickException(f'A rent cycle for {year}-{month:02d} is already queued')
+    click.echo(f'Queued rent cycle for {year}-{month:02d} (job {job_id}).')
+
+@app.cli.command('run-jobs')
+@click.option('--limit', type=int, default=None, help='Stop after this many jobs')
+def run_jobs_command(limit):
+    """Run due jobs in the foreground, e.g. from cron when JOB_WORKERS=0"""
+    scheduler.enqueue_due()
+    ran = scheduler.run_pending(app, limit)
+    click.echo(f'Ran {ran} jobs. Queue: {job_queue.stats()}')
+    for job_id, name, attempts, error, _ in job_queue.recent_failures(5):
+        click.echo(f'  failed job {job_id} ({name}, {attempts} attempts): {error}', err=True)
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Recreate the full-text search index from tenants, payments and complaints"""
+    if not search_index.available:
+        raise click.ClickException('Full-text search needs SQLite with FTS5; searches fall back to LIKE')
+    written = search_index.rebuild()
+    click.echo(f'Rebuilt search index: {written} entries.')
+
+def report_import(result):
+    """Print an import summary and its row errors"""
+    click.echo(f'Imported {result.imported} rows.')
+    for error in result.errors:
+        click.echo(f'  {error}', err=True)
+
+@app.cli.command('import-tenants')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--workers', type=int, default=None, help='Password hashing processes (default: CPU count)')
+@click.option('--property-id', type=int, default=None, help='Property for rows without a property column (default: the first)')
+def import_tenants_command(path, workers, property_id):
+    """Bulk-import tenants from a CSV, JSON or JSON Lines file"""
+    with open(path, 'rb') as f:
+        report_import(import_tenants(read_records(f, path), workers=workers, property_id=property_id))
+
+@app.cli.command('import-payments')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_payments_command(path):
+    """Bulk-import historical payments from a CSV, JSON or JSON Lines file"""
+    with open(path, 'rb') as f:
+        report_import(import_payments(read_records(f, path)))
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(list(EXPORTS)))
+@click.option('--format', 'export_format', type=click.Choice(['csv', 'json']), default='csv')
+@click.option('--output', '-o', type=click.File('w'), default='-')
+@click.option('--property-id', type=int, default=None, help='Export one property only (default: all)')
+def export_command(kind, export_format, output, property_id):
+    """Stream tenants, payments or complaints as CSV or JSON Lines"""
+    chunks = export_json(kind, property_id) if export_format == 'json' else export_csv(kind, property_id)
+    for chunk in chunks:
+        output.write(chunk)
+
+@app.cli.command('generate-thumbnails')
+def generate_thumbnails_command():
+    """Create thumbnails for uploads saved before thumbnails existed"""
+    created = upload_store.backfill_thumbnails(UPLOAD_SUBFOLDERS)
+    click.echo(f'Generated {created} thumbnails.')
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Show the query plan for each route and fail on full table scans"""
+    failures = 0
+    for label, plan, ok in check_query_plans(route_query_samples()):
+        status = {True: 'OK', False: 'FULL SCAN', None: 'UNCHECKED'}[ok]
+        click.echo(f'[{status}] {label}')
+        for detail in plan:
+            click.echo(f'    {detail}')
+        if ok is False:
+            failures += 1
+    if failures:
+        raise click.ClickException(f'{failures} route queries scan a whole table')
+
+@app.cli.command('revoke-sessions')
+@click.option('--tenant', 'tenant_email', help='Log out this tenant (by email)')
+@click.option('--admin', 'admin_username', help='Log out this admin (by username)')
+@click.option('--all', 'revoke_all', is_flag=True, help='Log out everyone')
+def revoke_sessions_command(tenant_email, admin_username, revoke_all):
+    """Delete server-side sessions so the affected users must log in again"""
+    if not session_interface:
+        raise click.ClickException('Sessions are stored in cookies (SESSION_BACKEND=cookie) and cannot be revoked')
+    if revoke_all:
+        predicate = lambda data: True
+    elif tenant_email:
+        tenant = User.query.filter_by(email=tenant_email).first()
+        if not tenant:
+            raise click.ClickException(f'No tenant with email {tenant_email}')
+        predicate = lambda data: data.get('tenant_id') == tenant.id
+    elif admin_username:
+        admin = Admin.query.filter_by(username=admin_username).first()
+        if not admin:
+            raise click.ClickException(f'No admin named {admin_username}')
+        predicate = lambda data: data.get('admin_id') == admin.id
+    else:
+        raise click.UsageError('Pass --tenant, --admin or --all')
+    click.echo(f'Revoked {session_interface.revoke(predicate)} sessions.')
 
 if __name__ == '__main__':
+    bootstrap()
     app.run(debug=True)
 
@@ -0,0 +1,189 @@
+import os
+import shutil
+import zipfile
+from datetime import date, datetime, time
+from sqlalchemy import select, delete, func, union_all, exists, or_
+from models import db, Payment, PaymentDuplicate, Complaint, ArchivedPayment, ArchivedComplaint
+from search import search_index
+from versions import bump_versions, tenant_key
+
+PAYMENT_HISTORY_COLUMNS = ('id', 'tenant_id', 'property_id', 'month', 'amount', 'payment_date',
+                           'transaction_id', 'status', 'created_at')
+
+def payment_history():
+    """Live and archived payments as one subquery with the `payments` columns.
+
+    Conditions on the subquery are pushed into both halves, so each is still
+    read through its own indexes.
+    """
+    return union_all(
+        select(*(getattr(Payment, name) for name in PAYMENT_HISTORY_COLUMNS)),
+        select(*(getattr(ArchivedPayment, name) for name in PAYMENT_HISTORY_COLUMNS)),
+    ).subquery('payment_history')
+
+def archived_through():
+    """Payment date of the newest archived payment, or None"""
+    return db.session.execute(select(func.max(ArchivedPayment.payment_date))).scalar()
+
+def payment_source(since=None):
+    """Table to read payments dated `since` or later from.
+
+    The `payments` table itself while none of those payments can have been
+    archived, else payment_history(). Either has the same columns under `.c`.
+    """
+    through = archived_through()
+    if through is None or (since is not None and since > through):
+        return Payment.__table__
+    return payment_history()
+
+def months_before(today, months):
+    """First day of the month `months` before the one `today` is in"""
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+class Archiver:
+    """Moves closed history out of the live payment and complaint tables.
+
+    Approved payments dated before the cutoff month, and complaints resolved
+    before it, are copied to payments_archive and complaints_archive
+    (complaint text compressed) and removed from the live tables and the
+    search index, `batch_size` rows per transaction. Payment proofs are
+    packed into one zip per month under `path`, and the uploaded files are
+    deleted once no live payment shares them. Payments involved in a
+    duplicate flag stay live.
+    """
+
+    def __init__(self, path=None, uploads=None, after_months=12, batch_size=500):
+        self.configure(path, uploads, after_months, batch_size)
+
+    def configure(self, path, uploads, after_months=12, batch_size=500):
+        self.path = path
+        self.uploads = uploads
+        self.after_months = after_months
+        self.batch_size = batch_size
+
+    def cutoff(self, today=None):
+        """First day of the oldest month that stays live"""
+        return months_before(today or date.today(), self.after_months)
+
+    def pack_file(self, pack):
+        return os.path.join(self.path, pack)
+
+    def read_proof(self, payment):
+        """Bytes of an archived payment's proof, or None"""
+        if not payment.payment_proof or not payment.proof_pack:
+            return None
+        try:
+            with zipfile.ZipFile(self.pack_file(payment.proof_pack)) as pack:
+                return pack.read(os.path.basename(payment.payment_proof))
+        except (OSError, KeyError):
+            return None
+
+    def pack_proofs(self, payments):
+        """Add the payments' proof files to their month's pack. Returns {payment id: pack name}."""
+        members = {}
+        packs = {}
+        for payment in payments:
+            stored = self.uploads.stored_file(payment.payment_proof)
+            if stored and os.path.exists(stored):
+                pack = f'payment-proofs-{payment.payment_date:%Y-%m}.zip'
+                members.setdefault(pack, {})[os.path.basename(stored)] = stored
+                packs[payment.id] = pack
+            elif payment.payment_proof:
+                # Shared with a payment archived earlier, which already packed the file
+                packs[payment.id] = db.session.execute(
+                    select(ArchivedPayment.proof_pack).where(
+                        ArchivedPayment.payment_proof == payment.payment_proof,
+                        ArchivedPayment.proof_pack.isnot(None)).limit(1)
+                ).scalar()
+        os.makedirs(self.path, exist_ok=True)
+        for pack, files in members.items():
+            target = self.pack_file(pack)
+            partial = target + '.part'
+            # Rewrite a copy so a crash never leaves a half-written pack behind
+            if os.path.exists(target):
+                shutil.copyfile(target, partial)
+            with zipfile.ZipFile(partial, 'a', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+                existing = set(archive.namelist())
+                for name, stored in sorted(files.items()):
+                    if name not in existing:
+                        archive.write(stored, name)
+            os.replace(partial, target)
+        return packs
+
+    def archive_payments(self, cutoff):
+        """Archive approved payments dated before `cutoff`. Returns the number moved."""
+        # The newest payment stays, so its id is never handed out again by SQLite
+        newest_id = select(func.max(Payment.id)).scalar_subquery()
+        flagged = exists().where(or_(PaymentDuplicate.payment_id == Payment.id,
+                                     PaymentDuplicate.duplicate_of_id == Payment.id))
+        moved = 0
+        after_id = 0
+        while True:
+            payments = db.session.execute(
+                select(Payment).where(
+                    Payment.id > after_id, Payment.id < newest_id, Payment.status == 'approved',
+                    Payment.payment_date < cutoff, ~flagged,
+                ).order_by(Payment.id).limit(self.batch_size)
+            ).scalars().all()
+            if not payments:
+                break
+            after_id = payments[-1].id
+            packs = self.pack_proofs(payments)
+            db.session.execute(ArchivedPayment.__table__.insert(), [
+                dict({name: getattr(payment, name) for name in PAYMENT_HISTORY_COLUMNS},
+                     payment_proof=payment.payment_proof, proof_pack=packs.get(payment.id))
+                for payment in payments
+            ])
+            ids = [payment.id for payment in payments]
+            proofs = {payment.payment_proof for payment in payments if payment.payment_proof}
+            tenant_ids = sorted({payment.tenant_id for payment in payments})
+            db.session.execute(delete(Payment).where(Payment.id.in_(ids))
+                               .execution_options(synchronize_session=False))
+            search_index.remove('payment', *ids)
+            bump_versions(*(tenant_key(tenant_id) for tenant_id in tenant_ids))
+            db.session.commit()
+            # Uploads are content-addressed, so a live payment may share the file
+            shared = set(db.session.execute(
+                select(Payment.payment_proof).where(Payment.payment_proof.in_(proofs))
+            ).scalars())
+            for proof in proofs - shared:
+                self.uploads.delete(proof)
+            moved += len(ids)
+        return moved
+
+    def archive_complaints(self, cutoff):
+        """Archive complaints resolved before `cutoff`. Returns the number moved."""
+        resolved_before = datetime.combine(cutoff, time())
+        newest_id = select(func.max(Complaint.id)).scalar_subquery()
+        columns = [column.name for column in ArchivedComplaint.__table__.columns if column.name != 'archived_at']
+        moved = 0
+        after_id = 0
+        while True:
+            complaints = db.session.execute(
+                select(*(getattr(Complaint, name) for name in columns)).where(
+                    Complaint.id > after_id, Complaint.id < newest_id, Complaint.status == 'resolved',
+                    Complaint.resolved_at < resolved_before,
+                ).order_by(Complaint.id).limit(self.batch_size)
+            ).all()
+            if not complaints:
+                break
+            after_id = complaints[-1].id
+            db.session.execute(ArchivedComplaint.__table__.insert(),
+                               [dict(complaint._mapping) for complaint in complaints])
+            ids = [complaint.id for complaint in complaints]
+            db.session.execute(delete(Complaint).where(Complaint.id.in_(ids))
+                               .execution_options(synchronize_session=False))
+            search_index.remove('complaint', *ids)
+            bump_versions(*(tenant_key(tenant_id) for tenant_id in sorted({c.tenant_id for c in complaints})))
+            db.session.commit()
+            moved += len(ids)
+        return moved
+
+    def run(self, today=None):
+        """Archive everything older than the cutoff. Returns (payments, complaints) moved."""
+        cutoff = self.cutoff(today)
+        return self.archive_payments(cutoff), self.archive_complaints(cutoff)
+
+# Shared by the archive job, the CLI and the routes that read archived rows; app.py configures it
+archiver = Archiver()
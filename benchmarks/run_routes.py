@@ -0,0 +1,409 @@
+"""Route benchmark harness.
+
+Seeds a throwaway database at the chosen scale, then drives every route in
+app.py through the Flask test client and reports latency percentiles, SQL
+statements per request and peak Python memory per route. Results can be
+saved as a baseline and later runs compared against it.
+
+    python benchmarks/run_routes.py --scale small --save-baseline benchmarks/baseline-small.json
+    python benchmarks/run_routes.py --scale small --compare benchmarks/baseline-small.json
+
+Scales: small (100 tenants), medium (10k), large (100k), each with --years of
+monthly payments. Seeding large takes a while; pass --db to keep the seeded
+file and reuse it on later runs.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import SCALES, BENCH_PASSWORD, seed_database
+
+@dataclass
+class Route:
+    name: str
+    role: str  # admin, tenant, anonymous, or property_admin (an admin session whose selection changes)
+    path: Callable
+    method: str = 'GET'
+    data: Optional[Callable] = None
+    json: Optional[Callable] = None
+    iterations: Optional[int] = None  # Overrides --iterations for slow routes
+
+# 1x1 PNG used for the tenant photo uploads
+TINY_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082'
+)
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * pct / 100) - 1)]
+
+def build_routes(ctx):
+    """Every route in app.py, reads first, then writes that consume fixtures"""
+    today = date.today()
+    month = today.strftime('%B')
+    tenant_id = ctx['tenant_ids'][0]
+    return [
+        Route('index', 'anonymous', lambda i: '/'),
+        Route('static (style.css)', 'anonymous', lambda i: '/static/css/style.css'),
+        Route('admin_login (GET)', 'anonymous', lambda i: '/admin/login'),
+        Route('admin_login (POST)', 'anonymous', lambda i: '/admin/login', 'POST',
+              lambda i: {'username': 'admin', 'password': 'admin123'}),
+        Route('tenant_login (GET)', 'anonymous', lambda i: '/tenant/login'),
+        Route('tenant_login (POST)', 'anonymous', lambda i: '/tenant/login', 'POST',
+              lambda i: {'email': ctx['tenant_email'], 'password': BENCH_PASSWORD}),
+        Route('api_admin_login', 'anonymous', lambda i: '/api/v1/admin/login', 'POST',
+              json=lambda i: {'username': 'admin', 'password': 'admin123'}),
+        Route('api_tenant_login', 'anonymous', lambda i: '/api/v1/tenant/login', 'POST',
+              json=lambda i: {'email': ctx['tenant_email'], 'password': BENCH_PASSWORD}),
+        Route('api_logout', 'anonymous', lambda i: '/api/v1/logout', 'POST'),
+        Route('admin_dashboard', 'admin', lambda i: '/admin/dashboard'),
+        Route('view_tenants', 'admin', lambda i: '/admin/tenants'),
+        Route('tenant_detail', 'admin', lambda i: f"/admin/tenant/{ctx['tenant_ids'][i % len(ctx['tenant_ids'])]}"),
+        Route('view_payments', 'admin', lambda i: '/admin/payments'),
+        Route('view_payments (pending)', 'admin', lambda i: '/admin/payments?status=pending'),
+        Route('view_payments (page 2)', 'admin', lambda i: f"/admin/payments?cursor={ctx['payments_cursor']}"),
+        Route('admin_monthly_payment_status', 'admin',
+              lambda i: f'/admin/monthly-payment-status?month={month}&year={today.year}'),
+        Route('admin_monthly_payment_status (POST)', 'admin', lambda i: '/admin/monthly-payment-status', 'POST',
+              lambda i: {'month': month, 'year': str(today.year)}),
+        Route('admin_complaints', 'admin', lambda i: '/admin/complaints'),
+        Route('admin_complaints (all)', 'admin', lambda i: '/admin/complaints?status=all'),
+        Route('admin_complaints (pending)', 'admin', lambda i: '/admin/complaints?status=pending'),
+        Route('admin_reports', 'admin', lambda i: '/admin/reports'),
+        Route('admin_reports (24 months)', 'admin',
+              lambda i: f'/admin/reports?start={today.year - 2}-{today.month:02d}&end={today:%Y-%m}'),
+        Route('admin_search (tenant)', 'admin', lambda i: f'/admin/search?q=Tenant {tenant_id:06d}'),
+        Route('admin_search (payment)', 'admin', lambda i: f'/admin/search?q=UPI{tenant_id:06d}&kind=payment'),
+        Route('admin_search (complaint)', 'admin', lambda i: '/admin/search?q=leakage&kind=complaint'),
+        Route('tenant_detail_archive', 'admin', lambda i: f'/admin/tenant/{tenant_id}/payments/archived'),
+        Route('admin_import (GET)', 'admin', lambda i: '/admin/import'),
+        Route('admin_export (payments csv)', 'admin', lambda i: '/admin/export/payments', iterations=3),
+        Route('admin_export (payments json)', 'admin', lambda i: '/admin/export/payments?format=json', iterations=3),
+        Route('admin_profiling', 'admin', lambda i: '/admin/profiling'),
+        Route('admin_profiling_json', 'admin', lambda i: '/admin/profiling.json'),
+        Route('add_tenant (GET)', 'admin', lambda i: '/admin/add_tenant'),
+        Route('admin_properties', 'admin', lambda i: '/admin/properties'),
+        Route('property_rooms', 'admin', lambda i: f"/admin/properties/{ctx['property_id']}/rooms"),
+        Route('tenant_dashboard', 'tenant', lambda i: '/tenant/dashboard'),
+        Route('tenant_profile', 'tenant', lambda i: '/tenant/profile'),
+        Route('tenant_payment_history', 'tenant', lambda i: '/tenant/payments'),
+        Route('tenant_complaints', 'tenant', lambda i: '/tenant/complaints'),
+        Route('add_payment (GET)', 'tenant', lambda i: '/tenant/add_payment'),
+        Route('raise_complaint (GET)', 'tenant', lambda i: '/tenant/complaint/new'),
+        Route('tenant_payment_archive', 'tenant', lambda i: '/tenant/payments/archived'),
+        Route('tenant_complaint_archive', 'tenant', lambda i: '/tenant/complaints/archived'),
+        Route('archived_payment_proof', 'tenant', lambda i: f"/payments/{ctx['archived_proofs'][0]}/archived-proof"),
+        Route('api tenants', 'admin', lambda i: '/api/v1/tenants'),
+        Route('api tenant', 'admin', lambda i: f"/api/v1/tenants/{ctx['tenant_ids'][i % len(ctx['tenant_ids'])]}"),
+        Route('api payments', 'admin', lambda i: '/api/v1/payments'),
+        Route('api payments (pending)', 'admin', lambda i: '/api/v1/payments?status=pending'),
+        Route('api complaints', 'admin', lambda i: '/api/v1/complaints'),
+        Route('api monthly-status', 'admin', lambda i: f'/api/v1/monthly-status?month={month}&year={today.year}'),
+        Route('api me', 'tenant', lambda i: '/api/v1/me'),
+        Route('api me/payments', 'tenant', lambda i: '/api/v1/me/payments'),
+        Route('api me/complaints', 'tenant', lambda i: '/api/v1/me/complaints'),
+        # Writes
+        Route('approve_payment', 'admin', lambda i: f"/admin/approve_payment/{ctx['pending_payments'].pop()}", 'POST'),
+        Route('dismiss_duplicate', 'admin',
+              lambda i: f"/admin/payments/{ctx['duplicate_payments'].pop()}/not-duplicate", 'POST'),
+        Route('discard_duplicate', 'admin',
+              lambda i: f"/admin/payments/{ctx['duplicate_payments'].pop()}/discard", 'POST'),
+        Route('approve_payments_bulk', 'admin', lambda i: '/admin/payments/approve', 'POST',
+              lambda i: {'payment_ids': [str(ctx['pending_payments'].pop()) for _ in range(25)
+                                         if ctx['pending_payments']]}),
+        Route('resolve_complaint', 'admin',
+              lambda i: f"/admin/complaint/resolve/{ctx['pending_complaints'].pop()}", 'POST'),
+        Route('update_complaint', 'admin',
+              lambda i: f"/admin/complaint/{ctx['pending_complaints'].pop()}/update", 'POST',
+              lambda i: {'status': 'assigned', 'assigned_to': 'Benchmark', 'priority': '2'}),
+        Route('reopen_complaint', 'tenant',
+              lambda i: f"/tenant/complaint/{ctx['resolved_complaints'].pop()}/reopen", 'POST'),
+        Route('add_tenant (POST)', 'admin', lambda i: '/admin/add_tenant', 'POST',
+              lambda i: {'name': f'New Tenant {i}', 'email': f'new{i}-{time.time_ns()}@bench.test',
+                         'phone': '9876543210', 'room_id': str(ctx['bench_room_id']), 'monthly_rent': '8000',
+                         'deposit_amount': '8000', 'deposit_paid_date': today.isoformat(),
+                         'password': 'secret123',
+                         'profile_photo': (io.BytesIO(TINY_PNG), 'photo.png'),
+                         'id_proof_photo': (io.BytesIO(TINY_PNG), 'id.png')}),
+        Route('admin_import (POST)', 'admin', lambda i: '/admin/import', 'POST',
+              lambda i: {'kind': 'tenants', 'file': (io.BytesIO(import_csv(i)), 'tenants.csv')}),
+        Route('admin_properties (POST)', 'admin', lambda i: '/admin/properties', 'POST',
+              lambda i: {'name': f'Bench Property {i}-{time.time_ns()}', 'address': '1 Bench Road'}),
+        Route('property_rooms (POST)', 'admin', lambda i: f"/admin/properties/{ctx['property_id']}/rooms", 'POST',
+              lambda i: {'number': f'B{i}-{time.time_ns()}', 'capacity': '2'}),
+        Route('select_property', 'property_admin', lambda i: '/admin/property', 'POST',
+              lambda i: {'property_id': str(ctx['property_id']) if i % 2 else ''}),
+        Route('add_payment (POST)', 'tenant', lambda i: '/tenant/add_payment', 'POST',
+              lambda i: {'month': month, 'amount': '8000', 'payment_date': today.isoformat(),
+                         'transaction_id': f'BENCH{i}-{time.time_ns()}'}),
+        Route('raise_complaint (POST)', 'tenant', lambda i: '/tenant/complaint/new', 'POST',
+              lambda i: {'subject': 'Benchmark complaint', 'description': 'Raised by the benchmark harness.',
+                         'category': 'plumbing'}),
+        # Polls picking up the events the writes above recorded
+        Route('admin_events (payments)', 'admin',
+              lambda i: f"/admin/events?view=payments&status=pending&cursor={ctx['feed_cursor']}"),
+        Route('admin_events (complaints)', 'admin',
+              lambda i: f"/admin/events?view=complaints&cursor={ctx['feed_cursor']}"),
+        Route('admin_logout', 'admin', lambda i: '/admin/logout', iterations=1),
+        Route('tenant_logout', 'tenant', lambda i: '/tenant/logout', iterations=1),
+    ]
+
+def import_csv(i):
+    """A small tenant import file with addresses unique to this request"""
+    stamp = time.time_ns()
+    rows = ['name,email,phone,room_number,monthly_rent,password,deposit_amount,deposit_paid_date']
+    rows += [f'Imported {n},import{i}-{n}-{stamp}@bench.test,9876543210,BENCH,8000,secret123,8000,2024-01-01'
+             for n in range(20)]
+    return '\n'.join(rows).encode()
+
+def load_fixtures(db, count):
+    """Ids the routes need: tenants to view, pending items to act on, and `count`
+    each of resolved complaints to reopen and duplicate flags to dismiss or discard"""
+    import re
+    import zipfile
+    from sqlalchemy import select, update
+    from models import User, Room, Payment, Complaint, ArchivedPayment, PaymentDuplicate
+    from properties import ensure_rooms
+    from complaints import new_complaint_fields, transition
+    from duplicates import duplicate_scanner
+    from ledger import ledger_period, refresh_ledger_entries
+    from archive import archiver
+    from feed import admin_feed
+
+    tenant_ids = db.session.execute(select(User.id).order_by(User.id).limit(50)).scalars().all()
+    # A room with space for every tenant the add_tenant route creates
+    property_id = db.session.get(User, tenant_ids[0]).property_id
+    room_id = ensure_rooms(property_id, {'BENCH': 1})['BENCH']
+    db.session.get(Room, room_id).capacity = 100_000
+    # Resolved through the workflow, so the complaint stats count them
+    for _ in range(count):
+        complaint = Complaint(tenant_id=tenant_ids[0], property_id=property_id, subject='Benchmark fixture',
+                              description='Resolved so the reopen route has something to reopen.',
+                              status='pending', **new_complaint_fields('cleaning'))
+        db.session.add(complaint)
+        transition(complaint, 'resolved')
+    db.session.commit()
+
+    # Resubmitted payments, flagged by the duplicate scan as they would be in production
+    originals = db.session.execute(
+        select(Payment).where(Payment.status == 'approved').order_by(Payment.id.desc()).limit(2 * count)
+    ).scalars().all()
+    db.session.add_all([
+        Payment(tenant_id=p.tenant_id, property_id=p.property_id, month=p.month, amount=p.amount,
+                payment_date=p.payment_date, transaction_id=p.transaction_id, status='pending')
+        for p in originals
+    ])
+    db.session.commit()
+    duplicate_scanner.scan()
+    refresh_ledger_entries({(p.tenant_id,) + ledger_period(p.month, p.payment_date) for p in originals
+                            if ledger_period(p.month, p.payment_date)})
+    db.session.commit()
+    duplicate_ids = db.session.execute(
+        select(PaymentDuplicate.payment_id).where(PaymentDuplicate.dismissed == False)
+        .order_by(PaymentDuplicate.payment_id)
+    ).scalars().all()
+
+    # One archived payment of the benchmark tenant gets a proof in a pack of its own
+    archived_proofs = db.session.execute(
+        select(ArchivedPayment.id).where(ArchivedPayment.tenant_id == tenant_ids[0])
+        .order_by(ArchivedPayment.id).limit(1)
+    ).scalars().all()
+    if archived_proofs:
+        os.makedirs(archiver.path, exist_ok=True)
+        with zipfile.ZipFile(archiver.pack_file('payment-proofs-bench.zip'), 'w') as pack:
+            pack.writestr('bench-proof.png', TINY_PNG)
+        db.session.execute(update(ArchivedPayment).where(ArchivedPayment.id == archived_proofs[0]).values(
+            payment_proof='uploads/payment_proofs/bench-proof.png', proof_pack='payment-proofs-bench.zip'))
+        db.session.commit()
+
+    return {
+        'tenant_ids': tenant_ids,
+        'property_id': property_id,
+        'bench_room_id': room_id,
+        'tenant_email': db.session.get(User, tenant_ids[0]).email,
+        'pending_payments': db.session.execute(
+            select(Payment.id).where(Payment.status == 'pending', Payment.id.notin_(duplicate_ids))
+            .order_by(Payment.id)
+        ).scalars().all(),
+        'duplicate_payments': duplicate_ids,
+        'archived_proofs': archived_proofs,
+        'pending_complaints': db.session.execute(
+            select(Complaint.id).where(Complaint.status == 'pending').order_by(Complaint.id)
+        ).scalars().all(),
+        'resolved_complaints': db.session.execute(
+            select(Complaint.id).where(Complaint.tenant_id == tenant_ids[0], Complaint.status == 'resolved')
+            .order_by(Complaint.id)
+        ).scalars().all(),
+        'feed_cursor': admin_feed.latest_id(),
+        'payments_cursor': '',
+        'cursor_pattern': re.compile(r'cursor=([^"&]+)'),
+    }
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='pg-bench-')
+    db_path = args.db or os.path.join(workdir, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(db_path)}'
+    os.environ.setdefault('SESSION_PATH', os.path.join(workdir, 'sessions.db'))
+    os.environ.setdefault('JOB_QUEUE_PATH', os.path.join(workdir, 'jobs.db'))
+    os.environ.setdefault('NOTIFICATION_OUTBOX', os.path.join(workdir, 'outbox.jsonl'))
+    os.environ.setdefault('ARCHIVE_PATH', os.path.join(workdir, 'archive'))
+    # Turned away from streaming, /admin/events answers with pending changes and closes
+    os.environ['FEED_MAX_STREAMS'] = '0'
+    # Jobs (imports, scans, thumbnails) stay queued rather than competing with the timed requests
+    os.environ['JOB_WORKERS'] = '0'
+    # Keep upload directories created on import out of the source tree
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+
+    from sqlalchemy import event
+    from app import app, bootstrap
+    from models import db, User
+
+    bootstrap()
+    tenants = SCALES.get(args.scale) or int(args.scale)
+    with app.app_context():
+        if not User.query.first():
+            started = time.perf_counter()
+            counts = seed_database(db, tenants, args.years)
+            print(f"Seeded {', '.join(f'{n} {k}' for k, n in counts.items())} "
+                  f'in {time.perf_counter() - started:.1f}s')
+        ctx = load_fixtures(db, args.warmup + args.iterations + 1)
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *a, **k: statements.append(1))
+
+    clients = {role: app.test_client() for role in ('anonymous', 'admin', 'property_admin', 'tenant')}
+    for role in ('admin', 'property_admin'):
+        clients[role].post('/admin/login', data={'username': 'admin', 'password': 'admin123'})
+    clients['tenant'].post('/tenant/login', data={'email': ctx['tenant_email'], 'password': BENCH_PASSWORD})
+    first_page = clients['admin'].get('/admin/payments').get_data(as_text=True)
+    match = ctx['cursor_pattern'].search(first_page)
+    ctx['payments_cursor'] = match.group(1) if match else ''
+
+    results = {}
+    for route in build_routes(ctx):
+        if route.name.startswith(args.only or ''):
+            results[route.name] = measure(route, clients[route.role], statements, args)
+            report_line(route.name, results[route.name])
+    return {'scale': args.scale, 'years': args.years, 'routes': results}
+
+def measure(route, client, statements, args):
+    iterations = route.iterations or args.iterations
+    warmup = 0 if route.iterations else args.warmup
+
+    def request(i):
+        data = route.data(i) if route.data else None
+        json_body = route.json(i) if route.json else None
+        response = client.open(route.path(i), method=route.method, data=data, json=json_body)
+        # Drain streamed bodies so their cost is counted
+        response.get_data()
+        return response
+
+    latencies, query_counts = [], []
+    for i in range(warmup + iterations):
+        try:
+            statements.clear()
+            started = time.perf_counter()
+            response = request(i)
+            elapsed = time.perf_counter() - started
+        except IndexError:
+            break  # Ran out of pending fixtures for a write route
+        if response.status_code >= 500:
+            raise RuntimeError(f'{route.name} returned {response.status_code}')
+        if i >= warmup:
+            latencies.append(elapsed * 1000)
+            query_counts.append(len(statements))
+
+    if not latencies:
+        return None
+
+    # Separate pass: tracemalloc slows execution too much to time under it
+    tracemalloc.start()
+    try:
+        request(warmup + iterations)
+        peak = tracemalloc.get_traced_memory()[1]
+    except IndexError:
+        peak = 0
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries': round(sum(query_counts) / len(query_counts), 1),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+def report_line(name, result):
+    if result is None:
+        print(f'{name:<36} skipped (no fixtures left)')
+        return
+    print(f"{name:<36} p50 {result['p50_ms']:>9.2f}  p95 {result['p95_ms']:>9.2f}  "
+          f"p99 {result['p99_ms']:>9.2f} ms  {result['queries']:>6} queries  {result['peak_kb']:>9.1f} KB")
+
+def compare(current, baseline, threshold):
+    """Print per-route changes against a baseline; return the regressions"""
+    regressions = []
+    print(f"\nCompared with baseline (scale {baseline['scale']}):")
+    for name, result in current['routes'].items():
+        before = baseline['routes'].get(name)
+        if not result or not before:
+            continue
+        p95_change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0
+        flags = []
+        if p95_change > threshold:
+            flags.append('SLOWER')
+        if result['queries'] > before['queries']:
+            flags.append('MORE QUERIES')
+        if flags:
+            regressions.append(name)
+        print(f"{name:<36} p95 {before['p95_ms']:>9.2f} -> {result['p95_ms']:>9.2f} ms ({p95_change:+.0%})  "
+              f"queries {before['queries']} -> {result['queries']}  {' '.join(flags)}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every route against synthetic data')
+    parser.add_argument('--scale', default='small', help='small, medium, large or a tenant count')
+    parser.add_argument('--years', type=int, default=3, help='years of payment history')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--db', help='SQLite file to seed once and reuse')
+    parser.add_argument('--only', help='only run routes whose name starts with this')
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--compare', metavar='PATH')
+    parser.add_argument('--threshold', type=float, default=0.2, help='p95 slowdown counted as a regression')
+    args = parser.parse_args()
+    for option in ('db', 'save_baseline', 'compare'):
+        if getattr(args, option):
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+
+    current = run(args)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f'\nSaved baseline to {args.save_baseline}')
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(current, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(f"\n{len(regressions)} routes regressed: {', '.join(regressions)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Synthetic data generator for benchmarks.
+
+Fills the configured database (DATABASE_URL) with properties and rooms,
+tenants, several years of monthly payments and a trickle of complaints, then
+archives and indexes them as the running app would have. Generation is deterministic for
+a given --seed so runs against the same scale are comparable.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/seed.py --tenants 10000 --years 3
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCALES = {'small': 100, 'medium': 10_000, 'large': 100_000}
+BENCH_PASSWORD = 'bench-password'
+BATCH_SIZE = 5000
+ROOMS_PER_PROPERTY = 400
+
+def month_starts(first, last):
+    """First day of every month from `first` to `last` inclusive"""
+    current = date(first.year, first.month, 1)
+    while current <= last:
+        yield current
+        current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+
+def seed_database(db, tenants, years, seed=42, today=None, properties=1):
+    """Insert synthetic rows, archive old ones and build the ledger and search index. Returns row counts.
+
+    Tenants are spread round-robin over `properties`, each with
+    ROOMS_PER_PROPERTY rooms sized to fit their occupants.
+    """
+    from werkzeug.security import generate_password_hash
+    from sqlalchemy import delete
+    from models import User, Property, Room, Payment, Complaint
+    from ledger import MONTH_NAMES, rebuild_ledger
+    from complaints import CATEGORY_PRIORITY, DEFAULT_PRIORITY, sla_due, rebuild_complaint_stats
+    from archive import archiver
+    from search import search_index
+
+    rng = random.Random(seed)
+    today = today or date.today()
+    history_start = date(today.year - years, today.month, 1)
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    counts = {'properties': 0, 'rooms': 0, 'tenants': 0, 'payments': 0, 'complaints': 0}
+
+    def flush(table, rows, key):
+        if rows:
+            db.session.execute(table.insert(), rows)
+            db.session.commit()
+            counts[key] += len(rows)
+            rows.clear()
+
+    def placement(i):
+        """(property id, room id, room number) for tenant `i`"""
+        property_id = (i - 1) % properties + 1
+        slot = (i - 1) // properties % ROOMS_PER_PROPERTY
+        return property_id, (property_id - 1) * ROOMS_PER_PROPERTY + slot + 1, str(100 + slot)
+
+    # Replace the empty default property the app creates on first start
+    db.session.execute(delete(Property))
+    occupants = {}
+    for i in range(1, tenants + 1):
+        room_id = placement(i)[1]
+        occupants[room_id] = occupants.get(room_id, 0) + 1
+    flush(Property.__table__, [dict(id=p, name=f'Bench Property {p}', address=f'{p} Bench Road')
+                               for p in range(1, properties + 1)], 'properties')
+    flush(Room.__table__, [
+        dict(id=(p - 1) * ROOMS_PER_PROPERTY + slot + 1, property_id=p, number=str(100 + slot),
+             capacity=occupants.get((p - 1) * ROOMS_PER_PROPERTY + slot + 1, 0) + 1)
+        for p in range(1, properties + 1) for slot in range(ROOMS_PER_PROPERTY)
+    ], 'rooms')
+
+    users = []
+    joined = {}
+    for i in range(1, tenants + 1):
+        property_id, room_id, room_number = placement(i)
+        joined_on = history_start + timedelta(days=rng.randint(0, max(1, (today - history_start).days - 30)))
+        joined[i] = joined_on
+        users.append(dict(
+            id=i, name=f'Bench Tenant {i:06d}', email=f'tenant{i}@bench.test', phone=f'9{i:09d}'[:10],
+            property_id=property_id, room_id=room_id, room_number=room_number, monthly_rent=float(rng.choice([6000, 7500, 9000, 12000])),
+            password_hash=password_hash, profile_photo='', id_proof_photo='',
+            deposit_amount=10000.0, deposit_paid_date=joined_on,
+            created_at=datetime.combine(joined_on, datetime.min.time()),
+        ))
+        if len(users) >= BATCH_SIZE:
+            flush(User.__table__, users, 'tenants')
+    flush(User.__table__, users, 'tenants')
+
+    payments = []
+    complaints = []
+    recent_cutoff = date(today.year, today.month, 1) - timedelta(days=45)
+    for tenant_id, joined_on in joined.items():
+        property_id = placement(tenant_id)[0]
+        for month_start in month_starts(joined_on, today):
+            if rng.random() < 0.05:
+                continue  # Missed month
+            paid_on = month_start + timedelta(days=rng.randint(0, 9))
+            if paid_on > today:
+                continue
+            recent = month_start >= recent_cutoff
+            payments.append(dict(
+                tenant_id=tenant_id, property_id=property_id, month=MONTH_NAMES[month_start.month - 1],
+                amount=float(rng.choice([6000, 7500, 9000, 12000])), payment_date=paid_on,
+                transaction_id=f'UPI{tenant_id:06d}{month_start:%Y%m}',
+                status='pending' if recent and rng.random() < 0.5 else 'approved',
+                created_at=datetime.combine(paid_on, datetime.min.time()) + timedelta(minutes=rng.randint(0, 1439)),
+            ))
+            if rng.random() < 0.15:
+                raised = datetime.combine(month_start, datetime.min.time()) + timedelta(days=rng.randint(0, 27))
+                resolved = raised.date() < recent_cutoff or rng.random() < 0.3
+                subject, category = rng.choice([('Water leakage', 'plumbing'), ('WiFi not working', 'internet'),
+                                                ('Room cleaning', 'cleaning'), ('Power outage', 'electrical'),
+                                                ('Noise', 'other')])
+                priority = CATEGORY_PRIORITY.get(category, DEFAULT_PRIORITY)
+                complaints.append(dict(
+                    tenant_id=tenant_id, property_id=property_id, subject=subject,
+                    description='Synthetic benchmark complaint with enough text to look realistic.',
+                    category=category, priority=priority, due_at=sla_due(raised, priority),
+                    status='resolved' if resolved else 'pending', created_at=raised,
+                    resolved_at=raised + timedelta(days=rng.randint(1, 10)) if resolved else None,
+                ))
+            if len(payments) >= BATCH_SIZE:
+                flush(Payment.__table__, payments, 'payments')
+            if len(complaints) >= BATCH_SIZE:
+                flush(Complaint.__table__, complaints, 'complaints')
+    flush(Payment.__table__, payments, 'payments')
+    flush(Complaint.__table__, complaints, 'complaints')
+
+    # What the daily archive job would have moved; search covers the live rows that remain
+    counts['archived payments'], counts['archived complaints'] = archiver.run(today)
+    rebuild_ledger()
+    rebuild_complaint_stats()
+    search_index.rebuild()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill the configured database with synthetic data')
+    parser.add_argument('--tenants', type=int, default=SCALES['small'])
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--properties', type=int, default=1)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from app import app, bootstrap
+    from models import db
+
+    bootstrap()
+    with app.app_context():
+        counts = seed_database(db, args.tenants, args.years, seed=args.seed, properties=args.properties)
+    print(', '.join(f'{count} {name}' for name, count in counts.items()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+import csv
+import io
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import partial
+from sqlalchemy import select, and_
+from werkzeug.security import generate_password_hash
+from models import db, User, Property, Payment, Complaint, ArchivedPayment, ArchivedComplaint
+from passwords import password_hasher
+from ledger import MONTH_NUMBERS, rebuild_tenant_ledgers
+from search import search_index
+from jobs import scheduler
+from versions import TENANTS, PAST_REVENUE, PROPERTIES, bump_versions, tenant_key
+from properties import ensure_rooms
+
+BATCH_SIZE = 500
+
+TENANT_COLUMNS = ['name', 'email', 'phone', 'room_number', 'monthly_rent', 'password',
+                  'deposit_amount', 'deposit_paid_date', 'created_at', 'property']
+PAYMENT_COLUMNS = ['tenant_email', 'month', 'amount', 'payment_date', 'transaction_id',
+                   'status', 'created_at']
+
+# Columns written by each export; password hashes are never exported. Tenant
+# exports carry the property name, so they import back into the same building
+EXPORTS = {
+    'tenants': [User.id, User.name, User.email, User.phone, User.room_number, User.monthly_rent,
+                User.deposit_amount, User.deposit_paid_date, User.created_at, User.property_id,
+                Property.name.label('property')],
+    'payments': [Payment.id, Payment.property_id, User.email.label('tenant_email'), Payment.month, Payment.amount,
+                 Payment.payment_date, Payment.transaction_id, Payment.status, Payment.created_at],
+    'complaints': [Complaint.id, Complaint.property_id, User.email.label('tenant_email'), Complaint.subject,
+                   Complaint.description, Complaint.category, Complaint.priority, Complaint.status,
+                   Complaint.assigned_to, Complaint.created_at, Complaint.due_at, Complaint.resolved_at],
+}
+# Table each export reads, its archive table, and the table joined to them
+EXPORT_SOURCES = {
+    'tenants': (User, None, Property, lambda model: model.property_id == Property.id),
+    'payments': (Payment, ArchivedPayment, User, lambda model: model.tenant_id == User.id),
+    'complaints': (Complaint, ArchivedComplaint, User, lambda model: model.tenant_id == User.id),
+}
+
+class ImportResult:
+    """Counts and per-row errors from one import"""
+
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.errors.append(f'Row {line}: {message}')
+
+def read_records(stream, filename):
+    """Yield (row number, dict) pairs from a binary CSV or JSON stream.
+
+    CSV is read lazily. JSON may be an array of objects, or one object per
+    line (.jsonl) which is also read lazily.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    name = (filename or '').lower()
+    if name.endswith('.jsonl'):
+        for line_number, line in enumerate(text, start=1):
+            if line.strip():
+                yield line_number, json.loads(line)
+    elif name.endswith('.json'):
+        for index, record in enumerate(json.load(text), start=1):
+            yield index, record
+    else:
+        # Row 1 is the header
+        for line_number, record in enumerate(csv.DictReader(text), start=2):
+            yield line_number, record
+
+def parse_date(value):
+    return datetime.strptime(value.strip(), '%Y-%m-%d').date()
+
+def parse_datetime(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+def batches(records, size=BATCH_SIZE):
+    """Group an iterator of records into lists of at most `size`"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def clean(record, columns):
+    """Strip whitespace and keep only known columns"""
+    return {column: str(record.get(column) or '').strip() for column in columns}
+
+def parse_tenant(record):
+    """Validate one tenant row, returning the values for insertion"""
+    missing = [column for column in TENANT_COLUMNS[:-2] if not record[column]]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    values = {
+        'name': record['name'],
+        'email': record['email'],
+        'phone': record['phone'],
+        'room_number': record['room_number'],
+        'monthly_rent': float(record['monthly_rent']),
+        'deposit_amount': float(record['deposit_amount']),
+        'deposit_paid_date': parse_date(record['deposit_paid_date']),
+        'profile_photo': '',
+        'id_proof_photo': '',
+    }
+    created_at = parse_datetime(record['created_at'])
+    if created_at:
+        values['created_at'] = created_at
+    return values
+
+def assign_rooms(rows, default_property_id, result):
+    """Set property_id and room_id on parsed tenant rows, creating missing rooms.
+
+    Rows whose property is unknown are reported and dropped; rooms are not
+    checked for free beds, since imports record tenants already living there.
+    """
+    names = {record['property'] for _, _, record in rows if record['property']}
+    properties = dict(db.session.execute(
+        select(Property.name, Property.id).where(Property.name.in_(names))
+    ).all())
+    assigned, occupants = [], {}
+    for line, values, record in rows:
+        property_id = properties.get(record['property']) if record['property'] else default_property_id
+        if property_id is None:
+            result.add_error(line, f"unknown property {record['property']}" if record['property']
+                             else 'no property to add the tenant to')
+            continue
+        values['property_id'] = property_id
+        counts = occupants.setdefault(property_id, {})
+        counts[values['room_number']] = counts.get(values['room_number'], 0) + 1
+        assigned.append((line, values, record))
+    for property_id, counts in occupants.items():
+        rooms = ensure_rooms(property_id, counts)
+        for _, values, _ in assigned:
+            if values['property_id'] == property_id:
+                values['room_id'] = rooms[values['room_number']]
+    return assigned
+
+def hashing_pool(workers):
+    """Process pool for password hashing.
+
+    Processes are started by a fork server (spawned on platforms without
+    one), never forked from the calling process, which in a web or job
+    worker holds threads and pooled database connections.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+def import_tenants(records, workers=None, property_id=None):
+    """Insert tenants in batches, hashing passwords across `workers` processes (default: CPU count).
+
+    Rows without a property column go to `property_id`, or the first property.
+    """
+    result = ImportResult()
+    property_id = property_id or db.session.execute(
+        select(Property.id).order_by(Property.id).limit(1)
+    ).scalar()
+    with hashing_pool(workers) as executor:
+        for batch in batches(records):
+            rows, seen = [], set()
+            for line, record in batch:
+                record = clean(record, TENANT_COLUMNS)
+                try:
+                    values = parse_tenant(record)
+                except ValueError as e:
+                    result.add_error(line, str(e))
+                    continue
+                if values['email'] in seen:
+                    result.add_error(line, f"duplicate email {values['email']}")
+                    continue
+                seen.add(values['email'])
+                rows.append((line, values, record))
+
+            existing = set(db.session.execute(
+                select(User.email).where(User.email.in_(seen))
+            ).scalars())
+            new_rows = []
+            for line, values, record in rows:
+                if values['email'] in existing:
+                    result.add_error(line, f"email {values['email']} already registered")
+                else:
+                    new_rows.append((line, values, record))
+            rows = assign_rooms(new_rows, property_id, result)
+            hashes = executor.map(partial(generate_password_hash, method=password_hasher.method),
+                                  [record['password'] for _, _, record in rows], chunksize=16)
+            to_insert = [dict(values, password_hash=password_hash)
+                         for (_, values, _), password_hash in zip(rows, hashes)]
+            if to_insert:
+                db.session.execute(User.__table__.insert(), to_insert)
+                search_index.index_tenants(User.email.in_([row['email'] for row in to_insert]))
+                # Backdated tenants change the rent expected in past months
+                bump_versions(TENANTS, PAST_REVENUE, PROPERTIES)
+            db.session.commit()
+            result.imported += len(to_insert)
+    return result
+
+def parse_payment(record):
+    """Validate one payment row, returning the values for insertion"""
+    missing = [column for column in PAYMENT_COLUMNS[:5] if not record[column]]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    month = record['month'].title()
+    if month not in MONTH_NUMBERS:
+        raise ValueError(f"unknown month {record['month']}")
+    status = (record['status'] or 'pending').lower()
+    if status not in ('pending', 'approved'):
+        raise ValueError(f"unknown status {record['status']}")
+    values = {
+        'month': month,
+        'amount': float(record['amount']),
+        'payment_date': parse_date(record['payment_date']),
+        'transaction_id': record['transaction_id'],
+        'status': status,
+    }
+    created_at = parse_datetime(record['created_at'])
+    if created_at:
+        values['created_at'] = created_at
+    return values
+
+def import_payments(records):
+    """Insert historical payments in batches and refresh the affected ledgers"""
+    result = ImportResult()
+    tenant_ids = set()
+    for batch in batches(records):
+        parsed = []
+        for line, record in batch:
+            record = clean(record, PAYMENT_COLUMNS)
+            try:
+                parsed.append((line, record['tenant_email'], parse_payment(record)))
+            except ValueError as e:
+                result.add_error(line, str(e))
+
+        emails = {email for _, email, _ in parsed}
+        tenants = {email: (tenant_id, property_id) for email, tenant_id, property_id in db.session.execute(
+            select(User.email, User.id, User.property_id).where(User.email.in_(emails))
+        )}
+
+        to_insert = []
+        for line, email, values in parsed:
+            if email not in tenants:
+                result.add_error(line, f'no tenant with email {email}')
+                continue
+            tenant_id, property_id = tenants[email]
+            to_insert.append(dict(values, tenant_id=tenant_id, property_id=property_id))
+        if to_insert:
+            db.session.execute(Payment.__table__.insert(), to_insert)
+            batch_tenants = {row['tenant_id'] for row in to_insert}
+            search_index.index_payments(and_(Payment.tenant_id.in_(batch_tenants),
+                                             Payment.transaction_id.in_({row['transaction_id'] for row in to_insert})))
+            bump_versions(PAST_REVENUE, *(tenant_key(tenant_id) for tenant_id in batch_tenants))
+            tenant_ids.update(batch_tenants)
+        db.session.commit()
+        result.imported += len(to_insert)
+
+    for tenant_batch in batches(sorted(tenant_ids)):
+        rebuild_tenant_ledgers(tenant_batch)
+        db.session.commit()
+    if result.imported:
+        # Flag any duplicates among the imported payments without waiting for the next scan
+        scheduler.enqueue('scan-duplicates', unique_key='scan-duplicates')
+    return result
+
+def export_query(kind, model, property_id=None):
+    """The export's columns read from `model`, its live table or that table's archive"""
+    live, _, joined, join_on = EXPORT_SOURCES[kind]
+    columns = [getattr(model, column.key) if getattr(column, 'class_', None) is live else column
+               for column in EXPORTS[kind]]
+    query = select(*columns).select_from(model).join(joined, join_on(model))
+    if property_id:
+        query = query.where(model.property_id == property_id)
+    return query.order_by(model.id)
+
+def export_rows(kind, property_id=None, batch_size=1000):
+    """Column names and a stream of the rows of one export, limited to one property if given.
+
+    Archived payments and complaints come first, then the live ones; each
+    table is read in batches, so memory use doesn't grow with its size.
+    """
+    live, archive, _, _ = EXPORT_SOURCES[kind]
+    keys = [column.key for column in EXPORTS[kind]]
+
+    def rows():
+        for model in ((archive, live) if archive is not None else (live,)):
+            query = export_query(kind, model, property_id).execution_options(yield_per=batch_size)
+            yield from db.session.execute(query)
+    return keys, rows()
+
+def format_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def export_csv(kind, property_id=None):
+    """Yield an export as CSV text, one chunk per row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    keys, rows = export_rows(kind, property_id)
+
+    def take():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writerow(keys)
+    yield take()
+    for row in rows:
+        writer.writerow([format_value(value) for value in row])
+        yield take()
+
+def export_json(kind, property_id=None):
+    """Yield an export as JSON Lines, one object per row"""
+    keys, rows = export_rows(kind, property_id)
+    for row in rows:
+        yield json.dumps({key: format_value(value) for key, value in zip(keys, row)}) + '\n'
@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Thread-safe in-process cache whose entries expire after `ttl` seconds.
+
+    Each worker process keeps its own copy, so writers should call
+    `invalidate` for immediate consistency and rely on the TTL to bound
+    staleness in other processes.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return a cached value, or `default` if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        """Store a value for the configured TTL"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_set(self, key, factory):
+        """Return a cached value, computing and storing it with `factory` on a miss"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when no key is given"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+class FragmentCache:
+    """LRU of rendered HTML fragments, each stored with the data version it was built from.
+
+    A lookup only hits when the caller's current version matches, so a
+    fragment built by this process is never served after another process
+    changed the data; `invalidate` frees the memory straight away.
+    """
+
+    def __init__(self, size=64):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, name, version, render):
+        """Return the fragment for `name` at `version`, calling `render` on a miss"""
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is not None and entry[0] == version:
+                self._data.move_to_end(name)
+                return entry[1]
+        html = render()
+        with self._lock:
+            self._data[name] = (version, html)
+            self._data.move_to_end(name)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+        return html
+
+    def invalidate(self, name=None):
+        """Drop one fragment, or everything when no name is given"""
+        with self._lock:
+            if name is None:
+                self._data.clear()
+            else:
+                self._data.pop(name, None)
@@ -0,0 +1,213 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func, literal_column
+from models import db, Complaint, ArchivedComplaint, ComplaintStat, upsert
+
+BATCH_SIZE = 500
+
+CATEGORIES = {
+    'plumbing': 'Plumbing',
+    'electrical': 'Electrical',
+    'internet': 'Internet / Wi-Fi',
+    'cleaning': 'Cleaning',
+    'furniture': 'Furniture',
+    'security': 'Security',
+    'food': 'Food',
+    'other': 'Other',
+}
+DEFAULT_CATEGORY = 'other'
+
+PRIORITIES = {1: 'Urgent', 2: 'High', 3: 'Normal', 4: 'Low'}
+DEFAULT_PRIORITY = 3
+# Priority a new complaint starts at, by category (others get DEFAULT_PRIORITY)
+CATEGORY_PRIORITY = {'security': 1, 'electrical': 2, 'plumbing': 2}
+# Hours from raising (or reopening) a complaint to its resolution deadline, by priority
+SLA_HOURS = {1: 4, 2: 24, 3: 72, 4: 168}
+
+STATUSES = {
+    'pending': 'Pending',
+    'assigned': 'Assigned',
+    'in_progress': 'In Progress',
+    'resolved': 'Resolved',
+    'reopened': 'Reopened',
+}
+OPEN_STATUSES = ('pending', 'assigned', 'in_progress', 'reopened')
+TRANSITIONS = {
+    'pending': ('assigned', 'in_progress', 'resolved'),
+    'assigned': ('in_progress', 'resolved'),
+    'in_progress': ('resolved',),
+    'resolved': ('reopened',),
+    'reopened': ('assigned', 'in_progress', 'resolved'),
+}
+
+def open_complaint():
+    """Condition for unresolved complaints.
+
+    Spelled exactly like the WHERE clause of ix_complaints_sla_queue (a
+    literal, not a bound parameter) so SQLite can use the partial index.
+    """
+    return Complaint.status != literal_column("'resolved'")
+
+def naive_utc(value):
+    # New rows carry an aware created_at until reloaded; SQLite hands back naive UTC
+    return value.replace(tzinfo=None) if value is not None and value.tzinfo else value
+
+def sla_due(start, priority):
+    """Resolution deadline for a complaint raised or reopened at `start`"""
+    return naive_utc(start) + timedelta(hours=SLA_HOURS.get(priority, SLA_HOURS[DEFAULT_PRIORITY]))
+
+def new_complaint_fields(category, now=None):
+    """Category, priority, created_at and due_at for a newly raised complaint"""
+    now = now or datetime.utcnow()
+    category = category if category in CATEGORIES else DEFAULT_CATEGORY
+    priority = CATEGORY_PRIORITY.get(category, DEFAULT_PRIORITY)
+    return {'category': category, 'priority': priority, 'created_at': now, 'due_at': sla_due(now, priority)}
+
+def record_resolution(property_id, category, created_at, resolved_at, due_at, sign=1):
+    """Add (sign=1) or take back (sign=-1) one resolution in the running complaint_stats totals.
+
+    A single-row upsert on the (property_id, category) key, so the totals
+    never need recomputing from the complaint tables and two first
+    resolutions in a category can't both insert the row.
+    """
+    seconds = (naive_utc(resolved_at) - naive_utc(created_at)).total_seconds()
+    within = int(due_at is None or naive_utc(resolved_at) <= naive_utc(due_at))
+    category = category or DEFAULT_CATEGORY
+    deltas = {'resolved': ComplaintStat.resolved + sign,
+              'total_seconds': ComplaintStat.total_seconds + sign * seconds,
+              'within_sla': ComplaintStat.within_sla + sign * within}
+    if sign < 0:
+        # Nothing to take back from a row that was never written
+        db.session.execute(
+            update(ComplaintStat)
+            .where(ComplaintStat.property_id == property_id, ComplaintStat.category == category)
+            .values(**deltas)
+        )
+        return
+    db.session.execute(
+        upsert(ComplaintStat)
+        .values(property_id=property_id, category=category, resolved=1, total_seconds=seconds, within_sla=within)
+        .on_conflict_do_update(index_elements=[ComplaintStat.property_id, ComplaintStat.category], set_=deltas)
+    )
+
+def transition(complaint, status, now=None):
+    """Move a complaint to `status`, keeping resolved_at, due_at and the stats in step.
+
+    Raises ValueError if the workflow does not allow the move. The caller commits.
+    """
+    if status not in TRANSITIONS.get(complaint.status, ()):
+        raise ValueError(f"Cannot move a complaint from {STATUSES.get(complaint.status, complaint.status)} "
+                         f"to {STATUSES.get(status, status)}")
+    now = now or datetime.utcnow()
+    if complaint.status == 'resolved':
+        # Reopened: the earlier resolution no longer counts, and the SLA clock restarts
+        record_resolution(complaint.property_id, complaint.category, complaint.created_at,
+                          complaint.resolved_at, complaint.due_at, sign=-1)
+        complaint.resolved_at = None
+        complaint.due_at = sla_due(now, complaint.priority)
+    complaint.status = status
+    if status == 'resolved':
+        complaint.resolved_at = now
+        record_resolution(complaint.property_id, complaint.category, complaint.created_at,
+                          now, complaint.due_at)
+
+def set_priority(complaint, priority):
+    """Change an open complaint's priority, moving its deadline by the difference in SLA hours"""
+    if priority not in PRIORITIES:
+        raise ValueError('Unknown priority')
+    if complaint.status == 'resolved':
+        raise ValueError('A resolved complaint keeps the priority it was resolved at')
+    if complaint.due_at is not None:
+        complaint.due_at = naive_utc(complaint.due_at) + timedelta(
+            hours=SLA_HOURS[priority] - SLA_HOURS.get(complaint.priority, SLA_HOURS[DEFAULT_PRIORITY]))
+    complaint.priority = priority
+
+def sla_queue(property_id=None):
+    """Unresolved complaints, to be read in (due_at, id) order.
+
+    Ordered that way, SQLite walks ix_complaints_sla_queue (or its
+    per-property twin), so the next N most urgent are found without
+    touching resolved rows or sorting.
+    """
+    query = Complaint.query.filter(open_complaint())
+    if property_id:
+        query = query.filter(Complaint.property_id == property_id)
+    return query
+
+def category_stats(property_id=None):
+    """Resolution counts, average hours and on-time share per category, from complaint_stats"""
+    query = select(
+        ComplaintStat.category,
+        func.sum(ComplaintStat.resolved).label('resolved'),
+        func.sum(ComplaintStat.total_seconds).label('total_seconds'),
+        func.sum(ComplaintStat.within_sla).label('within_sla'),
+    ).group_by(ComplaintStat.category)
+    if property_id:
+        query = query.where(ComplaintStat.property_id == property_id)
+    stats = []
+    for row in db.session.execute(query):
+        if not row.resolved:
+            continue
+        stats.append({
+            'category': row.category,
+            'label': CATEGORIES.get(row.category, row.category),
+            'resolved': row.resolved,
+            'average_hours': row.total_seconds / row.resolved / 3600,
+            'within_sla': row.within_sla * 100 / row.resolved,
+        })
+    return sorted(stats, key=lambda stat: stat['label'])
+
+def rebuild_complaint_stats(batch_size=BATCH_SIZE):
+    """Recompute complaint_stats from live and archived resolved complaints. Returns the rows written."""
+    totals = {}
+    for model in (Complaint, ArchivedComplaint):
+        after_id = 0
+        while True:
+            rows = db.session.execute(
+                select(model.id, model.property_id, model.category, model.created_at, model.resolved_at,
+                       model.due_at)
+                .where(model.id > after_id, model.status == 'resolved', model.resolved_at.isnot(None))
+                .order_by(model.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            after_id = rows[-1].id
+            for row in rows:
+                key = (row.property_id, row.category or DEFAULT_CATEGORY)
+                total = totals.setdefault(key, [0, 0.0, 0])
+                total[0] += 1
+                total[1] += (row.resolved_at - row.created_at).total_seconds()
+                total[2] += int(row.due_at is None or row.resolved_at <= row.due_at)
+    db.session.execute(ComplaintStat.__table__.delete())
+    if totals:
+        db.session.execute(ComplaintStat.__table__.insert(), [
+            {'property_id': property_id, 'category': category, 'resolved': resolved,
+             'total_seconds': seconds, 'within_sla': within}
+            for (property_id, category), (resolved, seconds, within) in sorted(totals.items())
+        ])
+    db.session.commit()
+    return len(totals)
+
+def backfill_workflow(batch_size=BATCH_SIZE):
+    """Give complaints from before categories and SLAs the default category, priority and deadline.
+
+    Returns the number of rows filled in.
+    """
+    filled = 0
+    for model in (Complaint, ArchivedComplaint):
+        db.session.execute(update(model).where(model.category.is_(None)).values(category=DEFAULT_CATEGORY))
+        db.session.execute(update(model).where(model.priority.is_(None)).values(priority=DEFAULT_PRIORITY))
+        while True:
+            rows = db.session.execute(
+                select(model.id, model.created_at, model.priority)
+                .where(model.due_at.is_(None), model.created_at.isnot(None))
+                .order_by(model.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            db.session.execute(update(model), [
+                {'id': row.id, 'due_at': sla_due(row.created_at, row.priority)} for row in rows
+            ])
+            db.session.commit()
+            filled += len(rows)
+    db.session.commit()
+    return filled
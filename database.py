@@ -0,0 +1,65 @@
+import os
+import sqlite3
+from sqlalchemy import event
+
+DEFAULT_DATABASE_URL = 'sqlite:///database.db'
+
+def env_int(environ, name, default):
+    """Read an integer setting from the environment"""
+    value = environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+def database_uri(environ=os.environ):
+    """Database URI from DATABASE_URL, defaulting to the local SQLite file"""
+    uri = environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL
+    # Some hosts still hand out the pre-SQLAlchemy-1.4 scheme
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def engine_options(uri, environ=os.environ):
+    """Connection pool settings for the configured database.
+
+    SQLite only gets a pool large enough for the worker threads, since every
+    connection shares one file lock. Server databases get a full pool profile
+    with pre-ping and recycling so idle connections dropped by the server or a
+    proxy are replaced transparently.
+    """
+    if uri.startswith('sqlite'):
+        return {
+            'pool_size': env_int(environ, 'DB_POOL_SIZE', 10),
+            'max_overflow': env_int(environ, 'DB_MAX_OVERFLOW', 10),
+        }
+    return {
+        'pool_size': env_int(environ, 'DB_POOL_SIZE', 10),
+        'max_overflow': env_int(environ, 'DB_MAX_OVERFLOW', 20),
+        'pool_timeout': env_int(environ, 'DB_POOL_TIMEOUT', 30),
+        'pool_recycle': env_int(environ, 'DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True,
+    }
+
+def sqlite_pragmas(environ=os.environ):
+    """PRAGMA statements applied to every new SQLite connection.
+
+    WAL lets readers run alongside the single writer, busy_timeout makes a
+    writer wait for the lock instead of failing with "database is locked",
+    and synchronous=NORMAL is durable under WAL while avoiding an fsync per
+    commit. Setting a variable to an empty string skips that pragma.
+    """
+    settings = [
+        ('journal_mode', environ.get('SQLITE_JOURNAL_MODE', 'WAL')),
+        ('busy_timeout', environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        ('synchronous', environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+    ]
+    return [f'PRAGMA {name}={value}' for name, value in settings if value]
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run `pragmas` on each new connection the engine opens"""
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
@@ -0,0 +1,142 @@
+import threading
+from datetime import date, datetime, timezone
+from sqlalchemy import select, func, extract, exists, and_
+from sqlalchemy.orm import aliased
+from models import db, Payment, PaymentDuplicate, ArchivedPayment, ScanCheckpoint, upsert
+
+BATCH_SIZE = 1000
+CHECKPOINT = 'duplicates'
+
+REASONS = {
+    'transaction_id': 'Transaction ID already used',
+    'same_month': 'Same tenant, month, year and amount',
+}
+
+def find_duplicate(tenant_id, month, amount, payment_date, transaction_id):
+    """Earliest existing payment a new submission would repeat, as (payment_id, reason), or None.
+
+    Both checks are single index lookups: ix_payments_transaction_id, and
+    ix_payments_tenant_month narrowed to the payment date's year, each
+    repeated on the matching payments_archive index.
+    """
+    for model in (ArchivedPayment, Payment):
+        payment_id = db.session.execute(
+            select(model.id).where(model.transaction_id == transaction_id)
+            .order_by(model.id).limit(1)
+        ).scalar()
+        if payment_id:
+            return payment_id, 'transaction_id'
+    for model in (ArchivedPayment, Payment):
+        payment_id = db.session.execute(
+            select(model.id).where(
+                model.tenant_id == tenant_id,
+                model.month == month,
+                model.payment_date.between(date(payment_date.year, 1, 1), date(payment_date.year, 12, 31)),
+                model.amount == amount,
+            ).order_by(model.id).limit(1)
+        ).scalar()
+        if payment_id:
+            return payment_id, 'same_month'
+    return None
+
+def open_flag():
+    """Condition matching payments with an undismissed duplicate flag"""
+    return exists().where(PaymentDuplicate.payment_id == Payment.id, PaymentDuplicate.dismissed == False)
+
+def duplicate_flags(payment_ids):
+    """Open flags for the given payments, keyed by payment id"""
+    if not payment_ids:
+        return {}
+    flags = PaymentDuplicate.query.filter(
+        PaymentDuplicate.payment_id.in_(payment_ids), PaymentDuplicate.dismissed == False
+    ).all()
+    return {flag.payment_id: flag for flag in flags}
+
+def scan_checkpoint(name=CHECKPOINT):
+    """Highest payment id the scan has covered, 0 before its first pass"""
+    return db.session.execute(
+        select(ScanCheckpoint.last_id).where(ScanCheckpoint.name == name)
+    ).scalar() or 0
+
+def save_checkpoint(last_id, name=CHECKPOINT):
+    """Record scan progress in the caller's transaction"""
+    db.session.execute(
+        upsert(ScanCheckpoint)
+        .values(name=name, last_id=last_id, updated_at=datetime.now(timezone.utc))
+        .on_conflict_do_update(index_elements=[ScanCheckpoint.name],
+                               set_={'last_id': last_id, 'updated_at': datetime.now(timezone.utc)})
+    )
+
+def scan_duplicates(after_id=0, batch_size=BATCH_SIZE, checkpoint=None):
+    """Flag payments newer than `after_id` that repeat an earlier payment.
+
+    Works through new payments `batch_size` at a time; each batch is joined
+    to earlier payments through the same indexes the submission check uses,
+    so no payment is compared against the whole table. Payments that already
+    have a flag (open or dismissed) and discarded payments are left alone.
+    Commits once per batch, saving progress under `checkpoint` in the same
+    commit if given, and returns (payments flagged, highest payment id
+    scanned).
+    """
+    later = aliased(Payment)
+    earlier = aliased(Payment)
+    matches = {
+        'transaction_id': earlier.transaction_id == later.transaction_id,
+        'same_month': and_(
+            earlier.tenant_id == later.tenant_id,
+            earlier.month == later.month,
+            earlier.amount == later.amount,
+            extract('year', earlier.payment_date) == extract('year', later.payment_date),
+        ),
+    }
+    flagged = 0
+    while True:
+        ids = db.session.execute(
+            select(Payment.id).where(Payment.id > after_id).order_by(Payment.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        found = {}
+        for reason, condition in matches.items():
+            rows = db.session.execute(
+                select(later.id, func.min(earlier.id))
+                .join(earlier, and_(condition, earlier.id < later.id, earlier.status != 'discarded'))
+                .where(later.id.between(ids[0], ids[-1]), later.status != 'discarded',
+                       ~exists().where(PaymentDuplicate.payment_id == later.id))
+                .group_by(later.id)
+            ).all()
+            for payment_id, original_id in rows:
+                found.setdefault(payment_id, (original_id, reason))
+        if found:
+            db.session.execute(PaymentDuplicate.__table__.insert(), [
+                {'payment_id': payment_id, 'duplicate_of_id': original_id, 'reason': reason, 'dismissed': False}
+                for payment_id, (original_id, reason) in sorted(found.items())
+            ])
+        if checkpoint:
+            save_checkpoint(ids[-1], checkpoint)
+        db.session.commit()
+        flagged += len(found)
+        after_id = ids[-1]
+    return flagged, after_id
+
+class DuplicateScanner:
+    """Incremental duplicate scan, run as a recurring background job.
+
+    Each pass only looks at payments added since the previous pass, which
+    is recorded in scan_checkpoints so it carries across processes and
+    restarts. The first pass covers the whole table, which is how
+    duplicates that predate the submission check, came in through imports
+    or slipped past it in a race get flagged.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def scan(self):
+        """Run one pass now. Returns the number of payments flagged."""
+        with self._lock:
+            flagged, _ = scan_duplicates(scan_checkpoint(), checkpoint=CHECKPOINT)
+        return flagged
+
+# Shared by the scan job and the CLI command
+duplicate_scanner = DuplicateScanner()
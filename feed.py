@@ -0,0 +1,77 @@
+import threading
+from sqlalchemy import select, delete
+from models import db, AdminEvent
+
+class EventFeed:
+    """Change feed behind the live admin payment and complaint tables.
+
+    Writes record an event in the same transaction as the change, so every
+    process sees the same numbered sequence and a client can resume from
+    the last id it received. Streams in the writing process are woken at
+    once; streams in other processes pick the event up on their next poll,
+    a primary key range read. Open streams per process are capped, since
+    each holds a worker thread; clients beyond the cap are told to poll.
+    """
+
+    def __init__(self, max_streams=2, batch_size=100):
+        self.batch_size = batch_size
+        self.configure(max_streams)
+        self._changed = threading.Condition()
+        self._sequence = 0
+
+    def configure(self, max_streams=2):
+        self.max_streams = max_streams
+        self._slots = threading.BoundedSemaphore(max_streams) if max_streams else None
+
+    def record(self, kind, action, rows):
+        """Add one event per (ref_id, property_id) in `rows`, in the caller's transaction"""
+        if rows:
+            db.session.execute(AdminEvent.__table__.insert(), [
+                {'kind': kind, 'action': action, 'ref_id': ref_id, 'property_id': property_id}
+                for ref_id, property_id in rows
+            ])
+
+    def notify(self):
+        """Wake this process's streams; call after committing recorded events"""
+        with self._changed:
+            self._sequence += 1
+            self._changed.notify_all()
+
+    def latest_id(self):
+        return db.session.execute(select(AdminEvent.id).order_by(AdminEvent.id.desc()).limit(1)).scalar() or 0
+
+    def since_query(self, cursor, property_id=None):
+        query = select(AdminEvent).where(AdminEvent.id > cursor).order_by(AdminEvent.id).limit(self.batch_size)
+        if property_id:
+            query = query.where(AdminEvent.property_id == property_id)
+        return query
+
+    def since(self, cursor, property_id=None):
+        """Events after `cursor`, oldest first, limited to one property if given"""
+        return db.session.execute(self.since_query(cursor, property_id)).scalars().all()
+
+    def wait(self, seen, timeout):
+        """Block until notify() moves past `seen` or `timeout` passes. Returns the current sequence."""
+        with self._changed:
+            if self._sequence == seen:
+                self._changed.wait(timeout)
+            return self._sequence
+
+    @property
+    def sequence(self):
+        return self._sequence
+
+    def acquire_stream(self):
+        return self._slots is not None and self._slots.acquire(blocking=False)
+
+    def release_stream(self):
+        self._slots.release()
+
+    def purge(self, before):
+        """Delete events older than `before` (a datetime). Returns the count."""
+        count = db.session.execute(delete(AdminEvent).where(AdminEvent.created_at < before)).rowcount
+        db.session.commit()
+        return count
+
+# Shared by the routes that write payments and complaints; app.py configures it
+admin_feed = EventFeed()
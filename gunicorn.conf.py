@@ -0,0 +1,33 @@
+"""Gunicorn settings for production serving; `gunicorn` picks this file up from the working directory.
+
+Run `flask --app app init-db` and `flask --app app compress-static` once per
+deploy first. Settings can be overridden on the command line or with
+GUNICORN_CMD_ARGS.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+
+# One process per core for the Python work, with threads to overlap requests
+# waiting on SQLite, password hashing or the disk
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+
+# Import the app once in the master and fork workers from it, so a worker
+# starts in milliseconds and shares the loaded code with the others
+preload_app = True
+
+# Replace workers now and then to bound the growth of per-process caches
+max_requests = 5000
+max_requests_jitter = 500
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+
+def post_fork(server, worker):
+    from app import after_fork
+    after_fork()
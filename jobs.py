@@ -0,0 +1,261 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+Job = namedtuple('Job', 'id name payload attempts max_attempts')
+
+def to_timestamp(moment):
+    """Seconds since the epoch for a naive UTC datetime"""
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+def from_timestamp(seconds):
+    """Naive UTC datetime, matching datetime.utcnow()"""
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+class JobQueue:
+    """Persistent job queue in a small SQLite file of its own, separate from the app database.
+
+    A job is claimed by one worker at a time with a lease; if the worker dies
+    the lease runs out and the job becomes claimable again. Failed jobs are
+    retried with exponential backoff until `max_attempts` is reached. Several
+    processes may share one queue file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._local = threading.local()
+        if path:
+            self.configure(path)
+
+    def configure(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS jobs ('
+                         'id INTEGER PRIMARY KEY, name TEXT NOT NULL, payload TEXT NOT NULL, '
+                         "status TEXT NOT NULL DEFAULT 'queued', run_at REAL NOT NULL, "
+                         'attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, '
+                         'locked_until REAL, last_error TEXT, unique_key TEXT, '
+                         'created_at REAL NOT NULL, finished_at REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_status_run_at ON jobs (status, run_at)')
+            # At most one queued or running job per key
+            conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS ix_jobs_active_key ON jobs (unique_key) '
+                         "WHERE status IN ('queued', 'running')")
+            conn.execute('CREATE TABLE IF NOT EXISTS schedules (name TEXT PRIMARY KEY, next_run REAL NOT NULL)')
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, name, payload=None, run_at=None, max_attempts=5, unique_key=None):
+        """Add a job. Returns its id, or None if a job with `unique_key` is already pending."""
+        now = time.time()
+        with self.connection() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO jobs (name, payload, run_at, max_attempts, unique_key, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (name, json.dumps(payload or {}), run_at or now, max_attempts, unique_key, now))
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, lease):
+        """Take the next due job for `lease` seconds, or return None"""
+        now = time.time()
+        with self.connection() as conn:
+            # Jobs whose worker stopped without finishing them count as a failed attempt
+            conn.execute("UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+                         "last_error = 'Lease expired', finished_at = ? WHERE status = 'running' AND locked_until < ?",
+                         (now, now))
+            row = conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' AND run_at <= ? ORDER BY run_at, id LIMIT 1) "
+                'RETURNING id, name, payload, attempts, max_attempts',
+                (now + lease, now)).fetchone()
+        if row is None:
+            return None
+        return Job(row[0], row[1], json.loads(row[2]), row[3], row[4])
+
+    def complete(self, job):
+        with self.connection() as conn:
+            conn.execute("UPDATE jobs SET status = 'done', locked_until = NULL, finished_at = ? WHERE id = ?",
+                         (time.time(), job.id))
+
+    def fail(self, job, error, retry_delay, final=False):
+        """Record a failed attempt; the job is retried after a backoff unless it has run out of attempts"""
+        now = time.time()
+        with self.connection() as conn:
+            if final or job.attempts >= job.max_attempts:
+                conn.execute("UPDATE jobs SET status = 'failed', locked_until = NULL, last_error = ?, "
+                             'finished_at = ? WHERE id = ?', (error, now, job.id))
+            else:
+                conn.execute("UPDATE jobs SET status = 'queued', locked_until = NULL, last_error = ?, "
+                             'run_at = ? WHERE id = ?',
+                             (error, now + retry_delay * 2 ** (job.attempts - 1), job.id))
+
+    def next_run(self, name):
+        row = self.connection().execute('SELECT next_run FROM schedules WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def advance_schedule(self, name, previous, next_run):
+        """Move a schedule from `previous` to `next_run`. False if another process already did."""
+        with self.connection() as conn:
+            if previous is None:
+                cursor = conn.execute('INSERT OR IGNORE INTO schedules (name, next_run) VALUES (?, ?)',
+                                      (name, next_run))
+            else:
+                cursor = conn.execute('UPDATE schedules SET next_run = ? WHERE name = ? AND next_run = ?',
+                                      (next_run, name, previous))
+            return cursor.rowcount == 1
+
+    def stats(self):
+        """Job counts by status"""
+        return dict(self.connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+    def recent_failures(self, limit=20):
+        return self.connection().execute(
+            "SELECT id, name, attempts, last_error, finished_at FROM jobs WHERE status = 'failed' "
+            'ORDER BY finished_at DESC LIMIT ?', (limit,)).fetchall()
+
+    def purge(self, before):
+        """Delete finished jobs older than `before` (a timestamp). Returns the count."""
+        with self.connection() as conn:
+            return conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                                (before,)).rowcount
+
+class JobScheduler:
+    """Runs queued jobs on a worker thread pool and enqueues recurring jobs when they are due.
+
+    Tasks are plain functions taking the job payload; each runs inside an app
+    context. Recurring schedules are kept in the queue file, so a restart
+    picks up where the last process left off. With `catch_up`, every run
+    missed while no process was up is enqueued in turn; otherwise only one.
+    """
+
+    def __init__(self, queue, workers=2, poll_interval=2, lease=600, retry_delay=60, max_attempts=5):
+        self.queue = queue
+        self.tasks = {}
+        self.schedules = {}
+        self.configure(workers, poll_interval, lease, retry_delay, max_attempts)
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def configure(self, workers=2, poll_interval=2, lease=600, retry_delay=60, max_attempts=5):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+
+    def task(self, name):
+        """Decorator registering a function as the handler for jobs called `name`"""
+        def register(func):
+            self.tasks[name] = func
+            return func
+        return register
+
+    def recurring(self, name, next_run, catch_up=False):
+        """Enqueue job `name` at the times given by `next_run(after)`, which maps a datetime to the next one.
+
+        The job payload carries the time it was scheduled for as 'scheduled_for'.
+        """
+        self.schedules[name] = (next_run, catch_up)
+
+    def enqueue(self, name, payload=None, unique_key=None, run_at=None):
+        job_id = self.queue.enqueue(name, payload, run_at=run_at, max_attempts=self.max_attempts,
+                                    unique_key=unique_key)
+        self._wake.set()
+        return job_id
+
+    def enqueue_due(self):
+        """Enqueue every recurring job whose time has come"""
+        now = datetime.utcnow()
+        for name, (next_run, catch_up) in self.schedules.items():
+            scheduled = self.queue.next_run(name)
+            if scheduled is None:
+                self.queue.advance_schedule(name, None, to_timestamp(next_run(now)))
+                continue
+            if scheduled > to_timestamp(now):
+                continue
+            scheduled_for = from_timestamp(scheduled)
+            following = next_run(scheduled_for) if catch_up else next_run(now)
+            # Only the process that moves the schedule on enqueues the run
+            if self.queue.advance_schedule(name, scheduled, to_timestamp(following)):
+                self.enqueue(name, {'scheduled_for': scheduled_for.isoformat()},
+                             unique_key=f'{name}@{scheduled_for.isoformat()}')
+
+    def run_pending(self, app, limit=None):
+        """Run due jobs in the calling thread until none are left (or `limit` ran). Returns the count."""
+        ran = 0
+        while limit is None or ran < limit:
+            job = self.queue.claim(self.lease)
+            if job is None:
+                break
+            self.execute(app, job)
+            ran += 1
+        return ran
+
+    def execute(self, app, job):
+        handler = self.tasks.get(job.name)
+        if handler is None:
+            self.queue.fail(job, f'No task named {job.name!r}', self.retry_delay, final=True)
+            return
+        with app.app_context():
+            try:
+                handler(job.payload)
+            except Exception as e:
+                app.logger.exception('Job %s (%s) failed on attempt %s', job.id, job.name, job.attempts)
+                self.queue.fail(job, f'{type(e).__name__}: {e}', self.retry_delay)
+                return
+        self.queue.complete(job)
+
+    def start(self, app):
+        """Start the dispatcher thread and worker pool (once per process)"""
+        if self._thread is not None or not self.workers:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._start(app)
+
+    def _start(self, app):
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+        slots = threading.BoundedSemaphore(self.workers)
+
+        def work(job):
+            try:
+                self.execute(app, job)
+            finally:
+                slots.release()
+                self._wake.set()
+
+        def dispatch():
+            while True:
+                try:
+                    self.enqueue_due()
+                    while slots.acquire(blocking=False):
+                        job = self.queue.claim(self.lease)
+                        if job is None:
+                            slots.release()
+                            break
+                        executor.submit(work, job)
+                except Exception:
+                    app.logger.exception('Job dispatcher failed')
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+        self._thread = threading.Thread(target=dispatch, name='job-dispatcher', daemon=True)
+        self._thread.start()
+
+# Shared by the app and modules that queue work; app.py configures and starts them
+job_queue = JobQueue()
+scheduler = JobScheduler(job_queue)
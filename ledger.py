@@ -0,0 +1,176 @@
+from calendar import monthrange
+from datetime import date
+from sqlalchemy import select, delete
+from models import db, User, MonthlyLedger
+from archive import payment_source
+
+MONTH_NAMES = [
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+]
+MONTH_NUMBERS = {name: idx for idx, name in enumerate(MONTH_NAMES, start=1)}
+BATCH_SIZE = 500
+
+def ledger_period(month_name, payment_date):
+    """Return the (year, month) a payment counts towards, or None.
+
+    Matches the monthly status report: a payment only counts for the month it
+    names if its payment date also falls inside that month.
+    """
+    month = MONTH_NUMBERS.get(month_name)
+    if month is None or payment_date.month != month:
+        return None
+    return payment_date.year, month
+
+def summarize_period(payments):
+    """Reduce one tenant-month of payments (newest first) to ledger values"""
+    approved = [p for p in payments if p.status == 'approved']
+    pending = [p for p in payments if p.status == 'pending']
+    if not approved and not pending:
+        return None
+    return {
+        'status': 'paid' if approved else 'pending',
+        'amount_paid': sum(p.amount for p in approved),
+        'latest_payment_id': (approved or pending)[0].id,
+    }
+
+def refresh_ledger_entry(tenant_id, year, month):
+    """Recompute one tenant-month from its payments, archived ones included.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    month_start = date(year, month, 1)
+    month_end = date(year, month, monthrange(year, month)[1])
+    payments = payment_source(month_start)
+    payments = db.session.execute(
+        select(payments)
+        .where(
+            payments.c.tenant_id == tenant_id,
+            payments.c.month == MONTH_NAMES[month - 1],
+            payments.c.payment_date.between(month_start, month_end),
+        )
+        .order_by(payments.c.created_at.desc(), payments.c.id.desc())
+    ).all()
+    values = summarize_period(payments)
+    entry = MonthlyLedger.query.filter_by(tenant_id=tenant_id, year=year, month=month).first()
+
+    if values is None:
+        if entry:
+            db.session.delete(entry)
+        return
+    if entry is None:
+        entry = MonthlyLedger(tenant_id=tenant_id, year=year, month=month)
+        db.session.add(entry)
+    entry.status = values['status']
+    entry.amount_paid = values['amount_paid']
+    entry.latest_payment_id = values['latest_payment_id']
+
+def update_ledger_for_payment(payment):
+    """Refresh the ledger entry a new or changed payment belongs to"""
+    period = ledger_period(payment.month, payment.payment_date)
+    if period:
+        # Make sure the payment itself is visible to the recompute
+        db.session.flush()
+        refresh_ledger_entry(payment.tenant_id, *period)
+
+def refresh_ledger_entries(periods, batch_size=BATCH_SIZE):
+    """Recompute the given (tenant_id, year, month) entries, archived payments included.
+
+    refresh_ledger_entry for many tenant-months at once: one read of each
+    month's payments per batch of tenants, then the old entries are replaced
+    in bulk. Runs inside the caller's transaction and returns the number of
+    entries written.
+    """
+    months = {}
+    for tenant_id, year, month in set(periods):
+        months.setdefault((year, month), []).append(tenant_id)
+
+    written = 0
+    for (year, month), tenant_ids in sorted(months.items()):
+        month_start = date(year, month, 1)
+        month_end = date(year, month, monthrange(year, month)[1])
+        payments = payment_source(month_start)
+        tenant_ids.sort()
+        for start in range(0, len(tenant_ids), batch_size):
+            batch = tenant_ids[start:start + batch_size]
+            rows = db.session.execute(
+                select(payments.c.id, payments.c.tenant_id, payments.c.amount, payments.c.status)
+                .where(
+                    payments.c.tenant_id.in_(batch),
+                    payments.c.month == MONTH_NAMES[month - 1],
+                    payments.c.payment_date.between(month_start, month_end),
+                )
+                .order_by(payments.c.tenant_id, payments.c.created_at.desc(), payments.c.id.desc())
+            ).all()
+            by_tenant = {}
+            for row in rows:
+                by_tenant.setdefault(row.tenant_id, []).append(row)
+            db.session.execute(
+                delete(MonthlyLedger)
+                .where(MonthlyLedger.tenant_id.in_(batch), MonthlyLedger.year == year, MonthlyLedger.month == month)
+                .execution_options(synchronize_session=False)
+            )
+            entries = []
+            for tenant_id, tenant_payments in sorted(by_tenant.items()):
+                values = summarize_period(tenant_payments)
+                if values:
+                    entries.append(dict(values, tenant_id=tenant_id, year=year, month=month))
+            if entries:
+                db.session.execute(MonthlyLedger.__table__.insert(), entries)
+            written += len(entries)
+    return written
+
+def rebuild_tenant_ledgers(tenant_ids):
+    """Recompute every ledger entry for the given tenants.
+
+    Runs inside the caller's transaction and returns the number of entries
+    written.
+    """
+    MonthlyLedger.query.filter(
+        MonthlyLedger.tenant_id.in_(tenant_ids)
+    ).delete(synchronize_session=False)
+
+    payments = payment_source()
+    rows = db.session.execute(
+        select(payments.c.id, payments.c.tenant_id, payments.c.month, payments.c.amount,
+               payments.c.payment_date, payments.c.status)
+        .where(payments.c.tenant_id.in_(tenant_ids))
+        .order_by(payments.c.tenant_id, payments.c.created_at.desc(), payments.c.id.desc())
+    ).all()
+
+    periods = {}
+    for row in rows:
+        period = ledger_period(row.month, row.payment_date)
+        if period:
+            periods.setdefault((row.tenant_id,) + period, []).append(row)
+
+    entries = []
+    for (tenant_id, year, month), payments in periods.items():
+        values = summarize_period(payments)
+        if values:
+            entries.append(dict(values, tenant_id=tenant_id, year=year, month=month))
+    if entries:
+        db.session.execute(MonthlyLedger.__table__.insert(), entries)
+    return len(entries)
+
+def rebuild_ledger(batch_size=500):
+    """Recreate the whole ledger from payment history, archived payments included.
+
+    Works through tenants `batch_size` at a time so memory stays bounded, and
+    commits once per batch. Returns the number of entries written.
+    """
+    MonthlyLedger.query.delete()
+    db.session.commit()
+
+    written = 0
+    last_tenant_id = 0
+    while True:
+        tenant_ids = db.session.execute(
+            select(User.id).where(User.id > last_tenant_id).order_by(User.id).limit(batch_size)
+        ).scalars().all()
+        if not tenant_ids:
+            break
+        last_tenant_id = tenant_ids[-1]
+        written += rebuild_tenant_ledgers(tenant_ids)
+        db.session.commit()
+    return written
@@ -1,18 +1,71 @@
+import zlib
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects import postgresql, sqlite
+from passwords import password_hasher
 from datetime import datetime, timezone
 
 db = SQLAlchemy()
 
+class CompressedText(db.TypeDecorator):
+    """Text stored zlib-compressed, for archive columns that are written once and rarely read"""
+    impl = db.LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        return None if value is None else zlib.compress(value.encode('utf-8'), 9)
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else zlib.decompress(value).decode('utf-8')
+
+class Property(db.Model):
+    """A building; tenants, payments and complaints each belong to one"""
+    __tablename__ = 'properties'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    address = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    rooms = db.relationship('Room', backref='property', lazy=True, order_by='Room.number')
+    
+    def __repr__(self):
+        return f'<Property {self.name}>'
+
+class Room(db.Model):
+    """A room in a property, with the number of tenants it can hold"""
+    __tablename__ = 'rooms'
+    __table_args__ = (
+        # Also serves listing a property's rooms
+        db.UniqueConstraint('property_id', 'number', name='uq_rooms_property_number'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
+    number = db.Column(db.String(10), nullable=False)
+    capacity = db.Column(db.Integer, default=1, nullable=False)
+    
+    def __repr__(self):
+        return f'<Room {self.number}>'
+
 class User(db.Model):
     """Tenant model"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Tenant list ordering and the joined-by-month filter
+        db.Index('ix_users_created_at', 'created_at'),
+        # The same, within one property
+        db.Index('ix_users_property_created', 'property_id', 'created_at'),
+        # Room occupancy
+        db.Index('ix_users_room', 'room_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     phone = db.Column(db.String(20), nullable=False)
-    room_number = db.Column(db.String(10), nullable=False)
+    room_number = db.Column(db.String(10), nullable=False)  # Copy of room.number for display
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('rooms.id'), nullable=True)
     monthly_rent = db.Column(db.Float, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     profile_photo = db.Column(db.String(255), nullable=False)
@@ -21,6 +74,7 @@ class User(db.Model):
     deposit_paid_date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     
+    room = db.relationship('Room', lazy=True)
     # Relationship with payments
     payments = db.relationship('Payment', backref='tenant', lazy=True, cascade='all, delete-orphan')
     # Relationship with complaints
@@ -28,11 +82,14 @@ class User(db.Model):
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        """Check password against hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check password against hash, upgrading it if the hash settings changed"""
+        valid, needs_rehash = password_hasher.verify(self.password_hash, password)
+        if needs_rehash:
+            self.set_password(password)
+        return valid
     
     def __repr__(self):
         return f'<User {self.name}>'
@@ -47,11 +104,14 @@ class Admin(db.Model):
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        """Check password against hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check password against hash, upgrading it if the hash settings changed"""
+        valid, needs_rehash = password_hasher.verify(self.password_hash, password)
+        if needs_rehash:
+            self.set_password(password)
+        return valid
     
     def __repr__(self):
         return f'<Admin {self.username}>'
@@ -59,9 +119,29 @@ class Admin(db.Model):
 class Payment(db.Model):
     """Payment model"""
     __tablename__ = 'payments'
+    __table_args__ = (
+        # Per-tenant history, newest first
+        db.Index('ix_payments_tenant_created', 'tenant_id', 'created_at'),
+        # Status-filtered admin listing and dashboard counts
+        db.Index('ix_payments_status_created', 'status', 'created_at'),
+        # Monthly payment status report
+        db.Index('ix_payments_month_date', 'month', 'payment_date'),
+        # Also the same-month duplicate check at submission
+        db.Index('ix_payments_tenant_month', 'tenant_id', 'month', 'payment_date'),
+        # Transaction id reuse check
+        db.Index('ix_payments_transaction_id', 'transaction_id'),
+        # Unfiltered admin listing (keyset pagination on created_at, id)
+        db.Index('ix_payments_created_at', 'created_at'),
+        # The admin listings within one property
+        db.Index('ix_payments_property_created', 'property_id', 'created_at'),
+        db.Index('ix_payments_property_status_created', 'property_id', 'status', 'created_at'),
+        # Payments sharing a proof file (archive and discard cleanup, thumbnail refresh)
+        db.Index('ix_payments_payment_proof', 'payment_proof'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)  # The tenant's
     month = db.Column(db.String(20), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     payment_date = db.Column(db.Date, nullable=False)
@@ -73,18 +153,238 @@ class Payment(db.Model):
     def __repr__(self):
         return f'<Payment {self.id} - {self.month}>'
 
+class PaymentDuplicate(db.Model):
+    """A payment flagged as a likely repeat of an earlier one"""
+    __tablename__ = 'payment_duplicates'
+    __table_args__ = (
+        # Open flags for the admin duplicates queue and the bulk-approve exclusion
+        db.Index('ix_payment_duplicates_open', 'dismissed', 'payment_id'),
+        db.Index('ix_payment_duplicates_original', 'duplicate_of_id'),
+    )
+    
+    payment_id = db.Column(db.Integer, db.ForeignKey('payments.id'), primary_key=True)
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('payments.id'), nullable=False)
+    reason = db.Column(db.String(20), nullable=False)  # transaction_id / same_month
+    dismissed = db.Column(db.Boolean, default=False, nullable=False)  # Admin confirmed it is not a duplicate
+    detected_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    def __repr__(self):
+        return f'<PaymentDuplicate {self.payment_id} of {self.duplicate_of_id}>'
+
 class Complaint(db.Model):
     """Complaint model"""
     __tablename__ = 'complaints'
+    __table_args__ = (
+        db.Index('ix_complaints_tenant_created', 'tenant_id', 'created_at'),
+        db.Index('ix_complaints_status_created', 'status', 'created_at'),
+        db.Index('ix_complaints_created_at', 'created_at'),
+        db.Index('ix_complaints_property_created', 'property_id', 'created_at'),
+        db.Index('ix_complaints_property_status_created', 'property_id', 'status', 'created_at'),
+        # SLA queue: unresolved complaints by deadline (see complaints.open_complaint())
+        db.Index('ix_complaints_sla_queue', 'due_at',
+                 sqlite_where=db.text("status != 'resolved'"), postgresql_where=db.text("status != 'resolved'")),
+        db.Index('ix_complaints_property_sla_queue', 'property_id', 'due_at',
+                 sqlite_where=db.text("status != 'resolved'"), postgresql_where=db.text("status != 'resolved'")),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)  # The tenant's
     subject = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(20), default='pending', nullable=False)
+    category = db.Column(db.String(30), default='other', nullable=False)
+    priority = db.Column(db.Integer, default=3, nullable=False)  # 1 (urgent) to 4 (low)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending / assigned / in_progress / resolved / reopened
+    assigned_to = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    due_at = db.Column(db.DateTime, nullable=True)  # SLA deadline: raised (or reopened) time plus the priority's hours
     resolved_at = db.Column(db.DateTime, nullable=True)
     
     def __repr__(self):
         return f'<Complaint {self.id} - {self.subject}>'
 
+class ArchivedPayment(db.Model):
+    """An approved payment from a closed month, moved out of `payments` (see archive.py)"""
+    __tablename__ = 'payments_archive'
+    __table_args__ = (
+        # "Load older" on the tenant history pages
+        db.Index('ix_payments_archive_tenant_created', 'tenant_id', 'created_at'),
+        # Ledger rebuilds and the same-month duplicate check
+        db.Index('ix_payments_archive_tenant_month', 'tenant_id', 'month', 'payment_date'),
+        db.Index('ix_payments_archive_transaction_id', 'transaction_id'),
+        # Reports over archived months, and how far the archive reaches
+        db.Index('ix_payments_archive_payment_date', 'payment_date'),
+        db.Index('ix_payments_archive_property', 'property_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # The id it had in `payments`
+    tenant_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
+    month = db.Column(db.String(20), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    payment_date = db.Column(db.Date, nullable=False)
+    transaction_id = db.Column(db.String(100), nullable=False)
+    payment_proof = db.Column(db.String(255), nullable=True)  # Original upload path, now a member of proof_pack
+    proof_pack = db.Column(db.String(100), nullable=True)  # Zip file under ARCHIVE_PATH holding the proof
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    
+    def __repr__(self):
+        return f'<ArchivedPayment {self.id} - {self.month}>'
+
+class ArchivedComplaint(db.Model):
+    """A resolved complaint moved out of `complaints` (see archive.py)"""
+    __tablename__ = 'complaints_archive'
+    __table_args__ = (
+        db.Index('ix_complaints_archive_tenant_created', 'tenant_id', 'created_at'),
+        db.Index('ix_complaints_archive_property', 'property_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # The id it had in `complaints`
+    tenant_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    description = db.Column(CompressedText, nullable=False)
+    category = db.Column(db.String(30), nullable=True)
+    priority = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20), nullable=False)
+    assigned_to = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    due_at = db.Column(db.DateTime, nullable=True)
+    resolved_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    
+    def __repr__(self):
+        return f'<ArchivedComplaint {self.id} - {self.subject}>'
+
+class ComplaintStat(db.Model):
+    """Running resolution-time totals over the resolved complaints of one property and category"""
+    __tablename__ = 'complaint_stats'
+    
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), primary_key=True)
+    category = db.Column(db.String(30), primary_key=True)
+    resolved = db.Column(db.Integer, default=0, nullable=False)
+    total_seconds = db.Column(db.Float, default=0, nullable=False)  # Sum of created_at to resolved_at
+    within_sla = db.Column(db.Integer, default=0, nullable=False)  # Resolved by their due_at
+    
+    def __repr__(self):
+        return f'<ComplaintStat {self.property_id} {self.category}: {self.resolved}>'
+
+class MonthlyLedger(db.Model):
+    """Precomputed payment state of one tenant for one month"""
+    __tablename__ = 'monthly_ledger'
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'year', 'month', name='uq_monthly_ledger_tenant_period'),
+        # Month-wide reports filtered by status
+        db.Index('ix_monthly_ledger_period_status', 'year', 'month', 'status'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)  # 1-12
+    status = db.Column(db.String(20), nullable=False)  # paid / pending
+    amount_paid = db.Column(db.Float, default=0, nullable=False)  # Sum of approved payments
+    latest_payment_id = db.Column(db.Integer, nullable=False)  # In payments, or payments_archive once archived
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
+    
+    def __repr__(self):
+        return f'<MonthlyLedger {self.tenant_id} {self.year}-{self.month:02d} {self.status}>'
+
+class RentDue(db.Model):
+    """Rent owed by one tenant for one month, created by the month-start job"""
+    __tablename__ = 'rent_dues'
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'year', 'month', name='uq_rent_dues_tenant_period'),
+        # Reminder job: dues of a month not yet reminded about
+        db.Index('ix_rent_dues_period_reminded', 'year', 'month', 'reminded_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)  # 1-12
+    amount = db.Column(db.Float, nullable=False)  # Pro-rated in the month the tenant joined
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    reminded_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<RentDue {self.tenant_id} {self.year}-{self.month:02d}>'
+
+class AdminEvent(db.Model):
+    """A change to a payment or complaint, for the admin pages' live feed (see feed.py)"""
+    __tablename__ = 'admin_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # payment or complaint
+    action = db.Column(db.String(20), nullable=False)  # created, approved, resolved, updated or discarded
+    ref_id = db.Column(db.Integer, nullable=False)
+    property_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<AdminEvent {self.id} {self.kind} {self.ref_id} {self.action}>'
+
+class ScanCheckpoint(db.Model):
+    """Highest row id a background scan has covered, so any process resumes from there"""
+    __tablename__ = 'scan_checkpoints'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    
+    def __repr__(self):
+        return f'<ScanCheckpoint {self.name} at {self.last_id}>'
+
+class DataVersion(db.Model):
+    """Change counter for a cacheable slice of data, e.g. 'tenants' or 'tenant:42'"""
+    __tablename__ = 'data_versions'
+    
+    key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, default=1, nullable=False)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.key} v{self.version}>'
+
+def upsert(model):
+    """INSERT for `model` that supports on_conflict_do_update() on the configured database"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(model)
+    if dialect == 'postgresql':
+        return postgresql.insert(model)
+    raise NotImplementedError(f'No upsert for the {dialect} dialect')
+
+def ensure_columns():
+    """Add columns declared after a table was created to an existing database.
+
+    Like ensure_indexes(), for columns: db.create_all() never alters a table
+    that already exists. Columns are added without constraints (SQLite can
+    only add nullable columns), so the caller backfills them.
+    """
+    inspector = db.inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                db.session.execute(db.text(
+                    f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN '
+                    f'{preparer.format_column(column)} {column.type.compile(db.engine.dialect)}'
+                ))
+    db.session.commit()
+
+def ensure_indexes():
+    """Create any declared index that is missing from an existing database.
+
+    db.create_all() skips tables that already exist, so a database.db created
+    before an index was declared never gets it. Existing rows are left untouched.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
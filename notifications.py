@@ -0,0 +1,34 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+class FileOutbox:
+    """Notification sink that appends messages to a JSON Lines file.
+
+    Stands in for an email or SMS gateway: each line is one message with its
+    recipient, subject, body and the time it was queued. Writes are flushed
+    and fsynced before returning so a job that records a message as sent
+    never gets ahead of the file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send_many(self, messages):
+        """Append (to, subject, body) tuples. Returns the number written."""
+        if not messages:
+            return 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        sent_at = datetime.utcnow().isoformat()
+        lines = ''.join(json.dumps({'to': to, 'subject': subject, 'body': body, 'sent_at': sent_at}) + '\n'
+                        for to, subject, body in messages)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(messages)
+
+    def send(self, to, subject, body):
+        return self.send_many([(to, subject, body)])
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt'
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated and a login has to wait too long"""
+
+class PasswordHasher:
+    """Password hashing with a configurable algorithm and a bounded worker pool.
+
+    `method` is any Werkzeug hash method, e.g. 'scrypt', 'scrypt:16384:8:1' or
+    'pbkdf2:sha256:600000'. Verification runs on a small thread pool (hashlib
+    releases the GIL while hashing) and at most `max_pending` verifications
+    may be queued or running, so a burst of logins cannot take every CPU away
+    from other requests.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, workers=2, max_pending=16, timeout=10):
+        self.executor = None
+        self.configure(method, workers, max_pending, timeout)
+
+    def configure(self, method=DEFAULT_METHOD, workers=2, max_pending=16, timeout=10):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.method = method
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._prefix = None
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return generate_password_hash(password, method=self.method)
+
+    @property
+    def prefix(self):
+        """Method and parameters as Werkzeug writes them, e.g. 'scrypt:32768:8:1'"""
+        if self._prefix is None:
+            self._prefix = self.hash('').split('$', 1)[0]
+        return self._prefix
+
+    def needs_rehash(self, password_hash):
+        """True if a stored hash was made with different method or parameters"""
+        return password_hash.split('$', 1)[0] != self.prefix
+
+    def verify(self, password_hash, password):
+        """Check a password on the worker pool.
+
+        Returns (valid, needs_rehash). Raises PasswordHasherBusy if no slot
+        frees up within the timeout.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy()
+        try:
+            future = self.executor.submit(check_password_hash, password_hash, password)
+            valid = future.result()
+        finally:
+            self._slots.release()
+        return valid, valid and self.needs_rehash(password_hash)
+
+class LoginThrottle:
+    """Sliding-window counter of failed logins per key (an IP or an account).
+
+    A key is blocked once it has `limit` failures within `window` seconds.
+    State is per process, like the dashboard cache, and holds at most
+    `max_keys` keys: past that, the key whose last failure is oldest is
+    forgotten.
+    """
+
+    def __init__(self, limit, window, max_keys=10000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._failures = OrderedDict()  # Least recently failed first
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        attempts = self._failures.get(key)
+        if attempts is None:
+            return None
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if not attempts:
+            del self._failures[key]
+            return None
+        return attempts
+
+    def retry_after(self, key):
+        """Seconds until `key` may try again, or 0 if it is not blocked"""
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._recent(key, now)
+            if attempts is None or len(attempts) < self.limit:
+                return 0
+            return max(1, int(attempts[-self.limit] + self.window - now))
+
+    def failure(self, key):
+        """Record one failed attempt"""
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._failures.get(key)
+            if attempts is None:
+                attempts = self._failures[key] = deque()
+            else:
+                self._failures.move_to_end(key)
+            attempts.append(now)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def reset(self, key):
+        """Forget the failures for `key` after a successful login"""
+        with self._lock:
+            self._failures.pop(key, None)
+
+# Shared by the models and the login routes; app.py applies the configuration
+password_hasher = PasswordHasher()
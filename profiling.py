@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+class RequestProfiler:
+    """Opt-in per-request cost recorder.
+
+    For every request it records wall time, the number and total time of SQL
+    statements, template render time, the slowest statements, and statements
+    repeated often enough to look like an N+1 pattern. The most recent
+    profiles are kept in memory for the admin profiling page.
+    """
+
+    def __init__(self, history=200, top_queries=5, n_plus_one_threshold=5):
+        self.top_queries = top_queries
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.profiles = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def init_app(self, app, engine):
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        before_render_template.connect(self.start_render, app)
+        template_rendered.connect(self.finish_render, app)
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+
+    def start_request(self):
+        if request.endpoint == 'static':
+            return
+        g.profile = {
+            'started': time.perf_counter(),
+            'queries': [],
+            'template_ms': 0.0,
+            'render_started': None,
+        }
+
+    def start_render(self, sender, template, context, **extra):
+        profile = g.get('profile')
+        if profile is not None:
+            profile['render_started'] = time.perf_counter()
+
+    def finish_render(self, sender, template, context, **extra):
+        profile = g.get('profile')
+        if profile is not None and profile['render_started'] is not None:
+            profile['template_ms'] += (time.perf_counter() - profile['render_started']) * 1000
+            profile['render_started'] = None
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's own context, so a statement that raises leaves nothing behind
+        if context is not None:
+            context.profile_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'profile_started', None)
+        if started is not None and has_request_context() and g.get('profile') is not None:
+            g.profile['queries'].append((statement, (time.perf_counter() - started) * 1000))
+
+    def finish_request(self, response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        queries = profile['queries']
+        repeated = Counter(statement for statement, _ in queries)
+        slowest = sorted(queries, key=lambda query: query[1], reverse=True)[:self.top_queries]
+        record = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'wall_ms': round((time.perf_counter() - profile['started']) * 1000, 2),
+            'sql_count': len(queries),
+            'sql_ms': round(sum(duration for _, duration in queries), 2),
+            'template_ms': round(profile['template_ms'], 2),
+            'slowest_queries': [
+                {'statement': statement, 'ms': round(duration, 2)} for statement, duration in slowest
+            ],
+            'n_plus_one': [
+                {'statement': statement, 'count': count}
+                for statement, count in repeated.most_common()
+                if count >= self.n_plus_one_threshold and statement.lstrip().upper().startswith('SELECT')
+            ],
+        }
+        with self._lock:
+            self.profiles.append(record)
+        return response
+
+    def recent(self):
+        """Recorded profiles, newest first"""
+        with self._lock:
+            return list(reversed(self.profiles))
+
+    def summary(self):
+        """Per-endpoint aggregates over the recorded profiles"""
+        by_endpoint = {}
+        for record in self.recent():
+            by_endpoint.setdefault(record['endpoint'] or record['path'], []).append(record)
+        rows = []
+        for endpoint, records in by_endpoint.items():
+            walls = sorted(record['wall_ms'] for record in records)
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(records),
+                'avg_wall_ms': round(sum(walls) / len(walls), 2),
+                'p95_wall_ms': walls[min(len(walls) - 1, int(len(walls) * 0.95))],
+                'avg_sql_count': round(sum(record['sql_count'] for record in records) / len(records), 1),
+                'avg_sql_ms': round(sum(record['sql_ms'] for record in records) / len(records), 2),
+                'n_plus_one_requests': sum(1 for record in records if record['n_plus_one']),
+            })
+        return sorted(rows, key=lambda row: row['avg_wall_ms'], reverse=True)
@@ -0,0 +1,90 @@
+from sqlalchemy import select, update, func
+from models import db, Property, Room, User, Payment, Complaint
+
+DEFAULT_PROPERTY_NAME = 'Main Building'
+
+def room_occupancy(room_ids):
+    """Tenants per room for the given rooms, from the room_id index"""
+    if not room_ids:
+        return {}
+    return dict(db.session.execute(
+        select(User.room_id, func.count(User.id)).where(User.room_id.in_(room_ids)).group_by(User.room_id)
+    ).all())
+
+def rooms_with_occupancy(property_id=None):
+    """(room, occupants) pairs for one property's rooms, or every room"""
+    query = Room.query.order_by(Room.property_id, Room.number)
+    if property_id:
+        query = query.filter(Room.property_id == property_id)
+    rooms = query.all()
+    occupancy = room_occupancy([room.id for room in rooms])
+    return [(room, occupancy.get(room.id, 0)) for room in rooms]
+
+def room_has_space(room):
+    return room_occupancy([room.id]).get(room.id, 0) < room.capacity
+
+def property_summaries():
+    """Rooms, beds and tenants per property, from two grouped queries"""
+    rooms = {property_id: (count, beds) for property_id, count, beds in db.session.execute(
+        select(Room.property_id, func.count(Room.id), func.sum(Room.capacity)).group_by(Room.property_id)
+    )}
+    tenants = dict(db.session.execute(
+        select(User.property_id, func.count(User.id)).group_by(User.property_id)
+    ).all())
+    summaries = []
+    for prop in Property.query.order_by(Property.name).all():
+        room_count, beds = rooms.get(prop.id, (0, 0))
+        summaries.append({'property': prop, 'rooms': room_count, 'beds': beds or 0,
+                          'tenants': tenants.get(prop.id, 0)})
+    return summaries
+
+def ensure_rooms(property_id, occupants):
+    """Room ids for room numbers in a property, creating missing rooms.
+
+    `occupants` maps room numbers to how many tenants are about to move in;
+    new rooms are sized to hold them. Runs in the caller's transaction.
+    """
+    rooms = dict(db.session.execute(
+        select(Room.number, Room.id).where(Room.property_id == property_id, Room.number.in_(list(occupants)))
+    ).all())
+    missing = [number for number in occupants if number not in rooms]
+    if missing:
+        db.session.execute(Room.__table__.insert(), [
+            {'property_id': property_id, 'number': number, 'capacity': max(occupants[number], 1)}
+            for number in missing
+        ])
+        rooms.update(db.session.execute(
+            select(Room.number, Room.id).where(Room.property_id == property_id, Room.number.in_(missing))
+        ).all())
+    return rooms
+
+def assign_default_property():
+    """Move rows that predate properties into a default property.
+
+    Tenants without a property go to the first property (created as
+    DEFAULT_PROPERTY_NAME if there is none, as on a fresh install), with
+    rooms made from their room numbers; payments and complaints take their
+    tenant's property. Returns the number of tenants assigned.
+    """
+    counts = dict(db.session.execute(
+        select(User.room_number, func.count(User.id)).where(User.property_id.is_(None)).group_by(User.room_number)
+    ).all())
+    prop = Property.query.order_by(Property.id).first()
+    if prop is None:
+        prop = Property(name=DEFAULT_PROPERTY_NAME)
+        db.session.add(prop)
+        db.session.flush()
+    if counts:
+        for number, room_id in ensure_rooms(prop.id, counts).items():
+            db.session.execute(
+                update(User).where(User.property_id.is_(None), User.room_number == number)
+                .values(property_id=prop.id, room_id=room_id)
+            )
+    for model in (Payment, Complaint):
+        db.session.execute(
+            update(model).where(model.property_id.is_(None)).values(
+                property_id=select(User.property_id).where(User.id == model.tenant_id).scalar_subquery()
+            )
+        )
+    db.session.commit()
+    return sum(counts.values())
@@ -0,0 +1,42 @@
+from sqlalchemy import text
+from models import db
+
+def compile_statement(statement):
+    """Render a statement (or ORM query) as SQL with its parameters inlined"""
+    statement = getattr(statement, 'statement', statement)
+    return str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+
+def explain(statement):
+    """Return the query plan lines for a statement"""
+    sql = compile_statement(statement)
+    if db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        # Rows are (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [row[0] for row in db.session.execute(text(f'EXPLAIN {sql}')).all()]
+
+def full_scans(plan):
+    """Return the SQLite plan steps that read a whole table without an index"""
+    # Subqueries the planner materializes are scanned too, but they are tiny
+    materialized = {detail.split()[-1] for detail in plan if detail.startswith('MATERIALIZE ')}
+    return [
+        detail for detail in plan
+        if detail.startswith('SCAN ') and 'USING' not in detail
+        and detail.split()[1] not in materialized
+    ]
+
+def check_query_plans(samples):
+    """Explain each (label, statement) pair and flag full table scans.
+
+    Returns a list of (label, plan lines, ok) tuples. `ok` is None on
+    databases other than SQLite, where the plan is reported but not checked.
+    """
+    results = []
+    for label, statement in samples:
+        plan = explain(statement)
+        if db.engine.dialect.name == 'sqlite':
+            ok = not full_scans(plan)
+        else:
+            ok = None
+        results.append((label, plan, ok))
+    return results
@@ -0,0 +1,86 @@
+from datetime import datetime
+from sqlalchemy import select, update, and_
+from models import db, User, MonthlyLedger, RentDue
+from analytics import period_bounds, day_after, occupied_fraction
+from ledger import MONTH_NAMES
+
+BATCH_SIZE = 500
+
+def next_month_start(after):
+    """Midnight on the first of the month following `after`"""
+    year, month = (after.year + 1, 1) if after.month == 12 else (after.year, after.month + 1)
+    return datetime(year, month, 1)
+
+def generate_rent_dues(year, month, batch_size=BATCH_SIZE):
+    """Create the month's rent due for every tenant who has moved in by its end.
+
+    Tenants are walked in id order `batch_size` at a time, committing after
+    each batch, and tenants who already have a due for the month are
+    skipped, so a retried or repeated run only fills the gaps. Returns the
+    number of dues created.
+    """
+    _, month_end = period_bounds((year, month), (year, month))
+    created = 0
+    last_id = 0
+    while True:
+        tenants = db.session.execute(
+            select(User.id, User.monthly_rent, User.created_at)
+            .where(User.id > last_id, User.created_at < day_after(month_end))
+            .order_by(User.id).limit(batch_size)
+        ).all()
+        if not tenants:
+            break
+        last_id = tenants[-1].id
+        existing = set(db.session.execute(
+            select(RentDue.tenant_id).where(RentDue.year == year, RentDue.month == month,
+                                            RentDue.tenant_id.in_([tenant.id for tenant in tenants]))
+        ).scalars())
+        dues = []
+        for tenant_id, rent, created_at in tenants:
+            if tenant_id in existing:
+                continue
+            joined_on = created_at.date() if isinstance(created_at, datetime) else created_at
+            dues.append({'tenant_id': tenant_id, 'year': year, 'month': month,
+                         'amount': round(rent * occupied_fraction(joined_on, year, month), 2)})
+        if dues:
+            db.session.execute(RentDue.__table__.insert(), dues)
+        db.session.commit()
+        created += len(dues)
+    return created
+
+def reminder_message(name, email, amount, year, month):
+    period = f'{MONTH_NAMES[month - 1]} {year}'
+    return (email, f'Rent due for {period}',
+            f'Hi {name}, your rent of ₹{amount:.2f} for {period} is due. '
+            'Please submit your payment from the tenant dashboard.')
+
+def send_rent_reminders(year, month, outbox, batch_size=BATCH_SIZE):
+    """Send a reminder for each of the month's dues not yet covered by a payment.
+
+    Works through dues without `reminded_at` a batch at a time and stamps
+    them once the batch is written to the outbox, so a retry resumes where a
+    failed run stopped. A crash between the two can repeat one batch
+    (at-least-once delivery). Tenants whose month is already paid are
+    stamped without a message. Returns the number of reminders sent.
+    """
+    sent = 0
+    while True:
+        rows = db.session.execute(
+            select(RentDue.id, RentDue.amount, User.name, User.email, MonthlyLedger.status)
+            .join(User, RentDue.tenant_id == User.id)
+            .outerjoin(MonthlyLedger, and_(MonthlyLedger.tenant_id == RentDue.tenant_id,
+                                           MonthlyLedger.year == RentDue.year,
+                                           MonthlyLedger.month == RentDue.month))
+            .where(RentDue.year == year, RentDue.month == month, RentDue.reminded_at.is_(None))
+            .order_by(RentDue.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        sent += outbox.send_many([reminder_message(name, email, amount, year, month)
+                                  for _, amount, name, email, status in rows if status != 'paid'])
+        db.session.execute(
+            update(RentDue).where(RentDue.id.in_([row.id for row in rows]))
+            .values(reminded_at=datetime.utcnow())
+        )
+        db.session.commit()
+    return sent
@@ -0,0 +1,212 @@
+from sqlalchemy import text, select, or_, case, literal, true
+from sqlalchemy.exc import OperationalError
+from models import db, User, Payment, Complaint
+
+KINDS = ('tenant', 'payment', 'complaint')
+# Table each kind of result comes from, for limiting results to one property
+KIND_MODELS = {'tenant': User, 'payment': Payment, 'complaint': Complaint}
+# The index row id packs the kind into the low bits so a row can be replaced by id
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+BATCH_SIZE = 1000
+
+def index_rowid(kind, ref_id):
+    return ref_id * len(KINDS) + KIND_CODES[kind]
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def tenant_document(user):
+    return ('tenant', user.id, user.id, user.name,
+            ' '.join([user.email, user.phone, f'Room {user.room_number}']))
+
+def payment_document(payment):
+    return ('payment', payment.id, payment.tenant_id, payment.transaction_id,
+            f'{payment.month} {payment.amount:.2f}')
+
+def complaint_document(complaint):
+    return ('complaint', complaint.id, complaint.tenant_id, complaint.subject, complaint.description)
+
+class SearchIndex:
+    """Ranked search over tenants, payment transaction ids and complaints.
+
+    On SQLite builds with FTS5 the searchable text lives in a trigram
+    `search_index` virtual table, which matches any substring of three or
+    more characters (partial names, phone digits, transaction ids) and ranks
+    by BM25 with titles weighted above the rest. Write routes keep it in sync
+    within their own transaction. Elsewhere, or for one- and two-character
+    queries, it falls back to LIKE over the base tables.
+    """
+
+    def __init__(self, limit=50):
+        self.limit = limit
+        self.available = False
+
+    def init_db(self, create=True):
+        """Create the FTS table if the database supports it. Returns True if it is in use.
+
+        With `create` False only checks whether the table already exists.
+        """
+        if db.engine.dialect.name != 'sqlite':
+            self.available = False
+            return False
+        if not create:
+            self.available = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")
+            ).first() is not None
+            return self.available
+        try:
+            db.session.execute(text(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5('
+                'kind UNINDEXED, ref_id UNINDEXED, tenant_id UNINDEXED, title, body, '
+                "tokenize='trigram')"
+            ))
+            db.session.commit()
+            self.available = True
+        except OperationalError:
+            # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer)
+            db.session.rollback()
+            self.available = False
+        return self.available
+
+    def is_empty(self):
+        return self.available and not db.session.execute(
+            text('SELECT 1 FROM search_index LIMIT 1')
+        ).first()
+
+    def add(self, documents, replace=True):
+        """Insert or replace index rows in the caller's transaction"""
+        if not self.available or not documents:
+            return
+        rows = [{'rowid': index_rowid(kind, ref_id), 'kind': kind, 'ref_id': ref_id,
+                 'tenant_id': tenant_id, 'title': title, 'body': body}
+                for kind, ref_id, tenant_id, title, body in documents]
+        if replace:
+            db.session.execute(text('DELETE FROM search_index WHERE rowid = :rowid'), rows)
+        db.session.execute(text(
+            'INSERT INTO search_index (rowid, kind, ref_id, tenant_id, title, body) '
+            'VALUES (:rowid, :kind, :ref_id, :tenant_id, :title, :body)'
+        ), rows)
+
+    def remove(self, kind, *ref_ids):
+        if self.available and ref_ids:
+            db.session.execute(text('DELETE FROM search_index WHERE rowid = :rowid'),
+                               [{'rowid': index_rowid(kind, ref_id)} for ref_id in ref_ids])
+
+    def index_tenant(self, user):
+        db.session.flush()
+        self.add([tenant_document(user)])
+
+    def index_payment(self, payment):
+        db.session.flush()
+        self.add([payment_document(payment)])
+
+    def index_complaint(self, complaint):
+        db.session.flush()
+        self.add([complaint_document(complaint)])
+
+    def index_tenants(self, condition):
+        """Index the tenants matching `condition` (used after bulk inserts)"""
+        if not self.available:
+            return
+        users = db.session.execute(select(User).where(condition)).scalars()
+        self.add([tenant_document(user) for user in users])
+
+    def index_payments(self, condition):
+        """Index the payments matching `condition` (used after bulk inserts)"""
+        if not self.available:
+            return
+        payments = db.session.execute(select(Payment).where(condition)).scalars()
+        self.add([payment_document(payment) for payment in payments])
+
+    def rebuild(self):
+        """Recreate the whole index from the base tables. Returns the number of rows."""
+        if not self.available:
+            return 0
+        db.session.execute(text('DELETE FROM search_index'))
+        written = 0
+        sources = [(User, tenant_document, true()), (Payment, payment_document, Payment.status != 'discarded'),
+                   (Complaint, complaint_document, true())]
+        for model, document, condition in sources:
+            result = db.session.execute(select(model).where(condition).execution_options(yield_per=BATCH_SIZE))
+            for partition in result.scalars().partitions():
+                self.add([document(row) for row in partition], replace=False)
+                written += len(partition)
+        db.session.commit()
+        return written
+
+    def search(self, query, kind=None, property_id=None):
+        """Ranked matches as dicts with kind, ref_id, tenant_id, tenant_name, title and body.
+
+        With `property_id`, only records belonging to that property match.
+        """
+        query = ' '.join(query.split())
+        if not query:
+            return []
+        terms = query.split(' ')
+        if self.available and any(len(term) >= 3 for term in terms):
+            results = self.search_fts(terms, kind, property_id)
+        else:
+            results = self.search_like(query, kind, property_id)
+        names = dict(db.session.execute(
+            select(User.id, User.name).where(User.id.in_({row['tenant_id'] for row in results}))
+        ).all()) if results else {}
+        for row in results:
+            row['tenant_name'] = names.get(row['tenant_id'])
+        return results
+
+    def search_fts(self, terms, kind, property_id=None):
+        # Every term must appear somewhere. Quoting makes punctuation literal;
+        # terms too short for a trigram are checked with LIKE on the matched rows.
+        long_terms = [term for term in terms if len(term) >= 3]
+        match = ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in long_terms)
+        sql = ('SELECT kind, ref_id, tenant_id, title, body FROM search_index '
+               'WHERE search_index MATCH :match')
+        params = {'match': match, 'limit': self.limit}
+        for index, term in enumerate(term for term in terms if len(term) < 3):
+            sql += f" AND (title LIKE :short{index} ESCAPE '\\' OR body LIKE :short{index} ESCAPE '\\')"
+            params[f'short{index}'] = '%{}%'.format(escape_like(term))
+        if kind:
+            sql += ' AND kind = :kind'
+            params['kind'] = kind
+        if property_id:
+            # The index has no property column; each match is checked by primary key instead
+            sql += ' AND (' + ' OR '.join(
+                f"(kind = '{name}' AND EXISTS (SELECT 1 FROM {model.__tablename__} "
+                f"WHERE id = search_index.ref_id AND property_id = :property_id))"
+                for name, model in KIND_MODELS.items() if not kind or kind == name
+            ) + ')'
+            params['property_id'] = property_id
+        sql += ' ORDER BY bm25(search_index, 0, 0, 0, 10.0, 1.0) LIMIT :limit'
+        return [dict(row._mapping) for row in db.session.execute(text(sql), params)]
+
+    def search_like(self, query, kind, property_id=None):
+        """Fallback: substring match on the base tables, prefix matches first"""
+        escaped = escape_like(query)
+        contains, prefix = f'%{escaped}%', f'{escaped}%'
+        sources = {
+            'tenant': (User, User.id, User.id, User.name,
+                       User.email + ' ' + User.phone + ' Room ' + User.room_number,
+                       [User.name, User.email, User.phone, User.room_number]),
+            'payment': (Payment, Payment.id, Payment.tenant_id, Payment.transaction_id,
+                        Payment.month, [Payment.transaction_id]),
+            'complaint': (Complaint, Complaint.id, Complaint.tenant_id, Complaint.subject,
+                          Complaint.description, [Complaint.subject, Complaint.description]),
+        }
+        results = []
+        for source_kind, (model, ref_id, tenant_id, title, body, columns) in sources.items():
+            if kind and kind != source_kind:
+                continue
+            statement = (
+                select(literal(source_kind).label('kind'), ref_id.label('ref_id'),
+                       tenant_id.label('tenant_id'), title.label('title'), body.label('body'))
+                .select_from(model)
+                .where(or_(*[column.ilike(contains, escape='\\') for column in columns]),
+                       model.property_id == property_id if property_id else true())
+                .order_by(case((title.ilike(prefix, escape='\\'), 0), else_=1), title)
+                .limit(self.limit)
+            )
+            results.extend(dict(row._mapping) for row in db.session.execute(statement))
+        return results[:self.limit]
+
+# Shared by the write routes and bulk imports; app.py calls init_db at startup
+search_index = SearchIndex()
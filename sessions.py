@@ -0,0 +1,319 @@
+import json
+import os
+import re
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+PURGE_EVERY = 500  # Saves between sweeps of expired sessions
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{43}$')
+
+def new_session_id():
+    return secrets.token_urlsafe(32)
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session whose data lives on the server; the cookie only holds its id"""
+
+    def __init__(self, initial=None, sid=None, new=False, version=None):
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid or new_session_id()
+        self.new = new
+        self.version = version  # Stored version this copy was loaded from
+        self.modified = False
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Move the data to a fresh id (call on login to prevent session fixation)"""
+        if not self.new:
+            self.previous_sid = self.sid
+        self.sid = new_session_id()
+        self.version = None
+        self.modified = True
+
+class SQLiteSessionStore:
+    """Sessions in a small SQLite file of their own, separate from the app database.
+
+    Each row carries a version, bumped on every save, so processes can tell
+    whether a copy they hold is still current.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, '
+                         'expires REAL NOT NULL, version INTEGER NOT NULL DEFAULT 1)')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(sessions)')}
+            if 'version' not in columns:
+                conn.execute('ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_sessions_expires ON sessions (expires)')
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        """Return (data, expires, version) or None"""
+        return self.connection().execute(
+            'SELECT data, expires, version FROM sessions WHERE sid = ?', (sid,)
+        ).fetchone()
+
+    def version(self, sid):
+        """Current version of a session, or None if it no longer exists"""
+        row = self.connection().execute('SELECT version FROM sessions WHERE sid = ?', (sid,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, sid, data, expires, version=None):
+        """Write a session and return its new version.
+
+        With `version`, the write only happens if the stored copy is still
+        that version; None is returned if it changed or was deleted since.
+        """
+        with self.connection() as conn:
+            if version is None:
+                conn.execute('INSERT OR REPLACE INTO sessions (sid, data, expires, version) VALUES (?, ?, ?, 1)',
+                             (sid, data, expires))
+                return 1
+            updated = conn.execute(
+                'UPDATE sessions SET data = ?, expires = ?, version = version + 1 WHERE sid = ? AND version = ?',
+                (data, expires, sid, version)
+            ).rowcount
+        return version + 1 if updated else None
+
+    def delete(self, sid):
+        with self.connection() as conn:
+            conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def items(self):
+        """Yield (sid, data) for every stored session"""
+        yield from self.connection().execute('SELECT sid, data FROM sessions').fetchall()
+
+    def purge_expired(self, now):
+        with self.connection() as conn:
+            conn.execute('DELETE FROM sessions WHERE expires < ?', (now,))
+
+class FilesystemSessionStore:
+    """One JSON file per session under `directory`.
+
+    A session's version is its file's (inode, modification time): every save
+    renames a new file into place, so both change together.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, sid):
+        return os.path.join(self.directory, sid)
+
+    def load(self, sid):
+        try:
+            with open(self.path(sid)) as f:
+                stat = os.fstat(f.fileno())
+                version = (stat.st_ino, stat.st_mtime_ns)
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return record['data'], record['expires'], version
+
+    def version(self, sid):
+        try:
+            stat = os.stat(self.path(sid))
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def save(self, sid, data, expires, version=None):
+        """Like SQLiteSessionStore.save; the version is checked just before the file is replaced"""
+        # Write under a temporary name so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'data': data, 'expires': expires}, f)
+        if version is not None and self.version(sid) != version:
+            os.remove(temp_path)
+            return None
+        os.replace(temp_path, self.path(sid))
+        return self.version(sid)
+
+    def delete(self, sid):
+        try:
+            os.remove(self.path(sid))
+        except FileNotFoundError:
+            pass
+
+    def items(self):
+        for sid in os.listdir(self.directory):
+            if not sid.endswith('.part'):
+                record = self.load(sid)
+                if record:
+                    yield sid, record[0]
+
+    def purge_expired(self, now):
+        for sid in os.listdir(self.directory):
+            record = None if sid.endswith('.part') else self.load(sid)
+            if record and record[1] < now:
+                self.delete(sid)
+
+class SessionLRU:
+    """Small per-process LRU of serialized sessions in front of the store.
+
+    Entries are keyed by session id and carry the version they were read
+    at; the interface only uses one after checking it against the store.
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        """(data, expires, version) or None"""
+        with self._lock:
+            record = self._data.get(sid)
+            if record is not None:
+                self._data.move_to_end(sid)
+            return record
+
+    def set(self, sid, record):
+        with self._lock:
+            self._data[sid] = record
+            self._data.move_to_end(sid)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def pop(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface backed by a session store plus an in-memory LRU.
+
+    Every request checks the session's stored version, so a logout or
+    revocation in one worker takes effect in all of them at once, and saves
+    are conditional on that version: a request holding an outdated copy
+    never writes it back over a newer one.
+    """
+
+    serializer = TaggedJSONSerializer()
+    session_class = ServerSideSession
+
+    def __init__(self, store, cache_size=1024):
+        self.store = store
+        self.cache = SessionLRU(cache_size)
+        self._saves = 0
+
+    def load(self, sid):
+        """Return (data, version) for a live session, or None"""
+        version = self.store.version(sid)
+        if version is None:
+            self.cache.pop(sid)
+            return None
+        record = self.cache.get(sid)
+        if record is None or record[2] != version:
+            record = self.store.load(sid)
+            if record is None:
+                self.cache.pop(sid)
+                return None
+            record = tuple(record)
+            self.cache.set(sid, record)
+        data, expires, version = record
+        if expires < time.time():
+            return None
+        return self.serializer.loads(data), version
+
+    def open_session(self, app, request):
+        # Static files need no session; skipping it keeps their responses cacheable.
+        # Uploads are the exception: they are only served to their owner (see app.protect_uploads)
+        if (app.static_url_path and request.path.startswith(app.static_url_path + '/')
+                and not request.path.startswith(app.static_url_path + '/uploads/')):
+            return self.make_null_session(app)
+        sid = request.cookies.get(self.get_cookie_name(app))
+        # Ids are also file names for the filesystem store, so reject anything unexpected
+        if sid and SESSION_ID_PATTERN.match(sid):
+            loaded = self.load(sid)
+            if loaded is not None:
+                data, version = loaded
+                return self.session_class(data, sid=sid, version=version)
+        return self.session_class(new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.previous_sid:
+            self.delete(session.previous_sid)
+
+        # An emptied session is deleted server-side and its cookie removed
+        if not session:
+            if session.modified:
+                if not session.new:
+                    self.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+                response.vary.add('Cookie')
+            return
+
+        if session.modified:
+            now = time.time()
+            data = self.serializer.dumps(dict(session))
+            expires = now + app.permanent_session_lifetime.total_seconds()
+            version = self.store.save(session.sid, data, expires, session.version)
+            if version is None:
+                # Changed elsewhere since this request read it (e.g. logged out): that change wins
+                self.cache.pop(session.sid)
+                return
+            self.cache.set(session.sid, (data, expires, version))
+            self._saves += 1
+            if self._saves % PURGE_EVERY == 0:
+                self.store.purge_expired(now)
+
+        if session.modified or self.should_set_cookie(app, session):
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                                httponly=httponly, domain=domain, path=path, secure=secure,
+                                samesite=samesite)
+            response.vary.add('Cookie')
+
+    def delete(self, sid):
+        self.store.delete(sid)
+        self.cache.pop(sid)
+
+    def revoke(self, predicate):
+        """Delete every session whose data matches `predicate`. Returns the count."""
+        revoked = 0
+        for sid, data in list(self.store.items()):
+            if predicate(self.serializer.loads(data)):
+                self.delete(sid)
+                revoked += 1
+        return revoked
+
+def make_session_interface(backend, path, cache_size=1024):
+    """Build the session interface for a backend name, or None for signed cookies"""
+    if backend == 'sqlite':
+        store = SQLiteSessionStore(path)
+    elif backend == 'filesystem':
+        store = FilesystemSessionStore(path)
+    elif backend == 'cookie':
+        return None
+    else:
+        raise ValueError(f'Unknown SESSION_BACKEND {backend!r}')
+    return ServerSideSessionInterface(store, cache_size)
@@ -52,11 +52,11 @@ document.addEventListener('DOMContentLoaded', function() {
             const name = document.getElementById('name').value.trim();
             const email = document.getElementById('email').value.trim();
             const phone = document.getElementById('phone').value.trim();
-            const roomNumber = document.getElementById('room_number').value.trim();
+            const roomId = document.getElementById('room_id').value;
             const monthlyRent = document.getElementById('monthly_rent').value.trim();
             const password = document.getElementById('password').value.trim();
 
-            if (!name || !email || !phone || !roomNumber || !monthlyRent || !password) {
+            if (!name || !email || !phone || !roomId || !monthlyRent || !password) {
                 e.preventDefault();
                 alert('Please fill in all fields');
                 return false;
@@ -268,6 +268,27 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Select all pending payments for bulk approval
+    const selectAllPayments = document.getElementById('selectAllPayments');
+    if (selectAllPayments) {
+        selectAllPayments.addEventListener('change', function(e) {
+            document.querySelectorAll('.payment-select').forEach(function(checkbox) {
+                checkbox.checked = e.target.checked;
+            });
+        });
+    }
+
+    const bulkApproveForm = document.getElementById('bulkApproveForm');
+    if (bulkApproveForm) {
+        bulkApproveForm.addEventListener('submit', function(e) {
+            if (document.querySelectorAll('.payment-select:checked').length === 0) {
+                e.preventDefault();
+                alert('Please select at least one payment');
+                return false;
+            }
+        });
+    }
+
     // Auto-hide flash messages after 5 seconds
     const flashMessages = document.querySelectorAll('.alert');
     flashMessages.forEach(function(message) {
@@ -292,6 +313,88 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+// Live updates for the admin payments and complaints lists
+document.addEventListener('DOMContentLoaded', function() {
+    const feedTarget = document.querySelector('[data-feed-url]');
+    if (!feedTarget || !window.EventSource) {
+        return;
+    }
+    const source = new EventSource(feedTarget.dataset.feedUrl);
+    source.addEventListener('row', function(e) {
+        const change = JSON.parse(e.data);
+        if (feedTarget.tagName !== 'TABLE') {
+            // Empty list: reload to get the table around the first row
+            if (change.op === 'insert') {
+                source.close();
+                location.reload();
+            }
+            return;
+        }
+        const tbody = feedTarget.tBodies[0];
+        const existing = tbody.querySelector('tr[data-id="' + change.id + '"]');
+        if (change.op === 'remove') {
+            if (existing) {
+                existing.remove();
+            }
+            return;
+        }
+        const template = document.createElement('template');
+        template.innerHTML = change.html.trim();
+        const row = template.content.firstElementChild;
+        if (feedTarget.dataset.feedOrder === 'due' && (existing || change.op === 'insert')) {
+            // SLA queue: keep rows in deadline order, since a priority change moves the deadline
+            if (existing) {
+                existing.remove();
+            } else {
+                row.classList.add('row-new');
+            }
+            const later = Array.from(tbody.rows).find(function(other) {
+                return other.dataset.due > row.dataset.due;
+            });
+            tbody.insertBefore(row, later || null);
+        } else if (existing) {
+            existing.replaceWith(row);
+        } else if (change.op === 'insert') {
+            row.classList.add('row-new');
+            tbody.prepend(row);
+            // "Approve all" should cover the payments now on screen
+            const upToId = document.querySelector('input[name="up_to_id"]');
+            if (upToId && change.id > parseInt(upToId.value || '0', 10)) {
+                upToId.value = change.id;
+            }
+        }
+    });
+});
+
+// "Load older" on the history pages: append archived rows a page at a time
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-load-older]').forEach(function(button) {
+        button.addEventListener('click', function() {
+            button.disabled = true;
+            fetch(button.dataset.loadOlder, {headers: {'Accept': 'application/json'}})
+                .then(function(response) {
+                    if (!response.ok) {
+                        throw new Error(response.statusText);
+                    }
+                    return response.json();
+                })
+                .then(function(page) {
+                    document.querySelector(button.dataset.target).tBodies[0].insertAdjacentHTML('beforeend', page.html);
+                    if (page.next_url) {
+                        button.dataset.loadOlder = page.next_url;
+                        button.disabled = false;
+                    } else {
+                        button.remove();
+                    }
+                })
+                .catch(function() {
+                    button.disabled = false;
+                    alert('Could not load older records, please try again');
+                });
+        });
+    });
+});
+
 // Format phone number input
 document.addEventListener('DOMContentLoaded', function() {
     const phoneInput = document.getElementById('phone');
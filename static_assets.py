@@ -0,0 +1,77 @@
+import gzip
+import hashlib
+import os
+import shutil
+import threading
+from werkzeug.security import safe_join
+
+COMPRESSIBLE = ('.css', '.js', '.svg')
+
+class StaticAssets:
+    """Content versions and gzip copies of the files under static/.
+
+    Versions go into static URLs so browsers can cache a file until its
+    content changes. `compress()` writes a `.gz` beside each text asset once
+    per deploy, so responses are not compressed again on every request.
+    Directories in `skip` (uploads) are left alone.
+    """
+
+    def __init__(self, root, skip=()):
+        self.root = root
+        self.skip = tuple(skip)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def path(self, filename):
+        return safe_join(self.root, filename)
+
+    def version(self, filename):
+        """Short digest of a file's content, or None if it does not exist"""
+        path = self.path(filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+        with self._lock:
+            cached = self._versions.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'rb') as f:
+            version = hashlib.sha1(f.read()).hexdigest()[:12]
+        with self._lock:
+            self._versions[filename] = (mtime, version)
+        return version
+
+    def compressible(self, filename):
+        return filename.endswith(COMPRESSIBLE) and not filename.startswith(self.skip)
+
+    def precompressed(self, filename):
+        """Path of an up-to-date .gz copy of `filename`, or None"""
+        if not self.compressible(filename):
+            return None
+        path = self.path(filename)
+        try:
+            if os.stat(path + '.gz').st_mtime_ns >= os.stat(path).st_mtime_ns:
+                return path + '.gz'
+        except (OSError, TypeError):
+            pass
+        return None
+
+    def compress(self):
+        """Write missing or stale .gz copies. Returns the number written."""
+        written = 0
+        for directory, subdirectories, files in os.walk(self.root):
+            relative = os.path.relpath(directory, self.root).replace(os.sep, '/')
+            if relative != '.' and (relative + '/').startswith(self.skip):
+                subdirectories[:] = []
+                continue
+            for name in files:
+                filename = name if relative == '.' else f'{relative}/{name}'
+                if not self.compressible(filename) or self.precompressed(filename):
+                    continue
+                path = os.path.join(directory, name)
+                with open(path, 'rb') as source, gzip.open(path + '.gz.part', 'wb', compresslevel=9) as target:
+                    shutil.copyfileobj(source, target)
+                os.replace(path + '.gz.part', path + '.gz')
+                written += 1
+        return written
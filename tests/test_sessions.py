@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+from flask import Flask, session, redirect, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions import FilesystemSessionStore, SQLiteSessionStore, ServerSideSessionInterface
+
+STORES = {
+    'sqlite': lambda tmp_path: SQLiteSessionStore(str(tmp_path / 'sessions.db')),
+    'filesystem': lambda tmp_path: FilesystemSessionStore(str(tmp_path / 'sessions')),
+}
+
+def make_worker(store):
+    """One gunicorn worker: its own store connection and session cache over the shared store"""
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = ServerSideSessionInterface(store)
+
+    @app.post('/login')
+    def login():
+        session.regenerate()
+        session['admin_id'] = 1
+        return 'ok'
+
+    @app.post('/logout')
+    def logout():
+        session.clear()
+        return 'ok'
+
+    @app.get('/dashboard')
+    def dashboard():
+        if 'admin_id' not in session:
+            return redirect('/login')
+        return 'dashboard'
+
+    @app.post('/property/<int:property_id>')
+    def select_property(property_id):
+        session['property_id'] = property_id
+        return 'ok'
+
+    @app.get('/session')
+    def show_session():
+        return jsonify(dict(session))
+
+    return app.test_client()
+
+@pytest.fixture(params=sorted(STORES))
+def workers(request, tmp_path):
+    make_store = STORES[request.param]
+    return make_worker(make_store(tmp_path)), make_worker(make_store(tmp_path))
+
+def login(a, b):
+    """Log in on A, then have B serve (and cache) the same session. Returns the session id."""
+    a.post('/login')
+    sid = a.get_cookie('session').value
+    b.set_cookie('session', sid)
+    assert b.get('/dashboard').status_code == 200
+    return sid
+
+def test_logout_applies_to_every_worker(workers):
+    a, b = workers
+    login(a, b)
+
+    a.post('/logout')
+    assert a.get('/dashboard').status_code == 302
+    assert b.get('/dashboard').status_code == 302
+
+def test_outdated_copy_is_never_written_back(workers):
+    a, b = workers
+    sid = login(a, b)
+    a.post('/logout')
+
+    # B saves after the logout; the admin_id it read earlier must not come back
+    b.post('/property/2')
+    a.set_cookie('session', sid)
+    assert a.get('/dashboard').status_code == 302
+    assert b.get('/dashboard').status_code == 302
+
+def test_saves_build_on_the_latest_copy(workers):
+    a, b = workers
+    login(a, b)
+
+    a.post('/property/2')
+    assert b.get('/session').get_json() == {'admin_id': 1, 'property_id': 2}
+    b.post('/property/3')
+    assert a.get('/session').get_json() == {'admin_id': 1, 'property_id': 3}
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Thumbnails are skipped and originals served instead
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_DIR = 'thumbs'
+
+class UploadStore:
+    """Content-addressed storage for uploaded images.
+
+    Files are streamed to disk in chunks while being hashed, so identical
+    uploads share one file. Thumbnails are produced by a background worker
+    pool after the request has returned; `on_thumbnail(path)` is then called
+    so pages already rendered with the original can be refreshed.
+    """
+
+    def __init__(self, root, thumbnail_size=(300, 300), workers=2, on_thumbnail=None):
+        self.root = root
+        self.thumbnail_size = thumbnail_size
+        self.on_thumbnail = on_thumbnail
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail')
+
+    def save(self, file, folder, prefix, ext):
+        """Store an uploaded file and return its path relative to static/"""
+        directory = os.path.join(self.root, folder)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+            filename = f'{prefix}_{digest.hexdigest()[:32]}.{ext}'
+            final_path = os.path.join(directory, filename)
+            if os.path.exists(final_path):
+                # Same content already stored
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, final_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if not os.path.exists(self.thumbnail_file(folder, filename)):
+            self.executor.submit(self.make_thumbnail, folder, filename)
+        return '/'.join(['uploads', folder, filename])
+
+    def thumbnail_file(self, folder, filename):
+        """Absolute path of the thumbnail for a stored file"""
+        return os.path.join(self.root, folder, THUMBNAIL_DIR, filename)
+
+    def make_thumbnail(self, folder, filename):
+        """Write a downscaled copy of a stored image (runs in the worker pool)"""
+        if Image is None:
+            return
+        target = self.thumbnail_file(folder, filename)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        image_format = Image.registered_extensions().get(os.path.splitext(filename)[1].lower(), 'PNG')
+        with Image.open(os.path.join(self.root, folder, filename)) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(self.thumbnail_size)
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            # Write under a temporary name so readers never see a partial file
+            partial = target + '.part'
+            image.save(partial, format=image_format, optimize=True)
+        os.replace(partial, target)
+        if self.on_thumbnail:
+            self.on_thumbnail('/'.join(['uploads', folder, filename]))
+
+    def stored_file(self, path):
+        """Absolute path of a stored file from its path relative to static/, or None"""
+        parts = (path or '').split('/')
+        if len(parts) != 3 or parts[0] != 'uploads':
+            return None
+        return os.path.join(self.root, parts[1], parts[2])
+
+    def delete(self, path):
+        """Remove a stored file and its thumbnail, if present"""
+        stored = self.stored_file(path)
+        if stored is None:
+            return
+        _, folder, filename = path.split('/')
+        for target in (stored, self.thumbnail_file(folder, filename)):
+            if os.path.exists(target):
+                os.remove(target)
+
+    def original_of(self, path):
+        """Path of the stored file an upload URL path (the file or its thumbnail) belongs to"""
+        parts = (path or '').split('/')
+        if len(parts) == 4 and parts[2] == THUMBNAIL_DIR:
+            return '/'.join([parts[0], parts[1], parts[3]])
+        return path
+
+    def thumbnail_for(self, path):
+        """Path of a stored file's thumbnail if it exists yet, else the original"""
+        if not path:
+            return path
+        parts = path.split('/')
+        if len(parts) != 3:
+            return path
+        _, folder, filename = parts
+        if os.path.exists(self.thumbnail_file(folder, filename)):
+            return '/'.join(['uploads', folder, THUMBNAIL_DIR, filename])
+        return path
+
+    def backfill_thumbnails(self, folders):
+        """Generate missing thumbnails for files already on disk"""
+        created = 0
+        for folder in folders:
+            directory = os.path.join(self.root, folder)
+            if not os.path.isdir(directory):
+                continue
+            for filename in os.listdir(directory):
+                if filename.endswith('.part') or not os.path.isfile(os.path.join(directory, filename)):
+                    continue
+                if not os.path.exists(self.thumbnail_file(folder, filename)):
+                    self.make_thumbnail(folder, filename)
+                    created += 1
+        return created
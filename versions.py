@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+from sqlalchemy import select
+from models import db, DataVersion, upsert
+
+# Version keys: TENANTS covers the tenant list; tenant_key(id) covers one
+# tenant's record, payments and complaints; PAST_REVENUE covers rent
+# collected in months that have already ended; PROPERTIES covers the
+# properties and their rooms
+TENANTS = 'tenants'
+PAST_REVENUE = 'past_revenue'
+PROPERTIES = 'properties'
+BATCH_SIZE = 500
+
+def tenant_key(tenant_id):
+    return f'tenant:{tenant_id}'
+
+def bump_versions(*keys):
+    """Increment the counters for `keys` in the caller's transaction.
+
+    Call before committing a write so the new versions become visible in the
+    same commit as the data they describe.
+    """
+    keys = sorted(set(keys))
+    now = datetime.now(timezone.utc)
+    for start in range(0, len(keys), BATCH_SIZE):
+        bump_batch(keys[start:start + BATCH_SIZE], now)
+
+def bump_batch(keys, now):
+    """One INSERT ... ON CONFLICT DO UPDATE, so concurrent first bumps of a key can't collide"""
+    statement = upsert(DataVersion).values([{'key': key, 'version': 1, 'updated_at': now} for key in keys])
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[DataVersion.key],
+        set_={'version': DataVersion.version + 1, 'updated_at': statement.excluded.updated_at},
+    ))
+
+def get_versions(keys):
+    """Current (version, updated_at) for each key; unseen keys are (0, None)"""
+    rows = db.session.execute(
+        select(DataVersion.key, DataVersion.version, DataVersion.updated_at)
+        .where(DataVersion.key.in_(keys))
+    ).all()
+    found = {key: (version, updated_at) for key, version, updated_at in rows}
+    return {key: found.get(key, (0, None)) for key in keys}
@@ -0,0 +1,4 @@
+"""WSGI entry point: `gunicorn` (settings in gunicorn.conf.py) or any WSGI server pointed at wsgi:app"""
+from app import create_app
+
+app = create_app()